@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import grid
+from . import yaw as yawlib
+from .episode import OBJECT_LABELS, Z_BINS, Episode, Obj, Pose
+
+
+# -----------------------------------------------------------------------------
+# NumPy views of the grid / yaw id tables (see grid.py / yaw.py for the id layout).
+# -----------------------------------------------------------------------------
+
+_GRID_DIST = np.asarray(grid.DIST, dtype=np.int8)
+_GRID_STEP = np.asarray(grid.STEP, dtype=np.int8)
+_GRID_NEIGH_N = np.asarray([len(n) for n in grid.NEIGHBORS], dtype=np.int8)
+_GRID_NEIGH = np.asarray([list(n) + [n[0]] * (4 - len(n)) for n in grid.NEIGHBORS], dtype=np.int8)
+_YAW_STEP1 = np.asarray([[yawlib.MOVE[c][t][1] for t in range(yawlib.N_YAW)] for c in range(yawlib.N_YAW)], dtype=np.int8)
+_YAW_NEIGH = np.asarray(yawlib.NEIGHBORS, dtype=np.int8)
+
+Z_HIGH, Z_MID, Z_LOW = 0, 1, 2
+_Z_INDEX: Dict[str, int] = {z: i for i, z in enumerate(Z_BINS)}
+
+HIST_LEN = 6
+MAX_OBJ = len(OBJECT_LABELS)
+
+# Tool codes used by `apply_tools`.
+TOOL_NONE, TOOL_APPROACH, TOOL_ALIGN_YAW = 0, 1, 2
+TOOL_CODES: Dict[str, int] = {"INTERACT": TOOL_NONE, "APPROACH": TOOL_APPROACH, "ALIGN_YAW": TOOL_ALIGN_YAW}
+
+_OBJ_IDS = tuple(f"o{i}" for i in range(MAX_OBJ))
+
+
+class EpisodeView:
+    """
+    Read-only per-episode view with the attributes the dialog/user simulation reads from
+    an `Episode` (`objects`, `gripper_hist[-1]`, `get_obj`, `intended_obj`).
+    """
+
+    __slots__ = ("objects", "gripper_hist", "intended_obj_id")
+
+    def __init__(self, objects: List[Obj], gripper_hist: List[Pose], intended_obj_id: str):
+        self.objects = objects
+        self.gripper_hist = gripper_hist
+        self.intended_obj_id = intended_obj_id
+
+    def get_obj(self, obj_id: str) -> Obj:
+        for o in self.objects:
+            if o.id == obj_id:
+                return o
+        raise KeyError(obj_id)
+
+    def intended_obj(self) -> Obj:
+        return self.get_obj(self.intended_obj_id)
+
+
+class BatchEpisode:
+    """
+    Struct-of-arrays simulator that advances B episodes in lockstep.
+
+    State is integer-coded (cell/yaw ids from grid.py/yaw.py, z as an index into Z_BINS):
+      - objects: `obj_cell`, `obj_yaw`, `obj_label` of shape (B, MAX_OBJ), masked by `obj_valid`
+      - gripper history: ring buffers `hist_cell`, `hist_yaw`, `hist_z` of shape (B, 6),
+        with `head[b]` pointing at the most recent pose
+
+    The transition model is the same as `Episode` (scene sampling, teleop motion, tool
+    effects), but random draws come from one `numpy.random.Generator` for the whole batch,
+    so trajectories are distributionally (not sample-for-sample) equivalent.
+    """
+
+    def __init__(
+        self,
+        rng: np.random.Generator,
+        n_obj: Sequence[int],
+        collision_p: float = 0.15,
+    ):
+        n = np.asarray(n_obj, dtype=np.int64)
+        if n.ndim != 1 or n.size == 0:
+            raise ValueError("n_obj must be a non-empty 1-D sequence")
+        if n.min() < 2 or n.max() > MAX_OBJ:
+            raise ValueError("n_obj must be in [2, len(OBJECT_LABELS)]")
+        B = int(n.size)
+        self.rng = rng
+        self.B = B
+        self.n_obj = n
+        self.T = rng.integers(10, 18, endpoint=True, size=B)
+
+        slots = np.arange(MAX_OBJ)
+        self.obj_valid = slots[None, :] < n[:, None]
+        self.obj_held = np.zeros((B, MAX_OBJ), dtype=bool)
+        # Random label permutation per episode; the first n_obj entries are used.
+        self.obj_label = np.argsort(rng.random((B, MAX_OBJ)), axis=1).astype(np.int8)
+
+        cell = np.zeros((B, MAX_OBJ), dtype=np.int8)
+        rows = np.arange(B)
+        for i in range(MAX_OBJ):
+            fresh = rng.integers(0, grid.N_CELLS, size=B)
+            if i > 0:
+                # Collisions reuse the cell of an earlier object in the same episode.
+                collide = rng.random(B) < collision_p
+                prev = cell[rows, rng.integers(0, i, size=B)]
+                fresh = np.where(collide, prev, fresh)
+            cell[:, i] = fresh
+        self.obj_cell = cell
+        self.obj_yaw = rng.integers(0, yawlib.N_YAW, size=(B, MAX_OBJ)).astype(np.int8)
+        self.intended = rng.integers(0, n).astype(np.int64)
+
+        self.hist_cell = np.zeros((B, HIST_LEN), dtype=np.int8)
+        self.hist_yaw = np.zeros((B, HIST_LEN), dtype=np.int8)
+        self.hist_z = np.zeros((B, HIST_LEN), dtype=np.int8)
+        self.head = np.zeros(B, dtype=np.int64)
+        self.hist_cell[:, 0] = rng.integers(0, grid.N_CELLS, size=B)
+        self.hist_yaw[:, 0] = rng.integers(0, yawlib.N_YAW, size=B)
+        self.hist_z[:, 0] = rng.integers(0, len(Z_BINS), size=B)
+        # Seed every episode with a short teleop trajectory (6 poses), as Episode does.
+        for _ in range(HIST_LEN - 1):
+            self.apply_user_motion()
+
+    @classmethod
+    def from_episodes(cls, rng: np.random.Generator, episodes: Sequence[Episode]) -> "BatchEpisode":
+        """
+        Build a batch whose state copies the given `Episode` objects (objects, intent and
+        the last 6 gripper poses). Useful for comparing the two simulators step by step.
+        """
+        self = cls.__new__(cls)
+        B = len(episodes)
+        self.rng = rng
+        self.B = B
+        self.n_obj = np.asarray([len(ep.objects) for ep in episodes], dtype=np.int64)
+        self.T = np.asarray([ep.T for ep in episodes], dtype=np.int64)
+        self.obj_valid = np.arange(MAX_OBJ)[None, :] < self.n_obj[:, None]
+        self.obj_held = np.zeros((B, MAX_OBJ), dtype=bool)
+        self.obj_label = np.zeros((B, MAX_OBJ), dtype=np.int8)
+        self.obj_cell = np.zeros((B, MAX_OBJ), dtype=np.int8)
+        self.obj_yaw = np.zeros((B, MAX_OBJ), dtype=np.int8)
+        self.intended = np.zeros(B, dtype=np.int64)
+        self.hist_cell = np.zeros((B, HIST_LEN), dtype=np.int8)
+        self.hist_yaw = np.zeros((B, HIST_LEN), dtype=np.int8)
+        self.hist_z = np.zeros((B, HIST_LEN), dtype=np.int8)
+        self.head = np.full(B, HIST_LEN - 1, dtype=np.int64)
+        label_idx = {label: i for i, label in enumerate(OBJECT_LABELS)}
+        for b, ep in enumerate(episodes):
+            for i, o in enumerate(ep.objects):
+                self.obj_label[b, i] = label_idx[o.label]
+                self.obj_cell[b, i] = grid.cell_id(o.cell)
+                self.obj_yaw[b, i] = yawlib.yaw_id(o.yaw)
+                self.obj_held[b, i] = o.is_held
+                if o.id == ep.intended_obj_id:
+                    self.intended[b] = i
+            hist = ep.gripper_hist[-HIST_LEN:]
+            if len(hist) != HIST_LEN:
+                raise ValueError("episodes must have a full gripper history")
+            for k, p in enumerate(hist):
+                self.hist_cell[b, k] = grid.cell_id(p.cell)
+                self.hist_yaw[b, k] = yawlib.yaw_id(p.yaw)
+                self.hist_z[b, k] = _Z_INDEX[p.z]
+        return self
+
+    # -------------------------------------------------------------------------
+    # Current pose / ring buffer.
+    # -------------------------------------------------------------------------
+
+    def current(self):
+        """
+        Returns (cell, yaw, z) arrays of shape (B,) for the most recent gripper pose.
+        """
+        rows = np.arange(self.B)
+        return self.hist_cell[rows, self.head], self.hist_yaw[rows, self.head], self.hist_z[rows, self.head]
+
+    def _push(self, mask: Optional[np.ndarray], cell: np.ndarray, yaw: np.ndarray, z: np.ndarray) -> None:
+        rows = np.arange(self.B) if mask is None else np.flatnonzero(mask)
+        if rows.size == 0:
+            return
+        head = (self.head[rows] + 1) % HIST_LEN
+        self.head[rows] = head
+        self.hist_cell[rows, head] = cell[rows]
+        self.hist_yaw[rows, head] = yaw[rows]
+        self.hist_z[rows, head] = z[rows]
+
+    # -------------------------------------------------------------------------
+    # Vectorized transitions.
+    # -------------------------------------------------------------------------
+
+    def apply_user_motion(self, mask: Optional[np.ndarray] = None) -> None:
+        """
+        Simulate noisy human teleop toward each episode's intended object
+        (vectorized `Episode.apply_user_motion`). Only rows where `mask` is True move.
+        """
+        rng = self.rng
+        B = self.B
+        rows = np.arange(B)
+        cur_cell, cur_yaw, cur_z = self.current()
+        tgt_cell = self.obj_cell[rows, self.intended]
+        tgt_yaw = self.obj_yaw[rows, self.intended]
+
+        # Cell motion: mostly step toward intent, sometimes jitter to a neighbor.
+        jitter = rng.random(B) >= 0.8
+        k = (rng.random(B) * _GRID_NEIGH_N[cur_cell]).astype(np.int64)
+        next_cell = np.where(jitter, _GRID_NEIGH[cur_cell, k], _GRID_STEP[cur_cell, tgt_cell])
+
+        # Yaw motion: mix of direct alignment and oscillation when on target cell.
+        oscillate = (cur_cell == tgt_cell) & (rng.random(B) < 0.55)
+        pick = rng.integers(0, 3, size=B)
+        yaw_osc = np.where(pick == 0, cur_yaw, _YAW_NEIGH[tgt_yaw, np.maximum(pick - 1, 0)])
+        next_yaw = np.where(oscillate, yaw_osc, _YAW_STEP1[cur_yaw, tgt_yaw])
+
+        # Z motion trends down when close to target, otherwise hovers higher.
+        u = rng.random(B)
+        near = next_cell == tgt_cell
+        next_z = cur_z.copy()
+        next_z[near & (cur_z == Z_HIGH) & (u < 0.7)] = Z_MID
+        next_z[near & (cur_z == Z_MID) & (u < 0.65)] = Z_LOW
+        next_z[~near & (cur_z == Z_LOW) & (u < 0.6)] = Z_MID
+        next_z[~near & (cur_z == Z_MID) & (u < 0.55)] = Z_HIGH
+
+        self._push(mask, next_cell, next_yaw, next_z)
+
+    def apply_tools(self, tool: np.ndarray, obj: np.ndarray, mask: Optional[np.ndarray] = None) -> None:
+        """
+        Apply one tool per episode (vectorized `Episode.apply_tool`).
+
+        `tool` holds TOOL_* codes and `obj` the target object slot for each row;
+        TOOL_NONE (INTERACT) leaves the gripper untouched.
+        """
+        rows = np.arange(self.B)
+        cur_cell, cur_yaw, cur_z = self.current()
+        obj = np.asarray(obj, dtype=np.int64)
+        approach = tool == TOOL_APPROACH
+        align = tool == TOOL_ALIGN_YAW
+        next_cell = np.where(approach, self.obj_cell[rows, obj], cur_cell)
+        next_z = np.where(approach, Z_HIGH, cur_z)
+        next_yaw = np.where(align, self.obj_yaw[rows, obj], cur_yaw)
+        moved = approach | align
+        self._push(moved if mask is None else moved & mask, next_cell, next_yaw, next_z)
+
+    def candidate_mask(self, max_dist: int = 1) -> np.ndarray:
+        """
+        (B, MAX_OBJ) bool mask of objects within <= max_dist Manhattan distance of the gripper.
+        """
+        cur_cell, _, _ = self.current()
+        d = _GRID_DIST[cur_cell[:, None], self.obj_cell]
+        return (d <= max_dist) & self.obj_valid & ~self.obj_held
+
+    def reached(self, target: np.ndarray) -> np.ndarray:
+        """
+        (B,) bool: gripper cell and yaw match object slot `target[b]`.
+        """
+        rows = np.arange(self.B)
+        cur_cell, cur_yaw, _ = self.current()
+        return (cur_cell == self.obj_cell[rows, target]) & (cur_yaw == self.obj_yaw[rows, target])
+
+    # -------------------------------------------------------------------------
+    # Materialization (record dicts / Episode-like views) for one row.
+    # -------------------------------------------------------------------------
+
+    def objects(self, b: int) -> List[Obj]:
+        return [
+            Obj(
+                id=_OBJ_IDS[i],
+                label=OBJECT_LABELS[self.obj_label[b, i]],
+                cell=grid.CELLS[self.obj_cell[b, i]],
+                yaw=yawlib.YAW_BINS[self.obj_yaw[b, i]],
+                is_held=bool(self.obj_held[b, i]),
+            )
+            for i in range(int(self.n_obj[b]))
+        ]
+
+    def gripper_hist(self, b: int) -> List[Pose]:
+        """
+        Gripper poses for row `b`, oldest first.
+        """
+        return [Pose(**p) for p in self.gripper_hist_records([b])[0]]
+
+    def gripper_hist_records(self, rows: Sequence[int]) -> List[List[Dict]]:
+        """
+        `Pose.to_record()`-style dicts for the given rows, oldest first (one gather for all rows).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        order = (self.head[rows, None] + 1 + np.arange(HIST_LEN)[None, :]) % HIST_LEN
+        cells = np.take_along_axis(self.hist_cell[rows], order, axis=1).tolist()
+        yaws = np.take_along_axis(self.hist_yaw[rows], order, axis=1).tolist()
+        zs = np.take_along_axis(self.hist_z[rows], order, axis=1).tolist()
+        cell_names, yaw_names = grid.CELLS, yawlib.YAW_BINS
+        return [
+            [{"cell": cell_names[c], "yaw": yaw_names[y], "z": Z_BINS[z]} for c, y, z in zip(cr, yr, zr)]
+            for cr, yr, zr in zip(cells, yaws, zs)
+        ]
+
+    def candidate_lists(self, max_dist: int = 1, rows: Optional[Sequence[int]] = None) -> List[List[str]]:
+        """
+        Object ids within <= max_dist of the gripper (as `Episode.gripper_candidates`),
+        for the given rows (default: all).
+        """
+        mask = self.candidate_mask(max_dist)
+        if rows is not None:
+            mask = mask[np.asarray(rows, dtype=np.int64)]
+        return [[_OBJ_IDS[i] for i in np.flatnonzero(row).tolist()] for row in mask]
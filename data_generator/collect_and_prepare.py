@@ -6,8 +6,11 @@ import os
 from pathlib import Path
 from typing import Optional
 
+from .delta import GENERATOR_FORMATS, write_delta_jsonl
 from .episode import write_jsonl
-from .generate_dataset import generate as generate_records
+from .jsonl_io import add_suffix, compression_suffix
+from .generate_dataset import iter_generate
+from .quota import load_quotas
 from .run_dirs import allocate_numbered_run_dir
 
 
@@ -21,10 +24,12 @@ def _default_paths(out_dir: str) -> tuple[str, str, str]:
 
 
 def _with_suffix(path: str, suffix: str) -> str:
-    p = Path(path)
+    # "x.jsonl" -> "x<suffix>.jsonl", keeping a compression extension: "x.jsonl.gz" -> "x<suffix>.jsonl.gz".
+    comp = compression_suffix(path)
+    p = Path(path[: len(path) - len(comp)])
     if p.suffix == ".jsonl":
-        return str(p.with_name(p.stem + suffix + p.suffix))
-    return str(p) + suffix
+        return str(p.with_name(p.stem + suffix + p.suffix)) + comp
+    return str(p) + suffix + comp
 
 
 def main(argv: Optional[list[str]] = None) -> None:
@@ -44,6 +49,22 @@ def main(argv: Optional[list[str]] = None) -> None:
     ap.add_argument("--n_obj_max", type=int, default=10)
     ap.add_argument("--collision_p", type=float, default=0.15)
     ap.add_argument("--candidate_max_dist", type=int, default=1)
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Simulate episodes on N worker processes (output is identical for any N).",
+    )
+    ap.add_argument("--first_episode", type=int, default=0, help="Id of the first generated episode.")
+    ap.add_argument(
+        "--quota",
+        type=str,
+        default=None,
+        help="Coverage quotas as JSON (inline or .json path): {\"tool:context:mode:cands\": count}; --episodes is then an upper bound.",
+    )
+    ap.add_argument("--quota_patience", type=int, default=0, help="Cut episodes after N records that fill no open quota (0 = never).")
+    ap.add_argument("--symmetry_dedup", action="store_true", help="Drop rotated/mirrored copies of earlier records.")
+    ap.add_argument("--symmetry_augment", action="store_true", help="Add rotated/mirrored copies of every record.")
 
     ap.add_argument(
         "--generator_jsonl",
@@ -63,8 +84,27 @@ def main(argv: Optional[list[str]] = None) -> None:
         ),
     )
     ap.add_argument("--out_generator", type=str, default=None, help="Path to write the raw generator JSONL.")
+    ap.add_argument(
+        "--generator_format",
+        choices=GENERATOR_FORMATS,
+        default="jsonl",
+        help="Layout of the generator JSONL: 'jsonl' (one record per line) or 'delta' (one compact line per episode).",
+    )
     ap.add_argument("--out_contract", type=str, default=None, help="Path to write dataset-contract JSONL.")
     ap.add_argument("--out_chat", type=str, default=None, help="Path to write chat-formatted JSONL.")
+    ap.add_argument(
+        "--contract_version",
+        type=int,
+        choices=(1, 2),
+        default=1,
+        help="Contract layout: 1 = input/output as JSON strings, 2 = nested objects (parsed once by readers).",
+    )
+    ap.add_argument(
+        "--output_format",
+        choices=("full", "template"),
+        default="full",
+        help="INTERACT outputs: 'full' (kind/text/choices) or 'template' (template id + slots, rendered at inference).",
+    )
     ap.add_argument(
         "--instruction",
         type=str,
@@ -100,6 +140,14 @@ def main(argv: Optional[list[str]] = None) -> None:
         ),
     )
     ap.add_argument("--rebalance_seed", type=int, default=0)
+    ap.add_argument(
+        "--fused",
+        action="store_true",
+        help=(
+            "Produce all outputs (generator, contract, chat and the rebalanced variants) in a single "
+            "streaming pass over the records instead of re-reading intermediate files. Outputs are identical."
+        ),
+    )
 
     args = ap.parse_args(argv)
 
@@ -126,21 +174,92 @@ def main(argv: Optional[list[str]] = None) -> None:
     for p in (out_generator, out_contract, out_chat):
         os.makedirs(str(Path(p).parent), exist_ok=True)
 
+    rebalance = int(args.motion_repeat) != 1 or float(args.interact_keep_prob) != 1.0
+
+    if args.fused and not args.skip_prepare:
+        # Keep the LLM preparation logic in llm.*; imported lazily so data_generator can be
+        # used without pulling in training dependencies.
+        from llm.prepare_llm_data import prepare_fused
+
+        from .delta import iter_generator_jsonl
+
+        stats: dict = {}
+        if args.generator_jsonl is not None:
+            records = (obj for _, obj in iter_generator_jsonl(str(args.generator_jsonl)))
+            fused_generator_out = None
+        else:
+            if args.episodes is None:
+                raise SystemExit("Either provide --episodes (to collect) or --generator_jsonl (to prepare).")
+            records = iter_generate(
+                stats=stats,
+                episodes=int(args.episodes),
+                seed=int(args.seed),
+                n_obj_min=int(args.n_obj_min),
+                n_obj_max=int(args.n_obj_max),
+                collision_p=float(args.collision_p),
+                candidate_max_dist=int(args.candidate_max_dist),
+                workers=int(args.workers),
+                first_episode=int(args.first_episode),
+                symmetry_dedup=bool(args.symmetry_dedup),
+                symmetry_augment=bool(args.symmetry_augment),
+                quotas=load_quotas(args.quota) if args.quota else None,
+                quota_patience=int(args.quota_patience),
+                materialize=False,
+            )
+            fused_generator_out = out_generator
+        out_contract_reb = _with_suffix(out_contract, "_rebalanced") if rebalance else None
+        out_chat_reb = _with_suffix(out_chat, "_rebalanced") if rebalance else None
+        fused_stats = prepare_fused(
+            records,
+            out_generator=fused_generator_out,
+            generator_format=args.generator_format,
+            out_contract=out_contract,
+            out_chat=out_chat,
+            instruction=args.instruction,
+            max_past_dialogs=12,
+            out_contract_rebalanced=out_contract_reb,
+            out_chat_rebalanced=out_chat_reb,
+            rebalance_seed=int(args.rebalance_seed),
+            motion_repeat=int(args.motion_repeat),
+            interact_keep_prob=float(args.interact_keep_prob),
+            contract_version=int(args.contract_version),
+            output_format=args.output_format,
+        )
+        if fused_generator_out is not None:
+            with open(out_generator + ".stats.json", "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2, sort_keys=True)
+        print(f"[collect] fused outputs written to {out_dir} | stats={fused_stats}")
+        return
+
     if args.generator_jsonl is not None:
         generator_path = str(args.generator_jsonl)
     else:
         if args.episodes is None:
             raise SystemExit("Either provide --episodes (to collect) or --generator_jsonl (to prepare).")
 
-        records, stats = generate_records(
+        # Stream generation straight to disk: peak memory depends on one episode (or one
+        # shard window with --workers), not on --episodes.
+        stats: dict = {}
+        records = iter_generate(
+            stats=stats,
             episodes=int(args.episodes),
             seed=int(args.seed),
             n_obj_min=int(args.n_obj_min),
             n_obj_max=int(args.n_obj_max),
             collision_p=float(args.collision_p),
             candidate_max_dist=int(args.candidate_max_dist),
+            workers=int(args.workers),
+            first_episode=int(args.first_episode),
+            symmetry_dedup=bool(args.symmetry_dedup),
+            symmetry_augment=bool(args.symmetry_augment),
+            quotas=load_quotas(args.quota) if args.quota else None,
+            quota_patience=int(args.quota_patience),
+            materialize=False,
         )
-        write_jsonl(out_generator, records)
+        if args.generator_format == "delta":
+            write_delta_jsonl(out_generator, records)
+        else:
+            write_jsonl(out_generator, records)
         with open(out_generator + ".stats.json", "w", encoding="utf-8") as f:
             json.dump(stats, f, indent=2, sort_keys=True)
 
@@ -159,12 +278,14 @@ def main(argv: Optional[list[str]] = None) -> None:
         out_path=out_contract,
         instruction=args.instruction,
         max_past_dialogs=12,
+        contract_version=int(args.contract_version),
+        output_format=args.output_format,
     )
 
-    if int(args.motion_repeat) != 1 or float(args.interact_keep_prob) != 1.0:
+    if rebalance:
         # Keep the original contract for evaluation/debugging, and write a separate rebalanced contract for training.
         out_contract_reb = _with_suffix(out_contract, "_rebalanced")
-        tmp_out = str(out_contract_reb) + ".tmp_rebalanced"
+        tmp_out = add_suffix(out_contract_reb, ".tmp_rebalanced")
         stats = rebalance_contract(
             in_path=str(out_contract),
             out_path=tmp_out,
@@ -0,0 +1,291 @@
+"""
+Episode-delta storage for generator output.
+
+One JSONL line per episode instead of one per timestep:
+
+    {"format": "grasp-delta/1", "episode_id": 7, "objects": [...scene at t=0...],
+     "steps": [step, step, ...]}
+
+Objects and gripper poses are stored as value rows in OBJECT_FIELDS / POSE_FIELDS order
+(dicts with any other key order are stored as dicts). Each step holds only what changed
+since the previous timestep of the same episode (the first step diffs against an empty
+history and MEMORY_TEMPLATE):
+  - "o": {"i": {field: value}}  changed fields of objects[i] ("O": full list instead,
+    if the object list changed shape)
+  - "h": [k, [poses]]  gripper_hist = previous[k:] + poses
+  - "d": [entries]  appended to memory.past_dialogs; null stands for the assistant turn
+    that repeats the previous step's INTERACT text
+  - "p": context  memory.last_prompt rebuilt from the previous step's INTERACT plus this
+    context (the generator's usual case)
+  - "m": {key: value}  other memory fields that changed ("M": full memory instead, if
+    the memory keys of this or the previous step are not the usual ones)
+  - "u": user_state (when changed), "t": target_tool_call (always)
+Records whose keys are not the usual RECORD_KEYS are stored whole as {"R": record}.
+
+`iter_generator_jsonl` reads both layouts and yields exactly the records the per-step
+file would contain, numbered as its lines would be.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .jsonl_io import open_jsonl
+from .memory_log import materialize_record
+
+DELTA_FORMAT = "grasp-delta/1"
+# Generator output layouts (--format / --generator_format).
+GENERATOR_FORMATS: Tuple[str, ...] = ("jsonl", "delta")
+
+RECORD_KEYS: Tuple[str, ...] = ("episode_id", "objects", "gripper_hist", "memory", "user_state", "target_tool_call")
+OBJECT_FIELDS: Tuple[str, ...] = ("id", "label", "cell", "yaw", "is_held")
+POSE_FIELDS: Tuple[str, ...] = ("cell", "yaw", "z")
+MEMORY_TEMPLATE: Dict[str, Any] = {
+    "n_interactions": 0,
+    "past_dialogs": [],
+    "candidates": [],
+    "last_tool_calls": [],
+    "excluded_obj_ids": [],
+    "last_action": {},
+    "last_prompt": {},
+}
+_MEMORY_KEYS = list(MEMORY_TEMPLATE)
+
+
+def is_delta_line(obj: Dict) -> bool:
+    return obj.get("format") == DELTA_FORMAT
+
+
+def _pack(d: Dict, fields: Tuple[str, ...]):
+    return [d[k] for k in fields] if tuple(d) == fields else d
+
+
+def _unpack(v, fields: Tuple[str, ...]) -> Dict:
+    return dict(zip(fields, v)) if isinstance(v, list) else v
+
+
+def _hist_delta(prev: Sequence[Dict], cur: Sequence[Dict]) -> Tuple[int, List[Dict]]:
+    # Smallest shift k such that prev[k:] is a prefix of cur (the window slid by k).
+    for k in range(len(prev) + 1):
+        kept = len(prev) - k
+        if kept <= len(cur) and _same(list(prev[k:]), list(cur[:kept])):
+            return k, list(cur[kept:])
+    return len(prev), list(cur)
+
+
+def _echo_turn(prev_tool: Optional[Dict]) -> Optional[Dict]:
+    # The assistant turn the generator appends after an INTERACT.
+    if not prev_tool or prev_tool.get("tool") != "INTERACT":
+        return None
+    return {"role": "assistant", "content": prev_tool["args"].get("text")}
+
+
+def _prompt_from(prev_tool: Optional[Dict], context) -> Optional[Dict]:
+    # The memory.last_prompt the generator stores after an INTERACT.
+    if not prev_tool or prev_tool.get("tool") != "INTERACT":
+        return None
+    args = prev_tool["args"]
+    return {"kind": args.get("kind"), "text": args.get("text"), "choices": list(args.get("choices") or []), "context": context}
+
+
+def _same_layout(a, b) -> bool:
+    # Same scalar types and dict key order throughout (assumes a == b).
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(_same_layout(v, b[k]) for k, v in a.items())
+    if isinstance(a, list):
+        return all(_same_layout(x, y) for x, y in zip(a, b))
+    return type(a) is type(b)
+
+
+def _same(a, b) -> bool:
+    # Equal and serialized identically (dict key order included). Every diff below uses
+    # this rather than ==, so a change that only reorders keys is still stored.
+    return a == b and _same_layout(a, b)
+
+
+class DeltaEncoder:
+    """
+    Streaming encoder: feed generator records in order with `add()`; it returns the
+    encoded line of the previous episode once a new episode starts. Call `finish()` at the
+    end for the last one. Memory is bounded by one episode.
+    """
+
+    def __init__(self) -> None:
+        self._episode: Optional[Dict] = None
+        self._prev: Optional[Dict] = None
+
+    def add(self, record: Dict) -> Optional[str]:
+        # Normalize to plain JSON values (MemorySnapshot, tuples) so diffs compare what
+        # would be written.
+        record = json.loads(json.dumps(materialize_record(record), ensure_ascii=False))
+        done = None
+        if self._episode is not None and record.get("episode_id") != self._episode["episode_id"]:
+            done = self.finish()
+        if self._episode is None:
+            objects = record.get("objects") if isinstance(record.get("objects"), list) else []
+            self._episode = {
+                "format": DELTA_FORMAT,
+                "episode_id": record.get("episode_id"),
+                "objects": [_pack(o, OBJECT_FIELDS) for o in objects],
+                "steps": [],
+            }
+            self._prev = {"objects": objects, "gripper_hist": [], "memory": MEMORY_TEMPLATE, "user_state": None}
+        self._episode["steps"].append(self._step(record))
+        return done
+
+    def finish(self) -> Optional[str]:
+        if self._episode is None:
+            return None
+        line = json.dumps(self._episode, ensure_ascii=False, separators=(",", ":"))
+        self._episode = None
+        self._prev = None
+        return line
+
+    def _step(self, record: Dict) -> Dict:
+        prev = self._prev
+        assert prev is not None
+        if tuple(record) != RECORD_KEYS:
+            return {"R": record}
+        self._prev = record
+        prev_tool = prev.get("target_tool_call")
+        step: Dict = {}
+
+        objects, prev_objects = record["objects"], prev["objects"]
+        if len(objects) != len(prev_objects) or any(list(a) != list(b) for a, b in zip(objects, prev_objects)):
+            step["O"] = [_pack(o, OBJECT_FIELDS) for o in objects]
+        else:
+            changed = {}
+            for i, (a, b) in enumerate(zip(objects, prev_objects)):
+                fields = {k: v for k, v in a.items() if not _same(b[k], v)}
+                if fields:
+                    changed[str(i)] = fields
+            if changed:
+                step["o"] = changed
+
+        k, poses = _hist_delta(prev["gripper_hist"], record["gripper_hist"])
+        if k or poses:
+            step["h"] = [k, [_pack(p, POSE_FIELDS) for p in poses]]
+
+        mem, prev_mem = record["memory"], prev["memory"]
+        if list(mem) != _MEMORY_KEYS or list(prev_mem) != _MEMORY_KEYS:
+            # Unusual keys here or in the previous step: a key-wise diff cannot express it.
+            step["M"] = mem
+        else:
+            changed = {key: v for key, v in mem.items() if not _same(prev_mem[key], v)}
+            dialogs, prev_dialogs = mem["past_dialogs"], prev_mem["past_dialogs"]
+            if "past_dialogs" in changed and _same(dialogs[: len(prev_dialogs)], prev_dialogs):
+                echo = _echo_turn(prev_tool)
+                step["d"] = [None if echo is not None and _same(e, echo) else e for e in dialogs[len(prev_dialogs) :]]
+                del changed["past_dialogs"]
+            lp = mem["last_prompt"]
+            if "last_prompt" in changed and isinstance(lp, dict) and _same(lp, _prompt_from(prev_tool, lp.get("context"))):
+                step["p"] = lp.get("context")
+                del changed["last_prompt"]
+            if changed:
+                step["m"] = changed
+
+        if not _same(record["user_state"], prev["user_state"]):
+            step["u"] = record["user_state"]
+        step["t"] = record["target_tool_call"]
+        return step
+
+
+def expand_episode(obj: Dict) -> Iterator[Dict]:
+    """
+    Yield the per-timestep records of one delta line. Consecutive records share the
+    sub-objects that did not change between them, so treat them as read-only (copy
+    before mutating).
+    """
+    episode_id = obj["episode_id"]
+    objects: List[Dict] = [_unpack(o, OBJECT_FIELDS) for o in obj["objects"]]
+    hist: List[Dict] = []
+    memory: Dict = json.loads(json.dumps(MEMORY_TEMPLATE))
+    user_state = None
+    prev_tool: Optional[Dict] = None
+    for step in obj["steps"]:
+        full = step.get("R")
+        if full is not None:
+            yield full
+            continue
+        if "O" in step:
+            objects = [_unpack(o, OBJECT_FIELDS) for o in step["O"]]
+        elif "o" in step:
+            objects = list(objects)
+            for i, fields in step["o"].items():
+                objects[int(i)] = {**objects[int(i)], **fields}
+        if "h" in step:
+            k, poses = step["h"]
+            hist = hist[k:] + [_unpack(p, POSE_FIELDS) for p in poses]
+        if "M" in step:
+            memory = step["M"]
+        else:
+            memory = dict(memory)
+            if "d" in step:
+                echo = _echo_turn(prev_tool)
+                memory["past_dialogs"] = memory["past_dialogs"] + [echo if e is None else e for e in step["d"]]
+            if "p" in step:
+                memory["last_prompt"] = _prompt_from(prev_tool, step["p"])
+            memory.update(step.get("m", ()))
+        if "u" in step:
+            user_state = step["u"]
+        prev_tool = step["t"]
+        yield {
+            "episode_id": episode_id,
+            "objects": objects,
+            "gripper_hist": hist,
+            "memory": memory,
+            "user_state": user_state,
+            "target_tool_call": prev_tool,
+        }
+
+
+def iter_generator_jsonl(path: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (line_no, record) from a generator JSONL in either layout. For delta files,
+    line_no is the line the record would have in the per-step file, so example ids
+    ("<episode_id>_<line_no>") match between the two layouts.
+    """
+    n = 0
+    with open_jsonl(path, "r") as f:
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                n += 1
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{i}: Invalid JSON: {e}") from e
+            if not isinstance(obj, dict):
+                raise ValueError(f"{path}:{i}: Expected JSON object per line")
+            if is_delta_line(obj):
+                for record in expand_episode(obj):
+                    n += 1
+                    yield n, record
+            else:
+                n += 1
+                yield n, obj
+
+
+def write_delta(f: IO[str], records: Iterable[Dict]) -> int:
+    """
+    Write records as episode-delta lines to an open text file; returns the record count.
+    Records of one episode must be consecutive (as the generator emits them).
+    """
+    enc = DeltaEncoder()
+    n = 0
+    for r in records:
+        n += 1
+        line = enc.add(r)
+        if line is not None:
+            f.write(line + "\n")
+    line = enc.finish()
+    if line is not None:
+        f.write(line + "\n")
+    return n
+
+
+def write_delta_jsonl(path: str, records: Iterable[Dict]) -> None:
+    with open_jsonl(path, "w") as f:
+        write_delta(f, records)
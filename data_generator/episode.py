@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from . import grid
+from . import jsonl_io
 from . import yaw as yawlib
+from .memory_log import record_to_json
 
 
 OBJECT_LABELS: Tuple[str, ...] = (
@@ -24,26 +24,193 @@ OBJECT_LABELS: Tuple[str, ...] = (
 Z_BINS: Tuple[str, ...] = ("HIGH", "MID", "LOW")
 
 
-@dataclass
+_Z_INDEX: Dict[str, int] = {z: i for i, z in enumerate(Z_BINS)}
+_Z_HIGH, _Z_MID, _Z_LOW = 0, 1, 2
+
+
 class Obj:
-    id: str
-    label: str
-    cell: str
-    yaw: str
-    is_held: bool = False
+    """
+    Scene object. Cell and yaw are stored as integer ids (see grid.py / yaw.py) and exposed
+    as labels. `shared_record()` builds its dict once and reuses it until a field changes,
+    so unchanged objects are not re-serialized every timestep; `to_record()` returns a
+    fresh copy of it.
+    """
+
+    __slots__ = ("_id", "_label", "_cell", "_yaw", "_is_held", "_record")
+
+    def __init__(self, id: str, label: str, cell: str, yaw: str, is_held: bool = False):
+        self._id = id
+        self._label = label
+        self._cell = grid.cell_id(cell)
+        self._yaw = yawlib.yaw_id(yaw)
+        self._is_held = bool(is_held)
+        self._record: Optional[Dict] = None
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @id.setter
+    def id(self, value: str) -> None:
+        self._id = value
+        self._record = None
+
+    @property
+    def label(self) -> str:
+        return self._label
+
+    @label.setter
+    def label(self, value: str) -> None:
+        self._label = value
+        self._record = None
+
+    @property
+    def cell(self) -> str:
+        return grid.CELLS[self._cell]
+
+    @cell.setter
+    def cell(self, value: str) -> None:
+        self._cell = grid.cell_id(value)
+        self._record = None
+
+    @property
+    def yaw(self) -> str:
+        return yawlib.YAW_BINS[self._yaw]
+
+    @yaw.setter
+    def yaw(self, value: str) -> None:
+        self._yaw = yawlib.yaw_id(value)
+        self._record = None
+
+    @property
+    def is_held(self) -> bool:
+        return self._is_held
+
+    @is_held.setter
+    def is_held(self, value: bool) -> None:
+        self._is_held = bool(value)
+        self._record = None
+
+    @property
+    def cell_id(self) -> int:
+        return self._cell
+
+    @property
+    def yaw_id(self) -> int:
+        return self._yaw
+
+    def shared_record(self) -> Dict:
+        """
+        The cached record dict, shared with every other caller: treat it as read-only.
+        """
+        rec = self._record
+        if rec is None:
+            rec = self._record = {
+                "id": self._id,
+                "label": self._label,
+                "cell": grid.CELLS[self._cell],
+                "yaw": yawlib.YAW_BINS[self._yaw],
+                "is_held": self._is_held,
+            }
+        return rec
 
     def to_record(self) -> Dict:
-        return {"id": self.id, "label": self.label, "cell": self.cell, "yaw": self.yaw, "is_held": self.is_held}
+        return dict(self.shared_record())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Obj):
+            return NotImplemented
+        return (self._id, self._label, self._cell, self._yaw, self._is_held) == (
+            other._id,
+            other._label,
+            other._cell,
+            other._yaw,
+            other._is_held,
+        )
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
+    def __repr__(self) -> str:
+        return f"Obj(id={self._id!r}, label={self._label!r}, cell={self.cell!r}, yaw={self.yaw!r}, is_held={self._is_held!r})"
 
 
-@dataclass
 class Pose:
-    cell: str
-    yaw: str
-    z: str
+    """
+    Immutable gripper pose stored as integer cell / yaw / z ids. The record dict is built
+    on first use and shared afterwards through `shared_record()` (a pose stays in the
+    6-step history for several timesteps); `to_record()` returns a fresh copy.
+    """
+
+    __slots__ = ("_cell", "_yaw", "_z", "_record")
+
+    def __init__(self, cell: str, yaw: str, z: str):
+        z_id = _Z_INDEX.get(z)
+        if z_id is None:
+            raise ValueError(f"Invalid z bin: {z!r}")
+        self._cell = grid.cell_id(cell)
+        self._yaw = yawlib.yaw_id(yaw)
+        self._z = z_id
+        self._record: Optional[Dict] = None
+
+    @classmethod
+    def from_ids(cls, cell: int, yaw: int, z: int) -> "Pose":
+        self = cls.__new__(cls)
+        self._cell = cell
+        self._yaw = yaw
+        self._z = z
+        self._record = None
+        return self
+
+    @property
+    def cell(self) -> str:
+        return grid.CELLS[self._cell]
+
+    @property
+    def yaw(self) -> str:
+        return yawlib.YAW_BINS[self._yaw]
+
+    @property
+    def z(self) -> str:
+        return Z_BINS[self._z]
+
+    @property
+    def cell_id(self) -> int:
+        return self._cell
+
+    @property
+    def yaw_id(self) -> int:
+        return self._yaw
+
+    @property
+    def z_id(self) -> int:
+        return self._z
+
+    def shared_record(self) -> Dict:
+        """
+        The cached record dict, shared with every other caller: treat it as read-only.
+        """
+        rec = self._record
+        if rec is None:
+            rec = self._record = {
+                "cell": grid.CELLS[self._cell],
+                "yaw": yawlib.YAW_BINS[self._yaw],
+                "z": Z_BINS[self._z],
+            }
+        return rec
 
     def to_record(self) -> Dict:
-        return {"cell": self.cell, "yaw": self.yaw, "z": self.z}
+        return dict(self.shared_record())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Pose):
+            return NotImplemented
+        return (self._cell, self._yaw, self._z) == (other._cell, other._yaw, other._z)
+
+    def __hash__(self) -> int:
+        return hash((self._cell, self._yaw, self._z))
+
+    def __repr__(self) -> str:
+        return f"Pose(cell={self.cell!r}, yaw={self.yaw!r}, z={self.z!r})"
 
 
 class Episode:
@@ -92,7 +259,7 @@ class Episode:
 
     def get_obj(self, obj_id: str) -> Obj:
         for o in self.objects:
-            if o.id == obj_id:
+            if o._id == obj_id:
                 return o
         raise KeyError(obj_id)
 
@@ -103,14 +270,8 @@ class Episode:
         """
         Returns object ids that are within <= max_dist Manhattan distance of the gripper.
         """
-        cell = self.gripper_hist[-1].cell
-        out: List[str] = []
-        for o in self.objects:
-            if o.is_held:
-                continue
-            if grid.manhattan(cell, o.cell) <= max_dist:
-                out.append(o.id)
-        return out
+        dist_row = grid.DIST[self.gripper_hist[-1]._cell]
+        return [o._id for o in self.objects if not o._is_held and dist_row[o._cell] <= max_dist]
 
     def _push_gripper(self, pose: Pose) -> None:
         self.gripper_hist.append(pose)
@@ -123,39 +284,41 @@ class Episode:
         """
         cur = self.gripper_hist[-1]
         intended = self.intended_obj()
+        cur_cell, cur_yaw, cur_z = cur._cell, cur._yaw, cur._z
+        tgt_cell, tgt_yaw = intended._cell, intended._yaw
 
         # Cell motion: mostly step toward intent, sometimes jitter to a neighbor.
         if self.rng.random() < 0.8:
-            next_cell = grid.step_toward(cur.cell, intended.cell)
+            next_cell = grid.STEP[cur_cell][tgt_cell]
         else:
-            neigh = grid.neighbors(cur.cell)
-            next_cell = self.rng.choice(neigh) if neigh else cur.cell
+            neigh = grid.NEIGHBORS[cur_cell]
+            next_cell = self.rng.choice(neigh) if neigh else cur_cell
 
         # Yaw motion: mix of direct alignment and oscillation when on target cell.
-        if cur.cell == intended.cell and self.rng.random() < 0.55:
+        if cur_cell == tgt_cell and self.rng.random() < 0.55:
             # Deliberately oscillate to create yaw-struggle cases.
-            yaw_neighbors = yawlib.neighbors(intended.yaw)
-            next_yaw = self.rng.choice([cur.yaw, yaw_neighbors[0], yaw_neighbors[1]])
+            yaw_neighbors = yawlib.NEIGHBORS[tgt_yaw]
+            next_yaw = self.rng.choice([cur_yaw, yaw_neighbors[0], yaw_neighbors[1]])
         else:
-            next_yaw = yawlib.move_toward(cur.yaw, intended.yaw, steps=1)
+            next_yaw = yawlib.MOVE[cur_yaw][tgt_yaw][1]
 
         # Z motion trends down when close to target, otherwise hovers higher.
-        if next_cell == intended.cell:
-            if cur.z == "HIGH":
-                next_z = "MID" if self.rng.random() < 0.7 else "HIGH"
-            elif cur.z == "MID":
-                next_z = "LOW" if self.rng.random() < 0.65 else "MID"
+        if next_cell == tgt_cell:
+            if cur_z == _Z_HIGH:
+                next_z = _Z_MID if self.rng.random() < 0.7 else _Z_HIGH
+            elif cur_z == _Z_MID:
+                next_z = _Z_LOW if self.rng.random() < 0.65 else _Z_MID
             else:
-                next_z = "LOW"
+                next_z = _Z_LOW
         else:
-            if cur.z == "LOW":
-                next_z = "MID" if self.rng.random() < 0.6 else "LOW"
-            elif cur.z == "MID":
-                next_z = "HIGH" if self.rng.random() < 0.55 else "MID"
+            if cur_z == _Z_LOW:
+                next_z = _Z_MID if self.rng.random() < 0.6 else _Z_LOW
+            elif cur_z == _Z_MID:
+                next_z = _Z_HIGH if self.rng.random() < 0.55 else _Z_MID
             else:
-                next_z = "HIGH"
+                next_z = _Z_HIGH
 
-        self._push_gripper(Pose(cell=next_cell, yaw=next_yaw, z=next_z))
+        self._push_gripper(Pose.from_ids(next_cell, next_yaw, next_z))
 
     def apply_tool(self, tool_call: Dict) -> None:
         """
@@ -165,29 +328,23 @@ class Episode:
         args = tool_call["args"]
         cur = self.gripper_hist[-1]
 
-        def set_gripper(cell: Optional[str] = None, yaw: Optional[str] = None, z: Optional[str] = None):
-            self._push_gripper(
-                Pose(
-                    cell=cell if cell is not None else cur.cell,
-                    yaw=yaw if yaw is not None else cur.yaw,
-                    z=z if z is not None else cur.z,
-                )
-            )
-
         if tool == "INTERACT":
             return
         if tool == "APPROACH":
             obj = self.get_obj(args["obj"])
-            set_gripper(cell=obj.cell, z="HIGH")
+            self._push_gripper(Pose.from_ids(obj.cell_id, cur.yaw_id, _Z_HIGH))
         elif tool == "ALIGN_YAW":
             obj = self.get_obj(args["obj"])
-            set_gripper(yaw=obj.yaw)
+            self._push_gripper(Pose.from_ids(cur.cell_id, obj.yaw_id, cur.z_id))
         else:
             raise ValueError(f"Unknown tool: {tool}")
 
 
-def write_jsonl(path: str, records: Sequence[Dict]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        for r in records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+def write_jsonl(path: str, records: Iterable[Dict]) -> None:
+    """
+    Write records as JSONL. Accepts any iterable, so generators are streamed to disk
+    without being materialized. Memory snapshots are encoded from their cached fragments.
+    ".gz"/".zst" paths are compressed (see jsonl_io).
+    """
+    jsonl_io.write_jsonl(path, records, record_to_json)
 
@@ -1,30 +1,20 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import random
-from typing import Dict, List, Optional, Tuple
-
-from .episode import Episode, OBJECT_LABELS, write_jsonl
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from . import symmetry
+from .delta import GENERATOR_FORMATS, write_delta_jsonl
+from .episode import Episode, OBJECT_LABELS, Pose, write_jsonl
+from .memory_log import DialogLog, MemorySnapshot, detach_record
 from .oracle import OracleState, oracle_decide_tool, validate_tool_call
-
-
-def _deepcopy_memory(mem: Dict) -> Dict:
-    out = {
-        "n_interactions": int(mem["n_interactions"]),
-        "past_dialogs": list(mem["past_dialogs"]),
-        "candidates": list(mem["candidates"]),
-        "last_tool_calls": list(mem["last_tool_calls"]),
-        "excluded_obj_ids": list(mem.get("excluded_obj_ids") or []),
-        "last_action": dict(mem.get("last_action") or {}),
-    }
-    # Optional-but-important training context: the last assistant prompt shown to the user
-    # (including the choice list). The GUI runtime also maintains this field.
-    last_prompt = mem.get("last_prompt")
-    if isinstance(last_prompt, dict):
-        out["last_prompt"] = dict(last_prompt)
-    return out
+from .quota import Quotas, load_quotas
 
 
 def _infer_user_mode_from_gripper_hist(gripper_hist: List[Dict]) -> str:
@@ -297,8 +287,137 @@ def _schema_validate_record(rec: Dict) -> None:
         raise ValueError("user_state.mode must be one of {translation, rotation, gripper}")
 
 
-def generate(
-    episodes: int,
+def _episode_seed(seed: int, episode_id: int) -> int:
+    """
+    Derive an independent RNG seed for one episode from (seed, episode_id).
+
+    Each episode owns its RNG, so episodes can be simulated in any order (or in
+    parallel) and still produce exactly the same records.
+    """
+    digest = hashlib.sha256(f"grasp-copilot/episode:{int(seed)}:{int(episode_id)}".encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _new_stats() -> Dict:
+    return {
+        "tool_distribution": {"INTERACT": 0, "APPROACH": 0, "ALIGN_YAW": 0},
+        "user_reply_distribution": {
+            "user_replies_total": 0,
+            "user_replies_yes": 0,
+            "user_replies_no": 0,
+            "user_replies_none_of_them": 0,
+            "user_replies_mode_approach": 0,
+            "user_replies_mode_align_yaw": 0,
+            "user_silent_steps": 0,
+            "user_replies_by_context": {},
+        },
+    }
+
+
+def _merge_counts(dst: Dict, src: Dict) -> None:
+    """
+    Recursively add integer counters from src into dst (nested dicts are merged key-wise).
+    """
+    for k, v in src.items():
+        if isinstance(v, dict):
+            _merge_counts(dst.setdefault(k, {}), v)
+        else:
+            dst[k] = int(dst.get(k, 0)) + int(v)
+
+
+def _new_memory(candidates: List[str]) -> Dict:
+    return {
+        "n_interactions": 0,
+        # Append-only, so per-step record snapshots can share it (see memory_log.py).
+        "past_dialogs": DialogLog(),
+        "candidates": candidates,
+        "last_tool_calls": [],
+        "excluded_obj_ids": [],
+        "last_action": {},
+        # Store the last prompt (kind/text/choices + optional context) so the next-step
+        # decision is learnable without relying on hidden oracle state.
+        "last_prompt": {},
+    }
+
+
+def _decide_and_respond(
+    episode_id: int,
+    ep,
+    objects: List[Dict],
+    gripper_hist: List[Dict],
+    memory: Dict,
+    state: OracleState,
+    rng: random.Random,
+    stats: Dict,
+    *,
+    user_yes_p: float,
+    user_none_of_them_p: float,
+) -> Tuple[Dict, Dict]:
+    """
+    One timestep of the scripted dialog, shared by all simulation engines: snapshot the
+    record, ask the oracle for the tool call, then update memory and simulate the user's
+    reply. World effects (tool execution, teleop motion) are left to the caller.
+
+    `ep` only needs `objects`, `gripper_hist[-1]` and `intended_obj()` (see Episode).
+    Returns (record, tool_call).
+    """
+    record = {
+        "episode_id": episode_id,
+        "objects": objects,
+        "gripper_hist": gripper_hist,
+        "memory": MemorySnapshot(memory),
+        "user_state": {"mode": _infer_user_mode_from_gripper_hist(gripper_hist)},
+    }
+
+    tool_call = oracle_decide_tool(
+        record["objects"],
+        record["gripper_hist"],
+        memory,
+        state,
+        user_state=record["user_state"],
+    )
+    validate_tool_call(tool_call)
+    record["target_tool_call"] = tool_call
+    _schema_validate_record(record)
+
+    stats["tool_distribution"][tool_call["tool"]] += 1
+
+    # Update dialog and interaction counters.
+    if tool_call["tool"] == "INTERACT":
+        memory["n_interactions"] += 1
+        memory["past_dialogs"].append({"role": "assistant", "content": tool_call["args"]["text"]})
+        # Persist the full prompt + options (and oracle-provided context when available).
+        # This matches what the interactive GUI keeps in memory.
+        memory["last_prompt"] = {
+            "kind": tool_call["args"].get("kind"),
+            "text": tool_call["args"].get("text"),
+            "choices": list(tool_call["args"].get("choices") or []),
+            # Context is optional metadata that helps interpret user replies like "1"/"2"
+            # and disambiguate prompt types (confirm vs help vs candidate_choice).
+            "context": dict(state.last_prompt_context or {}),
+        }
+
+    _simulate_user_response(
+        rng,
+        tool_call,
+        ep,
+        memory,
+        state,
+        stats=stats["user_reply_distribution"],
+        yes_p=float(user_yes_p),
+        none_of_them_p=float(user_none_of_them_p),
+    )
+
+    # Maintain a short history of tool calls for memory logging.
+    memory["last_tool_calls"].append(tool_call["tool"])
+    memory["last_tool_calls"] = memory["last_tool_calls"][-3:]
+    if tool_call["tool"] in {"APPROACH", "ALIGN_YAW"}:
+        memory["last_action"] = {"tool": tool_call["tool"], "obj": tool_call["args"]["obj"]}
+    return record, tool_call
+
+
+def _simulate_episode(
+    episode_id: int,
     seed: int,
     *,
     n_obj_min: int = 2,
@@ -307,128 +426,449 @@ def generate(
     candidate_max_dist: int = 1,
     user_yes_p: float = 0.5,
     user_none_of_them_p: float = 0.2,
+    early_stop: Optional[Tuple[Callable[[Dict], bool], int]] = None,
 ) -> Tuple[List[Dict], Dict]:
-    rng = random.Random(seed)
+    """
+    Simulate a single episode with its own RNG. Returns (records, stats) for that episode.
+
+    early_stop=(wanted, patience) ends the episode once `patience` consecutive records
+    fail `wanted` (quota mode). The records kept so far are unchanged by the cut.
+    """
+    rng = random.Random(_episode_seed(seed, episode_id))
     records: List[Dict] = []
-    tool_counts: Dict[str, int] = {"INTERACT": 0, "APPROACH": 0, "ALIGN_YAW": 0}
-    reply_stats: Dict = {
-        "user_replies_total": 0,
-        "user_replies_yes": 0,
-        "user_replies_no": 0,
-        "user_replies_none_of_them": 0,
-        "user_replies_mode_approach": 0,
-        "user_replies_mode_align_yaw": 0,
-        "user_silent_steps": 0,
-        "user_replies_by_context": {},
-    }
+    stats = _new_stats()
+
+    max_n = min(int(n_obj_max), len(OBJECT_LABELS))
+    min_n = max(2, min(int(n_obj_min), max_n))
+    n_obj = rng.randint(min_n, max_n)
+    ep = Episode(rng=rng, episode_id=episode_id, n_obj=n_obj, collision_p=collision_p)
+    state = OracleState(intended_obj_id=ep.intended_obj_id)
+    memory = _new_memory(ep.gripper_candidates(max_dist=candidate_max_dist))
+    misses = 0
+
+    for t in range(ep.T):
+        if state.terminate_episode:
+            break
+        # Snapshot before choosing the tool call.
+        memory["candidates"] = ep.gripper_candidates(max_dist=candidate_max_dist)
+        record, tool_call = _decide_and_respond(
+            episode_id,
+            ep,
+            [o.shared_record() for o in ep.objects],
+            [p.shared_record() for p in ep.gripper_hist],
+            memory,
+            state,
+            rng,
+            stats,
+            user_yes_p=user_yes_p,
+            user_none_of_them_p=user_none_of_them_p,
+        )
+        records.append(record)
+        if early_stop is not None:
+            wanted, patience = early_stop
+            misses = 0 if wanted(record) else misses + 1
+            if misses >= patience:
+                stats["quota"] = {"episodes_skipped_early": 1}
+                break
 
-    for episode_id in range(episodes):
-        max_n = min(int(n_obj_max), len(OBJECT_LABELS))
-        min_n = max(2, min(int(n_obj_min), max_n))
-        n_obj = rng.randint(min_n, max_n)
-        ep = Episode(rng=rng, episode_id=episode_id, n_obj=n_obj, collision_p=collision_p)
-        state = OracleState(intended_obj_id=ep.intended_obj_id)
-        memory: Dict = {
-            "n_interactions": 0,
-            "past_dialogs": [],
-            "candidates": ep.gripper_candidates(max_dist=candidate_max_dist),
-            "last_tool_calls": [],
-            "excluded_obj_ids": [],
-            "last_action": {},
-            # Store the last prompt (kind/text/choices + optional context) so the next-step
-            # decision is learnable without relying on hidden oracle state.
-            "last_prompt": {},
-        }
+        # Apply tool effects then simulate teleop toward intent.
+        ep.apply_tool(tool_call)
+        if t < ep.T - 1:
+            # If the assistant executed a non-interactive tool, the human is less likely
+            # to keep fighting the motion on the very next step. This reduces unrealistic
+            # "ALIGN_YAW spam" / oscillatory behavior.
+            skip_user_motion = tool_call["tool"] != "INTERACT" and rng.random() < 0.85
+            if not skip_user_motion:
+                ep.apply_user_motion()
+
+        # If we've reached the currently intended object pose (cell + yaw),
+        # stop the episode early. This makes APPROACH/ALIGN_YAW naturally "final"
+        # actions and avoids long post-goal chat loops.
+        intended = ep.get_obj(state.intended_obj_id)
+        g = ep.gripper_hist[-1]
+        if g.cell == intended.cell and g.yaw == intended.yaw:
+            break
+
+    return records, stats
+
+
+def _simulate_batch(
+    start: int,
+    stop: int,
+    seed: int,
+    *,
+    n_obj_min: int = 2,
+    n_obj_max: int = 10,
+    collision_p: float = 0.15,
+    candidate_max_dist: int = 1,
+    user_yes_p: float = 0.5,
+    user_none_of_them_p: float = 0.2,
+) -> List[Tuple[List[Dict], Dict]]:
+    """
+    Simulate episodes [start, stop) in lockstep on a `BatchEpisode` (engine="batch").
 
-        for t in range(ep.T):
+    World state (scene sampling, teleop motion, tool effects, candidates) is advanced with
+    vectorized NumPy ops on one generator seeded from (seed, start); the oracle and the
+    simulated user reply still run per episode, each with its own (seed, episode_id) RNG.
+    Returns per-episode (records, stats) in episode order.
+    """
+    import numpy as np
+
+    from .batch_episode import TOOL_CODES, TOOL_NONE, BatchEpisode, EpisodeView
+
+    ids = list(range(int(start), int(stop)))
+    B = len(ids)
+    if B == 0:
+        return []
+    nrng = np.random.default_rng([_episode_seed(seed, ids[0]), B])
+    max_n = min(int(n_obj_max), len(OBJECT_LABELS))
+    min_n = max(2, min(int(n_obj_min), max_n))
+    batch = BatchEpisode(nrng, nrng.integers(min_n, max_n, endpoint=True, size=B), collision_p=collision_p)
+
+    rngs = [random.Random(_episode_seed(seed, episode_id)) for episode_id in ids]
+    objects = [batch.objects(b) for b in range(B)]
+    states = [OracleState(intended_obj_id=f"o{i}") for i in batch.intended.tolist()]
+    memories = [_new_memory(c) for c in batch.candidate_lists(max_dist=candidate_max_dist)]
+    records: List[List[Dict]] = [[] for _ in range(B)]
+    stats = [_new_stats() for _ in range(B)]
+
+    T = batch.T
+    goal = batch.intended.copy()
+    tool = np.zeros(B, dtype=np.int8)
+    target = np.zeros(B, dtype=np.int64)
+    active = np.ones(B, dtype=bool)
+    for t in range(int(T.max())):
+        active &= t < T
+        if not active.any():
+            break
+        # Snapshot before choosing the tool calls (materialized for active rows only).
+        rows = np.flatnonzero(active).tolist()
+        candidates = batch.candidate_lists(max_dist=candidate_max_dist, rows=rows)
+        hists = batch.gripper_hist_records(rows)
+        tool[:] = TOOL_NONE
+        for b, cands, hist in zip(rows, candidates, hists):
+            state = states[b]
             if state.terminate_episode:
-                break
-            # Snapshot before choosing the tool call.
-            memory["candidates"] = ep.gripper_candidates(max_dist=candidate_max_dist)
-            gripper_hist = [p.to_record() for p in ep.gripper_hist]
-            record = {
-                "episode_id": episode_id,
-                "objects": [o.to_record() for o in ep.objects],
-                "gripper_hist": gripper_hist,
-                "memory": _deepcopy_memory(memory),
-                "user_state": {"mode": _infer_user_mode_from_gripper_hist(gripper_hist)},
-            }
-
-            tool_call = oracle_decide_tool(
-                record["objects"],
-                record["gripper_hist"],
+                active[b] = False
+                continue
+            memory = memories[b]
+            memory["candidates"] = cands
+            view = EpisodeView(objects[b], [Pose(**hist[-1])], objects[b][int(batch.intended[b])].id)
+            record, tool_call = _decide_and_respond(
+                ids[b],
+                view,
+                [o.shared_record() for o in objects[b]],
+                hist,
                 memory,
                 state,
-                user_state=record["user_state"],
-            )
-            validate_tool_call(tool_call)
-            record["target_tool_call"] = tool_call
-            _schema_validate_record(record)
-            records.append(record)
-
-            tool_counts[tool_call["tool"]] += 1
-
-            # Update dialog and interaction counters.
-            if tool_call["tool"] == "INTERACT":
-                memory["n_interactions"] += 1
-                memory["past_dialogs"].append({"role": "assistant", "content": tool_call["args"]["text"]})
-                # Persist the full prompt + options (and oracle-provided context when available).
-                # This matches what the interactive GUI keeps in memory.
-                memory["last_prompt"] = {
-                    "kind": tool_call["args"].get("kind"),
-                    "text": tool_call["args"].get("text"),
-                    "choices": list(tool_call["args"].get("choices") or []),
-                    # Context is optional metadata that helps interpret user replies like "1"/"2"
-                    # and disambiguate prompt types (confirm vs help vs candidate_choice).
-                    "context": dict(state.last_prompt_context or {}),
-                }
-
-            _simulate_user_response(
-                rng,
-                tool_call,
-                ep,
-                memory,
-                state,
-                stats=reply_stats,
-                yes_p=float(user_yes_p),
-                none_of_them_p=float(user_none_of_them_p),
+                rngs[b],
+                stats[b],
+                user_yes_p=user_yes_p,
+                user_none_of_them_p=user_none_of_them_p,
             )
+            records[b].append(record)
+            code = TOOL_CODES[tool_call["tool"]]
+            tool[b] = code
+            if code != TOOL_NONE:
+                target[b] = int(tool_call["args"]["obj"][1:])
+            goal[b] = int(state.intended_obj_id[1:])
+
+        # Apply tool effects then simulate teleop toward intent (see _simulate_episode).
+        batch.apply_tools(tool, target, mask=active)
+        skip_user_motion = (tool != TOOL_NONE) & (nrng.random(B) < 0.85)
+        batch.apply_user_motion(mask=active & (t < T - 1) & ~skip_user_motion)
+        active &= ~batch.reached(goal)
+
+    return list(zip(records, stats))
+
+
+ENGINES: Tuple[str, ...] = ("episode", "batch")
+
+
+# (wanted, patience) for _simulate_episode's early stop; must be picklable for the pool.
+EarlyStop = Optional[Tuple[Callable[[Dict], bool], int]]
+
+
+def _simulate_shard(job: Tuple[int, int, int, Dict, str, EarlyStop]) -> List[Tuple[List[Dict], Dict]]:
+    """
+    Process-pool entry point: simulate episodes [start, stop) and return per-episode results.
+    """
+    start, stop, seed, params, engine, early_stop = job
+    return _run_shard(start, stop, seed, params, engine, early_stop)
 
-            # Maintain a short history of tool calls for memory logging.
-            memory["last_tool_calls"].append(tool_call["tool"])
-            memory["last_tool_calls"] = memory["last_tool_calls"][-3:]
-
-            # Apply tool effects then simulate teleop toward intent.
-            ep.apply_tool(tool_call)
-            if tool_call["tool"] in {"APPROACH", "ALIGN_YAW"}:
-                memory["last_action"] = {"tool": tool_call["tool"], "obj": tool_call["args"]["obj"]}
-            if t < ep.T - 1:
-                # If the assistant executed a non-interactive tool, the human is less likely
-                # to keep fighting the motion on the very next step. This reduces unrealistic
-                # "ALIGN_YAW spam" / oscillatory behavior.
-                skip_user_motion = tool_call["tool"] != "INTERACT" and rng.random() < 0.85
-                if not skip_user_motion:
-                    ep.apply_user_motion()
-
-            # If we've reached the currently intended object pose (cell + yaw),
-            # stop the episode early. This makes APPROACH/ALIGN_YAW naturally "final"
-            # actions and avoids long post-goal chat loops.
-            intended = ep.get_obj(state.intended_obj_id)
-            g = ep.gripper_hist[-1]
-            if g.cell == intended.cell and g.yaw == intended.yaw:
+
+def _run_shard(
+    start: int,
+    stop: int,
+    seed: int,
+    params: Dict,
+    engine: str,
+    early_stop: EarlyStop = None,
+) -> List[Tuple[List[Dict], Dict]]:
+    if engine == "batch":
+        # Lockstep batches run every episode to the end; quotas only filter their records.
+        return _simulate_batch(start, stop, seed, **params)
+    return [
+        _simulate_episode(episode_id, seed, early_stop=early_stop, **params)
+        for episode_id in range(start, stop)
+    ]
+
+
+def _shard_bounds(episodes: int, workers: int, first_episode: int = 0) -> List[Tuple[int, int]]:
+    # Several shards per worker keeps the pool busy when episode lengths vary.
+    size = max(1, min(512, -(-int(episodes) // (int(workers) * 8))))
+    stop = int(first_episode) + int(episodes)
+    return [(s, min(s + size, stop)) for s in range(int(first_episode), stop, size)]
+
+
+def _iter_episode_results(
+    episodes: int,
+    seed: int,
+    params: Dict,
+    workers: int,
+    *,
+    engine: str = "episode",
+    batch_size: int = 1024,
+    first_episode: int = 0,
+    early_stop: Optional[Callable[[], EarlyStop]] = None,
+) -> Iterator[Tuple[List[Dict], Dict]]:
+    """
+    Yield (records, stats) per episode in episode order, for episode ids
+    [first_episode, first_episode + episodes).
+
+    With workers > 1, only a bounded window of shards is in flight at once, so memory
+    stays proportional to the window rather than to the dataset size. For the batch
+    engine every shard is one lockstep batch of `batch_size` episodes.
+
+    `early_stop()` is polled for the current (wanted, patience) before each episode
+    in-process, or before each shard is submitted to the pool.
+    """
+    poll = early_stop if early_stop is not None else (lambda: None)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r} (expected one of {ENGINES})")
+    first, stop = int(first_episode), int(first_episode) + int(episodes)
+    if engine == "batch":
+        size = max(1, int(batch_size))
+        bounds_list = [(s, min(s + size, stop)) for s in range(first, stop, size)]
+    elif int(workers) <= 1 or int(episodes) <= 1:
+        for episode_id in range(first, stop):
+            yield _simulate_episode(episode_id, seed, early_stop=poll(), **params)
+        return
+    else:
+        bounds_list = _shard_bounds(episodes, workers, first)
+
+    if int(workers) <= 1 or len(bounds_list) <= 1:
+        for start, stop in bounds_list:
+            yield from _run_shard(start, stop, int(seed), params, engine, poll())
+        return
+
+    bounds = iter(bounds_list)
+    with ProcessPoolExecutor(max_workers=int(workers)) as pool:
+        in_flight: Deque[Future] = deque()
+
+        def submit(start: int, stop: int) -> Future:
+            return pool.submit(_simulate_shard, (start, stop, int(seed), params, engine, poll()))
+
+        for start, stop in bounds:
+            in_flight.append(submit(start, stop))
+            if len(in_flight) >= 2 * int(workers):
                 break
+        while in_flight:
+            shard = in_flight.popleft().result()
+            nxt = next(bounds, None)
+            if nxt is not None:
+                in_flight.append(submit(*nxt))
+            yield from shard
+
+
+def iter_generate(
+    episodes: int,
+    seed: int,
+    *,
+    stats: Optional[Dict] = None,
+    n_obj_min: int = 2,
+    n_obj_max: int = 10,
+    collision_p: float = 0.15,
+    candidate_max_dist: int = 1,
+    user_yes_p: float = 0.5,
+    user_none_of_them_p: float = 0.2,
+    workers: int = 1,
+    engine: str = "episode",
+    batch_size: int = 1024,
+    symmetry_dedup: bool = False,
+    symmetry_augment: bool = False,
+    first_episode: int = 0,
+    quotas: Optional[Dict[str, int]] = None,
+    quota_patience: int = 0,
+    materialize: bool = True,
+) -> Iterator[Dict]:
+    """
+    Streaming form of `generate()`: yields records one at a time, in episode order.
+
+    Records are plain dicts that share nothing with each other. materialize=False instead
+    yields the generator's internal records: "memory" is the read-only MemorySnapshot that
+    shares the episode's dialog log, and object/pose dicts are shared across timesteps.
+    That is cheaper for writers that serialize with `episode.write_jsonl` /
+    `memory_log.record_to_json`; treat those records as read-only.
+
+    If `stats` is given, per-episode counters are merged into it as episodes complete,
+    so it holds the full dataset statistics once the iterator is exhausted.
+
+    symmetry_dedup drops records that are grid/yaw-symmetric copies of an earlier record;
+    symmetry_augment then adds the distinct symmetric copies of every record (up to 8x,
+    without re-simulating). See symmetry.py. Counts go to stats["symmetry"]; the other
+    counters describe the simulated records only.
+
+    quotas={pattern: count} switches to coverage-targeted generation (see quota.py):
+    `episodes` becomes an upper bound, only records that fill a still-open bucket are
+    kept, and generation stops as soon as every quota is met. quota_patience > 0 also cuts
+    an episode short after that many consecutive records that would not be kept; keep it
+    well above 1, since deep dialog contexts are only reached through unkept prefixes.
+    Fill state goes to stats["quota"]; the other counters cover every simulated record.
+    """
+    params = {
+        "n_obj_min": int(n_obj_min),
+        "n_obj_max": int(n_obj_max),
+        "collision_p": float(collision_p),
+        "candidate_max_dist": int(candidate_max_dist),
+        "user_yes_p": float(user_yes_p),
+        "user_none_of_them_p": float(user_none_of_them_p),
+    }
+    if stats is not None:
+        _merge_counts(stats, _new_stats())
+
+    quota = Quotas(quotas) if quotas else None
+    patience = int(quota_patience)
+    n_simulated = 0
+    n_cut = 0
+
+    def simulated() -> Iterator[Dict]:
+        nonlocal n_simulated, n_cut
+        for ep_records, ep_stats in _iter_episode_results(
+            episodes,
+            seed,
+            params,
+            workers,
+            engine=engine,
+            batch_size=batch_size,
+            first_episode=first_episode,
+            early_stop=(lambda: (quota.filter(), patience)) if quota is not None and patience > 0 else None,
+        ):
+            if stats is not None:
+                _merge_counts(stats, ep_stats)
+            if quota is None:
+                yield from ep_records
+                continue
+            n_simulated += 1
+            n_cut += int(ep_stats.get("quota", {}).get("episodes_skipped_early", 0))
+            for r in ep_records:
+                if quota.offer(r):
+                    yield r
+            if quota.complete:
+                return
+
+    records = simulated()
+    if symmetry_dedup or symmetry_augment:
+        sym_stats = {"duplicates_dropped": 0, "augmented": 0}
+        if stats is not None:
+            sym_stats = stats.setdefault("symmetry", sym_stats)
+        if symmetry_dedup:
+            records = symmetry.dedup(records, sym_stats)
+        if symmetry_augment:
+            records = symmetry.augment(records, sym_stats)
+    if materialize:
+        records = (detach_record(r) for r in records)
+    yield from records
+    if stats is not None and quota is not None:
+        stats["quota"] = quota.report(n_simulated, n_cut)
+
+
+def generate(
+    episodes: int,
+    seed: int,
+    *,
+    n_obj_min: int = 2,
+    n_obj_max: int = 10,
+    collision_p: float = 0.15,
+    candidate_max_dist: int = 1,
+    user_yes_p: float = 0.5,
+    user_none_of_them_p: float = 0.2,
+    workers: int = 1,
+    engine: str = "episode",
+    batch_size: int = 1024,
+    symmetry_dedup: bool = False,
+    symmetry_augment: bool = False,
+    first_episode: int = 0,
+    quotas: Optional[Dict[str, int]] = None,
+    quota_patience: int = 0,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Generate `episodes` scripted episodes with ids [first_episode, first_episode + episodes).
+
+    Every episode draws from its own RNG derived from (seed, episode_id), so the output is
+    identical for any `workers` count, and with the default engine any id range can be
+    regenerated on its own (see `generate_episode`). With workers > 1, episodes are simulated in shards on a
+    process pool and merged back in episode order.
+
+    engine="batch" advances `batch_size` episodes in lockstep with vectorized NumPy world
+    updates (see batch_episode.py). Its trajectories are statistically equivalent to the
+    default engine but not sample-identical; they depend on (seed, first_episode, batch_size).
 
-        # Reset per-episode flags that should not leak; none currently.
-        state.last_tool_calls.clear()
+    With `quotas`, `episodes` is an upper bound (see `iter_generate`).
 
-    stats = {"tool_distribution": tool_counts, "user_reply_distribution": reply_stats}
+    This materializes all records; use `iter_generate()` to stream large datasets.
+    """
+    stats: Dict = {}
+    records = list(
+        iter_generate(
+            episodes,
+            seed,
+            stats=stats,
+            n_obj_min=n_obj_min,
+            n_obj_max=n_obj_max,
+            collision_p=collision_p,
+            candidate_max_dist=candidate_max_dist,
+            user_yes_p=user_yes_p,
+            user_none_of_them_p=user_none_of_them_p,
+            workers=workers,
+            engine=engine,
+            batch_size=batch_size,
+            symmetry_dedup=symmetry_dedup,
+            symmetry_augment=symmetry_augment,
+            first_episode=first_episode,
+            quotas=quotas,
+            quota_patience=quota_patience,
+        )
+    )
     return records, stats
 
 
+def generate_episode(seed: int, episode_id: int, **params) -> List[Dict]:
+    """
+    Regenerate the records of one episode, exactly as `generate(..., seed=seed)` produced
+    them for `episode_id` with the same generator params (default engine). Cost is one
+    episode, independent of `episode_id`.
+    """
+    records, _ = _simulate_episode(int(episode_id), int(seed), **params)
+    return [detach_record(r) for r in records]
+
+
 def main(argv: Optional[List[str]] = None) -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--episodes", type=int, required=True)
+    ap.add_argument(
+        "--first_episode",
+        type=int,
+        default=0,
+        help="Id of the first episode; generates ids [first_episode, first_episode + episodes).",
+    )
     ap.add_argument("--out", type=str, required=True)
+    ap.add_argument(
+        "--format",
+        choices=GENERATOR_FORMATS,
+        default="jsonl",
+        help="Output layout: 'jsonl' (one record per line) or 'delta' (one compact line per episode, see data_generator/delta.py).",
+    )
     ap.add_argument("--seed", type=int, default=0)
     ap.add_argument("--n_obj_min", type=int, default=2)
     ap.add_argument("--n_obj_max", type=int, default=10)
@@ -446,9 +886,41 @@ def main(argv: Optional[List[str]] = None) -> None:
         default=0.2,
         help="Simulated user probability of choosing 'None of them' on candidate-choice prompts (target ~0.2 for 80/20 object vs none).",
     )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Simulate episodes on N worker processes (output is identical for any N).",
+    )
+    ap.add_argument(
+        "--quota",
+        type=str,
+        default=None,
+        help=(
+            "Coverage quotas as JSON (inline or a .json path): {\"tool:context:mode:cands\": count}, '*' wildcards. "
+            "Stops once all are met; --episodes becomes the upper bound."
+        ),
+    )
+    ap.add_argument(
+        "--quota_patience",
+        type=int,
+        default=0,
+        help="In quota mode, cut an episode after N consecutive records that fill no open quota (0 = never).",
+    )
+    ap.add_argument(
+        "--symmetry_dedup",
+        action="store_true",
+        help="Drop records that are rotated/mirrored copies of an earlier record.",
+    )
+    ap.add_argument(
+        "--symmetry_augment",
+        action="store_true",
+        help="Add the rotated/mirrored copies of every record (up to 8x, no re-simulation).",
+    )
     args = ap.parse_args(argv)
 
-    records, stats = generate(
+    stats: Dict = {}
+    records = iter_generate(
         episodes=args.episodes,
         seed=args.seed,
         n_obj_min=args.n_obj_min,
@@ -457,9 +929,21 @@ def main(argv: Optional[List[str]] = None) -> None:
         candidate_max_dist=args.candidate_max_dist,
         user_yes_p=float(args.user_yes_p),
         user_none_of_them_p=float(args.user_none_of_them_p),
+        workers=int(args.workers),
+        symmetry_dedup=bool(args.symmetry_dedup),
+        symmetry_augment=bool(args.symmetry_augment),
+        first_episode=int(args.first_episode),
+        quotas=load_quotas(args.quota) if args.quota else None,
+        quota_patience=int(args.quota_patience),
+        materialize=False,
+        stats=stats,
     )
     os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
-    write_jsonl(args.out, records)
+    # Stream records to disk; stats are complete once the writer has drained the iterator.
+    if args.format == "delta":
+        write_delta_jsonl(args.out, records)
+    else:
+        write_jsonl(args.out, records)
     with open(args.out + ".stats.json", "w", encoding="utf-8") as f:
         json.dump(stats, f, indent=2, sort_keys=True)
 
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 
 ROWS: Tuple[str, ...] = ("A", "B", "C")
 COLS: Tuple[int, ...] = (1, 2, 3)
 CELLS: Tuple[str, ...] = tuple(f"{r}{c}" for r in ROWS for c in COLS)
+N_CELLS: int = len(CELLS)
 
 
 @dataclass(frozen=True, slots=True)
@@ -26,25 +27,106 @@ class Cell:
             raise ValueError(f"Invalid cell label: {label!r}")
         return Cell(ROWS.index(row), int(col) - 1)
 
+    def to_id(self) -> int:
+        return self.r * len(COLS) + self.c
+
+
+# -----------------------------------------------------------------------------
+# Integer cell-id API.
+#
+# Cells are numbered row-major (A1=0, A2=1, ..., C3=8). All pairwise relations are
+# precomputed once at import, so the hot paths (candidate ranking, teleop simulation)
+# are plain tuple lookups instead of label parsing.
+# -----------------------------------------------------------------------------
+
+CELL_INDEX: Dict[str, int] = {label: i for i, label in enumerate(CELLS)}
+
+
+def _build_tables() -> Tuple[
+    Tuple[Tuple[int, ...], ...],
+    Tuple[Tuple[bool, ...], ...],
+    Tuple[Tuple[int, ...], ...],
+    Tuple[Tuple[int, ...], ...],
+]:
+    n_rows, n_cols = len(ROWS), len(COLS)
+    coords = [(i // n_cols, i % n_cols) for i in range(N_CELLS)]
+    dist = tuple(tuple(abs(ra - rb) + abs(ca - cb) for rb, cb in coords) for ra, ca in coords)
+    same_line = tuple(tuple(ra == rb or ca == cb for rb, cb in coords) for ra, ca in coords)
+
+    neigh: List[Tuple[int, ...]] = []
+    for r, c in coords:
+        out: List[int] = []
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < n_rows and 0 <= nc < n_cols:
+                out.append(nr * n_cols + nc)
+        neigh.append(tuple(out))
+
+    # Deterministic tie-breaking: prefer row moves, then col moves.
+    step: List[Tuple[int, ...]] = []
+    for r, c in coords:
+        row: List[int] = []
+        for tr, tc in coords:
+            nr, nc = r, c
+            if tr != r:
+                nr += 1 if tr > r else -1
+            elif tc != c:
+                nc += 1 if tc > c else -1
+            row.append(nr * n_cols + nc)
+        step.append(tuple(row))
+    return dist, same_line, tuple(neigh), tuple(step)
+
+
+DIST, SAME_LINE, NEIGHBORS, STEP = _build_tables()
+_NEIGHBOR_LABELS: Tuple[Tuple[str, ...], ...] = tuple(tuple(CELLS[j] for j in row) for row in NEIGHBORS)
+
+
+def cell_id(label: str) -> int:
+    """
+    Map a cell label (e.g. "B2", case-insensitive) to its integer id.
+    Raises ValueError for invalid labels.
+    """
+    i = CELL_INDEX.get(label)
+    if i is None:
+        i = Cell.from_label(label).to_id()
+    return i
+
+
+def cell_label(i: int) -> str:
+    return CELLS[i]
+
+
+def manhattan_id(a: int, b: int) -> int:
+    return DIST[a][b]
+
+
+def same_row_or_col_id(a: int, b: int) -> bool:
+    return SAME_LINE[a][b]
+
+
+def neighbors_id(cell: int) -> Tuple[int, ...]:
+    return NEIGHBORS[cell]
+
+
+def step_toward_id(current: int, target: int) -> int:
+    return STEP[current][target]
+
+
+# -----------------------------------------------------------------------------
+# String-label API (thin wrappers over the id tables).
+# -----------------------------------------------------------------------------
+
 
 def manhattan(a: str, b: str) -> int:
-    ca, cb = Cell.from_label(a), Cell.from_label(b)
-    return abs(ca.r - cb.r) + abs(ca.c - cb.c)
+    return DIST[cell_id(a)][cell_id(b)]
 
 
 def same_row_or_col(a: str, b: str) -> bool:
-    ca, cb = Cell.from_label(a), Cell.from_label(b)
-    return ca.r == cb.r or ca.c == cb.c
+    return SAME_LINE[cell_id(a)][cell_id(b)]
 
 
 def neighbors(cell: str) -> List[str]:
-    c = Cell.from_label(cell)
-    out: List[str] = []
-    for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-        nr, nc = c.r + dr, c.c + dc
-        if 0 <= nr < 3 and 0 <= nc < 3:
-            out.append(Cell(nr, nc).to_label())
-    return out
+    return list(_NEIGHBOR_LABELS[cell_id(cell)])
 
 
 def step_toward(current: str, target: str) -> str:
@@ -54,19 +136,11 @@ def step_toward(current: str, target: str) -> str:
     """
     if current == target:
         return current
-    cur, tgt = Cell.from_label(current), Cell.from_label(target)
-    dr, dc = tgt.r - cur.r, tgt.c - cur.c
-    nr, nc = cur.r, cur.c
-    if dr != 0:
-        nr += 1 if dr > 0 else -1
-    else:
-        nc += 1 if dc > 0 else -1
-    return Cell(nr, nc).to_label()
+    return CELLS[STEP[cell_id(current)][cell_id(target)]]
 
 
 def nearest_cells_by_distance(origin: str, candidates: Iterable[str]) -> List[Tuple[str, int]]:
-    items = [(cell, manhattan(origin, cell)) for cell in candidates]
+    row = DIST[cell_id(origin)]
+    items = [(cell, row[cell_id(cell)]) for cell in candidates]
     items.sort(key=lambda x: (x[1], x[0]))
     return items
-
-
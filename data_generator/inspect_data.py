@@ -1,25 +1,39 @@
 from __future__ import annotations
 
 import argparse
-import json
 import textwrap
 from collections import Counter, defaultdict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from .delta import iter_generator_jsonl
+
 
 def _load_jsonl(path: Path) -> List[Dict[str, Any]]:
+    # Per-step and episode-delta generator files both load as per-step rows.
+    return [row for _, row in iter_generator_jsonl(str(path))]
+
+
+def _episode_ids_from_mistakes(path: Path) -> List[int]:
+    """
+    Episode ids referenced by a `mistakes_*.jsonl` (contract ids are "<episode_id>_<line>"),
+    in first-seen order.
+    """
+    out: List[int] = []
+    for row in _load_jsonl(path):
+        head = str(row.get("id", "")).split("_", 1)[0]
+        if head.isdigit() and int(head) not in out:
+            out.append(int(head))
+    return out
+
+
+def _regenerate(seed: int, ep_ids: Sequence[int], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    from .generate_dataset import generate_episode
+
     rows: List[Dict[str, Any]] = []
-    with path.open("r", encoding="utf-8") as f:
-        for i, line in enumerate(f, start=1):
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rows.append(json.loads(line))
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON on line {i} in {path}: {e}") from e
+    for ep_id in ep_ids:
+        rows.extend(generate_episode(seed, ep_id, **params))
     return rows
 
 
@@ -296,7 +310,7 @@ def _summary(rows: Sequence[Dict[str, Any]]) -> None:
 
 def main(argv: Optional[List[str]] = None) -> None:
     ap = argparse.ArgumentParser(description="Inspect and summarize data_generator JSONL datasets.")
-    ap.add_argument("--path", type=str, required=True, help="Path to a .jsonl file.")
+    ap.add_argument("--path", type=str, default=None, help="Path to a .jsonl file (or use --seed to regenerate).")
     ap.add_argument("--episode", type=int, action="append", default=None, help="Episode id(s) to print.")
     ap.add_argument(
         "--episode-range",
@@ -312,6 +326,12 @@ def main(argv: Optional[List[str]] = None) -> None:
         default=1,
         help="Step for --episode-range (default: 1).",
     )
+    ap.add_argument(
+        "--mistakes",
+        type=str,
+        default=None,
+        help="mistakes_*.jsonl from the offline benchmark; prints the episodes its examples came from.",
+    )
     ap.add_argument("--max-t", type=int, default=None, help="Max timestep to print per episode.")
     ap.add_argument("--summary", action="store_true", help="Print dataset summary.")
     ap.add_argument("--show-objects", action="store_true", help="Print objects each step.")
@@ -319,17 +339,23 @@ def main(argv: Optional[List[str]] = None) -> None:
     ap.add_argument("--show-memory", action="store_true", help="Print memory snapshot and last dialog each step.")
     ap.add_argument("--max-text", type=int, default=140, help="Max chars for prompt/dialog text.")
     ap.add_argument("--wrap", type=int, default=120, help="Wrap width for long lines.")
+    regen = ap.add_argument_group(
+        "regenerate",
+        "Instead of reading --path, re-simulate only the requested episodes from the generator seed "
+        "(pass the same generator params the dataset was built with).",
+    )
+    regen.add_argument("--seed", type=int, default=None)
+    regen.add_argument("--n_obj_min", type=int, default=2)
+    regen.add_argument("--n_obj_max", type=int, default=10)
+    regen.add_argument("--collision_p", type=float, default=0.15)
+    regen.add_argument("--candidate_max_dist", type=int, default=1)
+    regen.add_argument("--user_yes_p", type=float, default=0.5)
+    regen.add_argument("--user_none_of_them_p", type=float, default=0.2)
     args = ap.parse_args(argv)
+    if (args.path is None) == (args.seed is None):
+        ap.error("pass exactly one of --path or --seed")
 
-    path = Path(args.path)
-    rows = _load_jsonl(path)
-    episodes = _episode_groups(rows)
-
-    if args.summary:
-        _summary(rows)
-
-    # Default: print a couple episodes if none are specified.
-    ep_ids: List[int]
+    ep_ids: Optional[List[int]] = None
     if args.episode:
         ep_ids = list(args.episode)
     elif args.episode_range:
@@ -340,7 +366,30 @@ def main(argv: Optional[List[str]] = None) -> None:
         if start > end:
             start, end = end, start
         ep_ids = list(range(start, end + 1, step))
+    elif args.mistakes:
+        ep_ids = _episode_ids_from_mistakes(Path(args.mistakes))
+
+    if args.seed is not None:
+        params = {
+            "n_obj_min": args.n_obj_min,
+            "n_obj_max": args.n_obj_max,
+            "collision_p": args.collision_p,
+            "candidate_max_dist": args.candidate_max_dist,
+            "user_yes_p": args.user_yes_p,
+            "user_none_of_them_p": args.user_none_of_them_p,
+        }
+        # Each episode has its own (seed, episode_id) RNG: cost is O(requested episodes).
+        ep_ids = ep_ids if ep_ids is not None else [0, 1, 2]
+        rows = _regenerate(int(args.seed), ep_ids, params)
     else:
+        rows = _load_jsonl(Path(args.path))
+    episodes = _episode_groups(rows)
+
+    if args.summary:
+        _summary(rows)
+
+    # Default: print a couple episodes if none are specified.
+    if ep_ids is None:
         ep_ids = sorted(episodes.keys())[:3]
 
     for ep_id in ep_ids:
@@ -0,0 +1,145 @@
+"""
+Shared JSONL I/O. Paths ending in ".gz" or ".zst" are decompressed on read and
+compressed on write, chosen by extension; everything else is plain UTF-8 text.
+
+.zst needs the optional `zstandard` package (`pip install "grasp-copilot[zstd]"`); it
+compresses on all cores and is the better choice for large generator/contract files.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+from contextlib import ExitStack, contextmanager
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+COMPRESSED_SUFFIXES: Tuple[str, ...] = (".gz", ".zst")
+# Large buffers: JSONL lines are small and numerous, so this keeps syscalls (and, for
+# compressed files, codec calls) per megabyte low.
+BUFFER_SIZE = 1 << 20
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def compression_suffix(path: PathLike) -> str:
+    """
+    The compression extension of `path` ("" for plain files).
+    """
+    p = os.fspath(path)
+    for suffix in COMPRESSED_SUFFIXES:
+        if p.endswith(suffix):
+            return suffix
+    return ""
+
+
+def add_suffix(path: PathLike, suffix: str) -> str:
+    """
+    `path + suffix`, placed before a compression extension so the result is still read
+    with the same codec: ("a.jsonl.gz", ".tmp") -> "a.jsonl.tmp.gz".
+    """
+    p = os.fspath(path)
+    comp = compression_suffix(p)
+    return p[: len(p) - len(comp)] + suffix + comp
+
+
+def _zstandard():
+    try:
+        import zstandard  # type: ignore[import]
+    except ImportError as e:
+        raise RuntimeError("Reading/writing .zst files requires zstandard. Install it (e.g. `pip install zstandard`).") from e
+    return zstandard
+
+
+def open_jsonl(path: PathLike, mode: str = "r") -> IO[str]:
+    """
+    Open a (possibly compressed) JSONL file as buffered text. `mode` is "r" or "w".
+    """
+    if mode not in ("r", "w"):
+        raise ValueError(f"Unsupported mode {mode!r} (expected 'r' or 'w')")
+    p = os.fspath(path)
+    suffix = compression_suffix(p)
+    if suffix == ".gz":
+        raw = gzip.GzipFile(p, mode + "b", compresslevel=GZIP_LEVEL)
+        buffered = io.BufferedReader(raw, BUFFER_SIZE) if mode == "r" else io.BufferedWriter(raw, BUFFER_SIZE)
+        return io.TextIOWrapper(buffered, encoding="utf-8")
+    if suffix == ".zst":
+        zstd = _zstandard()
+        fh = open(p, mode + "b")
+        if mode == "r":
+            stream = zstd.ZstdDecompressor().stream_reader(fh, read_size=BUFFER_SIZE, read_across_frames=True)
+        else:
+            # threads=-1: one compression worker per logical CPU.
+            stream = zstd.ZstdCompressor(level=ZSTD_LEVEL, threads=-1).stream_writer(fh, write_size=BUFFER_SIZE)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(p, mode, encoding="utf-8", buffering=BUFFER_SIZE)
+
+
+def iter_jsonl(path: PathLike) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (line_no, object) for every non-blank line; line numbers count blank lines too.
+    """
+    p = os.fspath(path)
+    with open_jsonl(p, "r") as f:
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except Exception as e:
+                raise ValueError(f"{p}:{i}: Invalid JSON: {e}") from e
+            if not isinstance(obj, dict):
+                raise ValueError(f"{p}:{i}: Expected JSON object per line")
+            yield i, obj
+
+
+def _dumps(row: Any) -> str:
+    return json.dumps(row, ensure_ascii=False)
+
+
+@contextmanager
+def atomic_outputs() -> Iterator[Callable[[PathLike], IO[str]]]:
+    """
+    Yield `open_out(path)`, which opens a JSONL output for writing at its ".tmp" sibling
+    (see `add_suffix`). When the block exits normally every output is closed and replaces
+    its destination; on an error the temporaries are removed and the destinations (and
+    any previous files there) are left untouched.
+    """
+    pending: List[Tuple[str, str]] = []
+    stack = ExitStack()
+
+    def open_out(path: PathLike) -> IO[str]:
+        tmp = add_suffix(path, ".tmp")
+        pending.append((tmp, os.fspath(path)))
+        return stack.enter_context(open_jsonl(tmp, "w"))
+
+    try:
+        with stack:
+            yield open_out
+    except BaseException:
+        for tmp, _ in pending:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    for tmp, path in pending:
+        os.replace(tmp, path)
+
+
+def write_jsonl(path: PathLike, rows: Iterable[Any], encode: Callable[[Any], str] = _dumps) -> int:
+    """
+    Stream `rows` to `path`, one `encode(row)` per line; returns the number of rows.
+
+    Written through `atomic_outputs`, so a failure mid-stream leaves no partial file (and
+    any previous `path` intact).
+    """
+    n = 0
+    with atomic_outputs() as open_out:
+        f = open_out(path)
+        for r in rows:
+            f.write(encode(r) + "\n")
+            n += 1
+    return n
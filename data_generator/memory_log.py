@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List
+
+
+class DialogLog(list):
+    """
+    Append-only dialog history (`memory["past_dialogs"]`).
+
+    Because entries are never rewritten, a snapshot only needs a length marker into the
+    log (see MemorySnapshot), and each entry is JSON-encoded at most once no matter how
+    many records include it.
+    """
+
+    __slots__ = ("_enc",)
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self._enc: List[str] = []
+
+    def fragments(self, n: int) -> List[str]:
+        """
+        JSON encodings of the first `n` entries (cached, extended on demand).
+        """
+        enc = self._enc
+        while len(enc) < n:
+            enc.append(json.dumps(self[len(enc)], ensure_ascii=False))
+        return enc[:n]
+
+    def to_json(self, n: int) -> str:
+        """
+        Same text as `json.dumps(self[:n], ensure_ascii=False)`.
+        """
+        return "[" + ", ".join(self.fragments(n)) + "]"
+
+
+def _append_only(name: str):
+    def method(self, *args, **kwargs):
+        raise TypeError(f"DialogLog is append-only ({name} is not supported)")
+
+    method.__name__ = name
+    return method
+
+
+for _name in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "insert", "pop", "remove", "clear", "sort", "reverse"):
+    setattr(DialogLog, _name, _append_only(_name))
+
+
+class MemorySnapshot(Mapping):
+    """
+    Read-only snapshot of a generator `memory` dict at one timestep.
+
+    `past_dialogs` is stored as (log, length) and shares the episode's DialogLog, so taking
+    a snapshot is O(1) in the dialog length instead of copying the growing list every
+    step. The small bounded fields are shallow-copied, like the old per-step deep copy.
+    Key order and values match that copy exactly; `to_dict()` / `to_json()` materialize
+    it only when a plain dict or serialized text is needed.
+    """
+
+    __slots__ = ("_log", "_n", "_values")
+
+    # Keys in serialization order; values (except past_dialogs) are stored in a tuple.
+    _KEYS = ("n_interactions", "past_dialogs", "candidates", "last_tool_calls", "excluded_obj_ids", "last_action", "last_prompt")
+    _INDEX = {k: i for i, k in enumerate(_KEYS)}
+
+    def __init__(self, memory: Dict):
+        log = memory["past_dialogs"]
+        if not isinstance(log, DialogLog):
+            log = DialogLog(log)
+        self._log: DialogLog = log
+        self._n = len(log)
+        values = (
+            int(memory["n_interactions"]),
+            None,
+            list(memory["candidates"]),
+            list(memory["last_tool_calls"]),
+            list(memory.get("excluded_obj_ids") or []),
+            dict(memory.get("last_action") or {}),
+        )
+        # Optional-but-important training context: the last assistant prompt shown to the user
+        # (including the choice list). The GUI runtime also maintains this field.
+        last_prompt = memory.get("last_prompt")
+        if isinstance(last_prompt, dict):
+            values += (dict(last_prompt),)
+        self._values = values
+
+    def __getitem__(self, key: str):
+        i = self._INDEX.get(key)
+        if i is None or i >= len(self._values):
+            raise KeyError(key)
+        if i == 1:
+            return self._log[: self._n]
+        return self._values[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS[: len(self._values)])
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def n_dialogs(self) -> int:
+        return self._n
+
+    def __repr__(self) -> str:
+        return f"MemorySnapshot({self.to_dict()!r})"
+
+    def replace(self, **values) -> "MemorySnapshot":
+        """
+        Copy of this snapshot with some non-dialog fields replaced (same dialog log/length).
+        """
+        out = MemorySnapshot.__new__(MemorySnapshot)
+        out._log, out._n = self._log, self._n
+        fields = list(self._values)
+        for k, v in values.items():
+            i = self._INDEX.get(k)
+            if i is None or i == 1 or i >= len(fields):
+                raise KeyError(k)
+            fields[i] = v
+        out._values = tuple(fields)
+        return out
+
+    def to_dict(self) -> Dict:
+        out = dict(zip(self._KEYS, self._values))
+        out["past_dialogs"] = self._log[: self._n]
+        return out
+
+    def to_json(self) -> str:
+        """
+        Same text as `json.dumps(self.to_dict(), ensure_ascii=False)`, built from the
+        log's cached entry encodings.
+        """
+        parts = []
+        for k, v in zip(self._KEYS, self._values):
+            enc = self._log.to_json(self._n) if k == "past_dialogs" else json.dumps(v, ensure_ascii=False)
+            parts.append(f"{json.dumps(k, ensure_ascii=False)}: {enc}")
+        return "{" + ", ".join(parts) + "}"
+
+
+# Below this dialog length the C encoder over a materialized dict is faster than splicing
+# cached per-entry fragments in Python; above it, re-encoding the shared prefix dominates.
+FRAGMENT_MIN_DIALOGS = 64
+
+
+def record_to_json(record: Dict) -> str:
+    """
+    Serialize a generator record; byte-identical to `json.dumps(record, ensure_ascii=False)`
+    with the memory snapshot materialized.
+    """
+    mem = record.get("memory")
+    if not isinstance(mem, MemorySnapshot) or mem.n_dialogs < FRAGMENT_MIN_DIALOGS:
+        return json.dumps(materialize_record(record), ensure_ascii=False)
+    parts = []
+    for k, v in record.items():
+        enc = mem.to_json() if k == "memory" else json.dumps(v, ensure_ascii=False)
+        parts.append(f"{json.dumps(k, ensure_ascii=False)}: {enc}")
+    return "{" + ", ".join(parts) + "}"
+
+
+def materialize_record(record: Dict) -> Dict:
+    """
+    Return `record` with a MemorySnapshot replaced by a plain dict (same key order).
+    """
+    mem = record.get("memory")
+    if not isinstance(mem, MemorySnapshot):
+        return record
+    return {k: (mem.to_dict() if k == "memory" else v) for k, v in record.items()}
+
+
+def _copy_plain(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _copy_plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_plain(v) for v in value]
+    return value
+
+
+def detach_record(record: Dict) -> Dict:
+    """
+    `materialize_record` plus fresh copies of every nested dict and list, so the result
+    shares nothing with other records (generator records share object/pose dicts and
+    dialog entries across timesteps) and can be mutated freely.
+    """
+    out = {}
+    for k, v in record.items():
+        if k in ("objects", "gripper_hist") and isinstance(v, list):
+            # Lists of flat dicts: one shallow copy each.
+            out[k] = [dict(d) if isinstance(d, dict) else _copy_plain(d) for d in v]
+        elif k == "memory" and isinstance(v, MemorySnapshot):
+            out[k] = {
+                mk: [dict(e) for e in mv] if mk == "past_dialogs" else _copy_plain(mv) for mk, mv in v.to_dict().items()
+            }
+        else:
+            out[k] = _copy_plain(v)
+    return out
@@ -41,19 +41,13 @@ def _interact(kind: str, text: str, choices: List[str], context: Dict, state: Or
 
 
 def _rank_candidates(objects: Sequence[Dict], candidates: Sequence[str], gripper_cell: str) -> List[Dict]:
-    available = [o for o in objects if o["id"] in set(candidates) and not o["is_held"]]
-    scored = [(o, grid.manhattan(gripper_cell, o["cell"])) for o in available]
+    candidate_ids = set(candidates)
+    dist_row = grid.DIST[grid.cell_id(gripper_cell)]
+    scored = [(o, dist_row[grid.cell_id(o["cell"])]) for o in objects if o["id"] in candidate_ids and not o["is_held"]]
     scored.sort(key=lambda x: (x[1], x[0]["id"]))
     return [o for o, _ in scored]
 
 
-def _top_two_candidates(objects: Sequence[Dict], candidates: Sequence[str], gripper_cell: str) -> Optional[List[Dict]]:
-    ranked = _rank_candidates(objects, candidates, gripper_cell)
-    if len(ranked) < 2:
-        return None
-    return [ranked[0], ranked[1]]
-
-
 def _has_yaw_oscillation(gripper_hist: Sequence[Dict]) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
     """
     Returns (triggered, cell, yaw1, yaw2) to support yaw-struggle prompts.
@@ -122,46 +116,130 @@ def _effective_mode(user_state: Optional[UserState], gripper_hist: Sequence[Dict
     return "translation" if (score % 2 == 0) else "rotation"
 
 
-def _emit_intent_gate(
-    objects: Sequence[Dict],
-    gripper_hist: Sequence[Dict],
-    memory: Dict,
-    state: OracleState,
-    *,
-    user_state: Optional[UserState],
-) -> Optional[Dict]:
+_UNSET = object()
+
+
+class _OracleContext:
+    """
+    Per-call view of the oracle inputs. Everything derived from (objects, gripper_hist,
+    memory, user_state) is computed at most once and shared by all decision branches,
+    including the intent gate. The inputs must not change during the call; only
+    OracleState is mutated by the oracle.
+    """
+
+    __slots__ = (
+        "objects",
+        "gripper_hist",
+        "memory",
+        "current_cell",
+        "current_yaw",
+        "candidates",
+        "_user_state",
+        "_mode",
+        "_objects_by_id",
+        "_ranked",
+        "_yaw_osc",
+        "_yaw_target",
+    )
+
+    def __init__(
+        self,
+        objects: Sequence[Dict],
+        gripper_hist: Sequence[Dict],
+        memory: Dict,
+        user_state: Optional[UserState],
+    ):
+        self.objects = objects
+        self.gripper_hist = gripper_hist
+        self.memory = memory
+        self.current_cell = gripper_hist[-1]["cell"]
+        self.current_yaw = gripper_hist[-1]["yaw"]
+        candidates = list(memory.get("candidates", []))
+        excluded_obj_ids = set(memory.get("excluded_obj_ids") or [])
+        if excluded_obj_ids:
+            candidates = [c for c in candidates if c not in excluded_obj_ids]
+        self.candidates = candidates
+        self._user_state = user_state
+        self._mode: Optional[str] = None
+        self._objects_by_id: Optional[Dict[str, Dict]] = None
+        self._ranked: Optional[List[Dict]] = None
+        self._yaw_osc = None
+        self._yaw_target = _UNSET
+
+    @property
+    def mode(self) -> str:
+        if self._mode is None:
+            self._mode = _effective_mode(self._user_state, self.gripper_hist, self.memory)
+        return self._mode
+
+    @property
+    def objects_by_id(self) -> Dict[str, Dict]:
+        if self._objects_by_id is None:
+            self._objects_by_id = {o["id"]: o for o in self.objects}
+        return self._objects_by_id
+
+    @property
+    def ranked(self) -> List[Dict]:
+        """Non-excluded candidates ranked by (distance to gripper, id). Do not mutate."""
+        if self._ranked is None:
+            by_id = self.objects_by_id
+            if len(by_id) != len(self.objects):
+                # Duplicate object ids: keep the full scan so every duplicate is ranked.
+                self._ranked = _rank_candidates(self.objects, self.candidates, self.current_cell)
+            else:
+                # Look up the (few) candidates instead of scanning every object; the
+                # (distance, id) key is unique, so the order matches _rank_candidates.
+                dist_row = grid.DIST[grid.cell_id(self.current_cell)]
+                scored = []
+                for obj_id in set(self.candidates):
+                    o = by_id.get(obj_id)
+                    if o is not None and not o["is_held"]:
+                        scored.append((dist_row[grid.cell_id(o["cell"])], obj_id, o))
+                scored.sort(key=lambda x: (x[0], x[1]))
+                self._ranked = [o for _, _, o in scored]
+        return self._ranked
+
+    @property
+    def yaw_oscillation(self) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
+        if self._yaw_osc is None:
+            self._yaw_osc = _has_yaw_oscillation(self.gripper_hist)
+        return self._yaw_osc
+
+    @property
+    def yaw_target(self) -> Optional[Dict]:
+        """First object in the dominant cell of a yaw oscillation (None if no oscillation)."""
+        if self._yaw_target is _UNSET:
+            triggered, dom_cell, _, _ = self.yaw_oscillation
+            self._yaw_target = next((o for o in self.objects if o["cell"] == dom_cell), None) if triggered else None
+        return self._yaw_target
+
+
+def _emit_intent_gate(ctx: _OracleContext, state: OracleState) -> Optional[Dict]:
     """
     Returns an INTERACT tool call if we can ask a high-signal intent-gating question,
     otherwise returns None.
     """
-    current_cell = gripper_hist[-1]["cell"]
-    candidates = list(memory.get("candidates", []))
-    excluded_obj_ids = set(memory.get("excluded_obj_ids") or [])
-    if excluded_obj_ids:
-        candidates = [c for c in candidates if c not in excluded_obj_ids]
-    mode = _effective_mode(user_state, gripper_hist, memory)
+    mode = ctx.mode
 
     # For rotation mode, prefer yaw intent gating (if a yaw-oscillation signal exists).
     if mode == "rotation":
-        triggered, dom_cell, yaw1, yaw2 = _has_yaw_oscillation(gripper_hist)
-        if triggered:
-            target_obj = next((o for o in objects if o["cell"] == dom_cell), None)
-            if target_obj:
-                text = (
-                    f"I notice you are struggling aligning the gripper yaw while near the {target_obj['label']}. "
-                    f"Is that what you are trying to do?"
-                )
-                choices = ["1) YES", "2) NO"]
-                context = {
-                    "type": "intent_gate_yaw",
-                    "obj_id": target_obj["id"],
-                    "label": target_obj["label"],
-                    "action": "ALIGN_YAW",
-                }
-                return _interact("QUESTION", text, choices, context, state)
+        target_obj = ctx.yaw_target
+        if target_obj:
+            text = (
+                f"I notice you are struggling aligning the gripper yaw while near the {target_obj['label']}. "
+                f"Is that what you are trying to do?"
+            )
+            choices = ["1) YES", "2) NO"]
+            context = {
+                "type": "intent_gate_yaw",
+                "obj_id": target_obj["id"],
+                "label": target_obj["label"],
+                "action": "ALIGN_YAW",
+            }
+            return _interact("QUESTION", text, choices, context, state)
 
     # Candidate-based intent gating (translation or rotation when yaw-signal isn't available).
-    ranked = _rank_candidates(objects, candidates, current_cell)
+    ranked = ctx.ranked
     if len(ranked) >= 2:
         k = min(3, len(ranked))
         a = ranked[0]
@@ -188,17 +266,15 @@ def _emit_intent_gate(
         return _interact("QUESTION", text, choices, context, state)
 
     # Otherwise, gate on yaw struggle if present (fallback).
-    triggered, dom_cell, yaw1, yaw2 = _has_yaw_oscillation(gripper_hist)
-    if triggered:
-        target_obj = next((o for o in objects if o["cell"] == dom_cell), None)
-        if target_obj:
-            text = (
-                f"I notice you are struggling aligning the gripper yaw while near the {target_obj['label']}. "
-                f"Is that what you are trying to do?"
-            )
-            choices = ["1) YES", "2) NO"]
-            context = {"type": "intent_gate_yaw", "obj_id": target_obj["id"], "label": target_obj["label"], "action": "ALIGN_YAW"}
-            return _interact("QUESTION", text, choices, context, state)
+    target_obj = ctx.yaw_target
+    if target_obj:
+        text = (
+            f"I notice you are struggling aligning the gripper yaw while near the {target_obj['label']}. "
+            f"Is that what you are trying to do?"
+        )
+        choices = ["1) YES", "2) NO"]
+        context = {"type": "intent_gate_yaw", "obj_id": target_obj["id"], "label": target_obj["label"], "action": "ALIGN_YAW"}
+        return _interact("QUESTION", text, choices, context, state)
 
     return None
 
@@ -210,14 +286,9 @@ def oracle_decide_tool(
     state: OracleState,
     user_state: Optional[UserState] = None,
 ) -> Dict:
-    current_cell = gripper_hist[-1]["cell"]
-    candidates = list(memory.get("candidates", []))
-    excluded_obj_ids = set(memory.get("excluded_obj_ids") or [])
-    if excluded_obj_ids:
-        candidates = [c for c in candidates if c not in excluded_obj_ids]
-    objects_by_id = {o["id"]: o for o in objects}
-    current_yaw = gripper_hist[-1]["yaw"]
-    mode = _effective_mode(user_state, gripper_hist, memory)
+    ctx = _OracleContext(objects, gripper_hist, memory, user_state)
+    current_cell = ctx.current_cell
+    current_yaw = ctx.current_yaw
 
     if state.terminate_episode:
         # The driver should stop the episode when this is set. Fall back to a single
@@ -242,7 +313,7 @@ def oracle_decide_tool(
         and not (state.awaiting_confirmation or state.awaiting_choice or state.awaiting_help or state.awaiting_anything_else or state.awaiting_mode_select or state.awaiting_intent_gate)
     ):
         obj_id = last_action["obj"]
-        obj = objects_by_id.get(obj_id)
+        obj = ctx.objects_by_id.get(obj_id)
         if obj and current_cell == obj["cell"] and current_yaw != obj["yaw"]:
             # Ask explicitly before aligning yaw.
             state.selected_obj_id = obj_id
@@ -253,8 +324,8 @@ def oracle_decide_tool(
             return _interact("CONFIRM", question, choices, context, state)
 
     # Follow-up action after user confirmed help/approach.
-    if state.pending_action_obj_id is not None and state.pending_action_obj_id in objects_by_id:
-        target = objects_by_id[state.pending_action_obj_id]
+    if state.pending_action_obj_id is not None and state.pending_action_obj_id in ctx.objects_by_id:
+        target = ctx.objects_by_id[state.pending_action_obj_id]
         # A confirmation should trigger exactly ONE motion tool, then return to dialog.
         def clear_pending() -> None:
             state.pending_action_obj_id = None
@@ -295,7 +366,7 @@ def oracle_decide_tool(
     # If we're waiting for a user reply, keep prompting (don't fall through to motion tools).
     if state.awaiting_confirmation:
         obj_id = state.selected_obj_id or state.intended_obj_id
-        obj = objects_by_id.get(obj_id)
+        obj = ctx.objects_by_id.get(obj_id)
         if obj:
             action = state.last_prompt_context.get("action") if state.last_prompt_context else None
             if action == "ALIGN_YAW":
@@ -321,7 +392,7 @@ def oracle_decide_tool(
         return _interact("SUGGESTION", text, choices, context, state)
 
     if state.awaiting_choice:
-        ranked = _rank_candidates(objects, candidates, current_cell)
+        ranked = ctx.ranked
         if ranked:
             k = min(4, len(ranked))
             labels = [ranked[i]["label"] for i in range(k)]
@@ -350,18 +421,17 @@ def oracle_decide_tool(
 
     if state.awaiting_help:
         # Re-ask the help prompt if we are still in a yaw-struggle state.
-        triggered, dom_cell, yaw1, yaw2 = _has_yaw_oscillation(gripper_hist)
-        if triggered:
-            target_obj = next((o for o in objects if o["cell"] == dom_cell), None)
-            if target_obj and target_obj["yaw"] not in {yaw1, yaw2}:
-                text = f"Do you want me to help you align yaw to the {target_obj['label']}?"
-                choices = ["1) YES", "2) NO"]
-                context = {"type": "help", "obj_id": target_obj["id"], "yaws": (yaw1, yaw2, target_obj["yaw"])}
-                return _interact("SUGGESTION", text, choices, context, state)
+        _, _, yaw1, yaw2 = ctx.yaw_oscillation
+        target_obj = ctx.yaw_target
+        if target_obj and target_obj["yaw"] not in {yaw1, yaw2}:
+            text = f"Do you want me to help you align yaw to the {target_obj['label']}?"
+            choices = ["1) YES", "2) NO"]
+            context = {"type": "help", "obj_id": target_obj["id"], "yaws": (yaw1, yaw2, target_obj["yaw"])}
+            return _interact("SUGGESTION", text, choices, context, state)
         state.awaiting_help = False
 
     if state.awaiting_intent_gate:
-        gate = _emit_intent_gate(objects, gripper_hist, memory, state, user_state=user_state)
+        gate = _emit_intent_gate(ctx, state)
         if gate is not None:
             return gate
         state.awaiting_intent_gate = False
@@ -371,14 +441,14 @@ def oracle_decide_tool(
     if int(memory.get("n_interactions", 0)) == 0 and not (memory.get("past_dialogs") or []):
         if not (state.awaiting_confirmation or state.awaiting_choice or state.awaiting_help):
             state.awaiting_intent_gate = True
-            gate = _emit_intent_gate(objects, gripper_hist, memory, state, user_state=user_state)
+            gate = _emit_intent_gate(ctx, state)
             if gate is not None:
                 return gate
             state.awaiting_intent_gate = False
 
     # Confirmation after a user-picked object.
     if state.selected_obj_id is not None and not state.awaiting_confirmation:
-        obj = objects_by_id.get(state.selected_obj_id)
+        obj = ctx.objects_by_id.get(state.selected_obj_id)
         if obj:
             # Ask to confirm the *next* action we would take (approach vs align yaw),
             # so the post-confirm tool call matches the user's expectation.
@@ -414,7 +484,8 @@ def oracle_decide_tool(
     # Important: don't ask this every timestep. Gate it so it primarily triggers right after
     # a movement step (APPROACH), which makes it feel like the assistant is reacting to
     # ambiguous motion rather than nagging.
-    top_two = _top_two_candidates(objects, candidates, current_cell)
+    ranked = ctx.ranked
+    top_two = ranked[:2] if len(ranked) >= 2 else None
     last_calls = list(memory.get("last_tool_calls", []))
     just_moved = bool(last_calls and last_calls[-1] == "APPROACH")
     if top_two and not state.awaiting_choice and not state.awaiting_confirmation:
@@ -427,7 +498,6 @@ def oracle_decide_tool(
             if abs(dist_a - dist_b) <= 1:
                 # First gate on intent, then ask which specific object.
                 state.awaiting_intent_gate = True
-                ranked = _rank_candidates(objects, candidates, current_cell)
                 k = min(3, len(ranked))
                 a0 = ranked[0]
                 others = ranked[1:k]
@@ -441,9 +511,9 @@ def oracle_decide_tool(
                 return _interact("QUESTION", text, choices, context, state)
 
     # Yaw struggle suggestion.
-    triggered, dom_cell, yaw1, yaw2 = _has_yaw_oscillation(gripper_hist)
-    if triggered and not state.awaiting_help:
-        target_obj = next((o for o in objects if o["cell"] == dom_cell), None)
+    _, _, yaw1, yaw2 = ctx.yaw_oscillation
+    if not state.awaiting_help:
+        target_obj = ctx.yaw_target
         if target_obj and target_obj["yaw"] not in {yaw1, yaw2}:
             # First gate on intent: is the user trying to align yaw to this object?
             state.awaiting_intent_gate = True
@@ -456,7 +526,7 @@ def oracle_decide_tool(
             return _interact("QUESTION", text, choices, context, state)
 
     # Default policy: move toward the intended object or align yaw when co-located.
-    intended = objects_by_id[state.intended_obj_id]
+    intended = ctx.objects_by_id[state.intended_obj_id]
     if current_cell != intended["cell"]:
         return _tool("APPROACH", {"obj": intended["id"]})
     if current_yaw != intended["yaw"]:
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import os
+from fnmatch import fnmatchcase
+from typing import Dict, List, Mapping, Tuple
+
+# Candidate-count buckets; the last one is open-ended.
+CANDIDATE_BUCKETS: Tuple[str, ...] = ("0", "1", "2", "3+")
+
+
+def bucket_key(record: Mapping) -> str:
+    """
+    Coverage bucket of a generator record: "<tool>:<context>:<mode>:<candidates>", e.g.
+    "INTERACT:confirm:translation:2". <context> is `memory.last_prompt.context.type`
+    ("none" before the first prompt) and <candidates> one of CANDIDATE_BUCKETS.
+    """
+    memory = record.get("memory") or {}
+    ctx = (memory.get("last_prompt") or {}).get("context") or {}
+    n = len(memory.get("candidates") or [])
+    return ":".join(
+        (
+            str(record["target_tool_call"]["tool"]),
+            str(ctx.get("type") or "none"),
+            str((record.get("user_state") or {}).get("mode") or "none"),
+            CANDIDATE_BUCKETS[min(n, len(CANDIDATE_BUCKETS) - 1)],
+        )
+    )
+
+
+def load_quotas(spec: str) -> Dict[str, int]:
+    """
+    Parse a quota spec: a JSON object (inline, or a path to a .json file) mapping bucket
+    patterns to target counts. Patterns are bucket keys where any field may be "*", e.g.
+    {"APPROACH:*:*:*": 5000, "INTERACT:candidate_choice:*:3+": 2000}.
+    """
+    text = spec
+    if os.path.exists(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            text = f.read()
+    raw = json.loads(text)
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError("Quota spec must be a non-empty JSON object of {pattern: count}")
+    quotas: Dict[str, int] = {}
+    for pattern, count in raw.items():
+        if len(str(pattern).split(":")) != 4:
+            raise ValueError(f"Invalid quota pattern (expected tool:context:mode:candidates): {pattern!r}")
+        if int(count) < 0:
+            raise ValueError(f"Quota for {pattern!r} must be >= 0")
+        quotas[str(pattern)] = int(count)
+    return quotas
+
+
+class QuotaFilter:
+    """
+    Picklable "does this record still help?" test over the patterns that were unfilled
+    when it was taken (see Quotas.filter). Workers use it to cut episodes short.
+    """
+
+    def __init__(self, open_patterns: Tuple[str, ...]):
+        self.open_patterns = open_patterns
+        self._cache: Dict[str, bool] = {}
+
+    def __call__(self, record: Mapping) -> bool:
+        key = bucket_key(record)
+        hit = self._cache.get(key)
+        if hit is None:
+            hit = self._cache[key] = any(fnmatchcase(key, p) for p in self.open_patterns)
+        return hit
+
+
+class Quotas:
+    """
+    Running fill state for a quota spec. A record is kept if at least one pattern it
+    matches is still below target, and then counts toward every pattern it matches.
+    """
+
+    def __init__(self, targets: Dict[str, int]):
+        self.targets = dict(targets)
+        self.filled: Dict[str, int] = {p: 0 for p in self.targets}
+        self.kept = 0
+        self.dropped = 0
+        self._matches: Dict[str, List[str]] = {}
+
+    def _patterns(self, key: str) -> List[str]:
+        out = self._matches.get(key)
+        if out is None:
+            out = self._matches[key] = [p for p in self.targets if fnmatchcase(key, p)]
+        return out
+
+    def offer(self, record: Mapping) -> bool:
+        """
+        Count `record` if it fills an open bucket; returns whether it was kept.
+        """
+        patterns = self._patterns(bucket_key(record))
+        if not any(self.filled[p] < self.targets[p] for p in patterns):
+            self.dropped += 1
+            return False
+        for p in patterns:
+            self.filled[p] += 1
+        self.kept += 1
+        return True
+
+    @property
+    def complete(self) -> bool:
+        return all(self.filled[p] >= n for p, n in self.targets.items())
+
+    def filter(self) -> QuotaFilter:
+        return QuotaFilter(tuple(p for p, n in self.targets.items() if self.filled[p] < n))
+
+    def report(self, episodes_simulated: int, episodes_skipped_early: int = 0) -> Dict:
+        return {
+            "targets": dict(self.targets),
+            "filled": dict(self.filled),
+            "complete": self.complete,
+            "records_kept": self.kept,
+            "records_dropped": self.dropped,
+            "episodes_simulated": int(episodes_simulated),
+            "episodes_skipped_early": int(episodes_skipped_early),
+        }
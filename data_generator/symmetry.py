@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import grid
+from . import yaw as yawlib
+from .delta import iter_generator_jsonl
+from .jsonl_io import write_jsonl
+from .memory_log import MemorySnapshot, record_to_json
+from .oracle import _effective_mode
+
+# -----------------------------------------------------------------------------
+# Dihedral group D4 acting jointly on the 3x3 grid and the 8 yaw bins.
+#
+# Row A is the north edge and column 1 the west edge, so rotating the table 90 degrees
+# clockwise moves a cell (r, c) to (c, 2 - r) and a yaw bin two steps clockwise; the
+# mirror (c -> 2 - c) swaps east and west (yaw i -> -i). Element g = k + 4 * m is
+# "mirror if m, then rotate k quarter turns"; g = 0 is the identity.
+#
+# The oracle only compares cells/yaws for equality, Manhattan distance and cyclic yaw
+# distance (all invariant) and ranks ties by object id, so a record's target tool call is
+# unchanged by any transform. The one exception is the "gripper" input mode, whose
+# pseudo-random coin flip hashes the cell/yaw labels; transforms that flip it are skipped.
+# -----------------------------------------------------------------------------
+
+N_TRANSFORMS: int = 8
+
+
+def _build_tables() -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+    n_cols = len(grid.COLS)
+    cells: List[Tuple[int, ...]] = []
+    yaws: List[Tuple[int, ...]] = []
+    for g in range(N_TRANSFORMS):
+        k, mirror = g % 4, g >= 4
+        cell_row, yaw_row = [], []
+        for i in range(grid.N_CELLS):
+            r, c = divmod(i, n_cols)
+            if mirror:
+                c = n_cols - 1 - c
+            for _ in range(k):
+                r, c = c, n_cols - 1 - r
+            cell_row.append(r * n_cols + c)
+        for y in range(yawlib.N_YAW):
+            if mirror:
+                y = -y % yawlib.N_YAW
+            yaw_row.append((y + 2 * k) % yawlib.N_YAW)
+        cells.append(tuple(cell_row))
+        yaws.append(tuple(yaw_row))
+    return tuple(cells), tuple(yaws)
+
+
+CELL_MAP, YAW_MAP = _build_tables()
+
+
+def transform_cell(cell: str, g: int) -> str:
+    return grid.CELLS[CELL_MAP[g][grid.cell_id(cell)]]
+
+
+def transform_yaw(bin_name: str, g: int) -> str:
+    return yawlib.YAW_BINS[YAW_MAP[g][yawlib.yaw_id(bin_name)]]
+
+
+def _transform_pose_fields(d: Dict, g: int) -> Dict:
+    out = dict(d)
+    if "cell" in out:
+        out["cell"] = transform_cell(out["cell"], g)
+    if "yaw" in out:
+        out["yaw"] = transform_yaw(out["yaw"], g)
+    return out
+
+
+def _transform_last_prompt(last_prompt: Dict, g: int) -> Dict:
+    ctx = last_prompt.get("context")
+    if not isinstance(ctx, dict) or "yaws" not in ctx:
+        return last_prompt
+    # Yaw-help prompts keep (yaw1, yaw2, target_yaw) in their context.
+    ctx = dict(ctx)
+    ctx["yaws"] = type(ctx["yaws"])(transform_yaw(y, g) for y in ctx["yaws"])
+    return {**last_prompt, "context": ctx}
+
+
+def transform_record(record: Dict, g: int) -> Dict:
+    """
+    Apply transform `g` to every cell and yaw bin in a generator record (objects, gripper
+    history, yaw-help prompt context). Ids, labels, dialog text and the target tool call
+    are left as they are. Returns a new record; the input is not modified.
+    """
+    if g == 0:
+        return record
+    out = dict(record)
+    out["objects"] = [_transform_pose_fields(o, g) for o in record["objects"]]
+    out["gripper_hist"] = [_transform_pose_fields(p, g) for p in record["gripper_hist"]]
+    mem = record.get("memory")
+    if isinstance(mem, MemorySnapshot):
+        if "last_prompt" in mem:
+            out["memory"] = mem.replace(last_prompt=_transform_last_prompt(mem["last_prompt"], g))
+    elif isinstance(mem, dict) and isinstance(mem.get("last_prompt"), dict):
+        out["memory"] = {**mem, "last_prompt": _transform_last_prompt(mem["last_prompt"], g)}
+    return out
+
+
+def is_invariant(record: Dict, g: int) -> bool:
+    """
+    True if the oracle's decision for `record` is unchanged under transform `g`.
+    """
+    user_state = record.get("user_state")
+    if g == 0 or (user_state or {}).get("mode") != "gripper":
+        return True
+    mem = record.get("memory") or {}
+    moved = [_transform_pose_fields(record["gripper_hist"][-1], g)]
+    return _effective_mode(user_state, record["gripper_hist"], mem) == _effective_mode(user_state, moved, mem)
+
+
+def _geometry(record: Dict, g: int) -> Tuple:
+    """
+    Every cell/yaw bin of `record` after transform `g`, as ids. Two transforms of the same
+    record are equal exactly when their geometries are, since nothing else changes.
+    """
+    cells, yaws = CELL_MAP[g], YAW_MAP[g]
+    poses = tuple(
+        (cells[grid.cell_id(d["cell"])], yaws[yawlib.yaw_id(d["yaw"])])
+        for part in ("objects", "gripper_hist")
+        for d in record[part]
+    )
+    ctx = ((record.get("memory") or {}).get("last_prompt") or {}).get("context")
+    if isinstance(ctx, dict) and "yaws" in ctx:
+        poses += tuple(yaws[yawlib.yaw_id(y)] for y in ctx["yaws"])
+    return poses
+
+
+def augment(records: Iterable[Dict], stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Yield each record followed by its distinct valid symmetric copies (up to 8 per record;
+    fewer for symmetric scenes or the "gripper" input mode).
+    """
+    for record in records:
+        yield record
+        seen = {_geometry(record, 0)}
+        for g in range(1, N_TRANSFORMS):
+            if not is_invariant(record, g):
+                continue
+            geometry = _geometry(record, g)
+            if geometry in seen:
+                continue
+            seen.add(geometry)
+            if stats is not None:
+                stats["augmented"] = int(stats.get("augmented", 0)) + 1
+            yield transform_record(record, g)
+
+
+def canonical_key(record: Dict) -> str:
+    """
+    Digest of the record's content with its geometry replaced by the smallest geometry
+    over its valid transforms: records that are symmetric copies of each other share a
+    key. episode_id is bookkeeping, not content, and is ignored.
+    """
+    geometry, g = min((_geometry(record, g), g) for g in range(N_TRANSFORMS) if is_invariant(record, g))
+    canonical = transform_record(record, g)
+    body = record_to_json({k: v for k, v in canonical.items() if k not in ("episode_id", "objects", "gripper_hist")})
+    ids = [(o.get("id"), o.get("label"), o.get("is_held")) for o in record["objects"]]
+    zs = [p.get("z") for p in record["gripper_hist"]]
+    payload = json.dumps([geometry, ids, zs], ensure_ascii=False) + body
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def dedup(records: Iterable[Dict], stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Drop records whose canonical key was already seen (first occurrence wins).
+    """
+    seen = set()
+    for record in records:
+        key = canonical_key(record)
+        if key in seen:
+            if stats is not None:
+                stats["duplicates_dropped"] = int(stats.get("duplicates_dropped", 0)) + 1
+            continue
+        seen.add(key)
+        yield record
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Augment and/or deduplicate a generator JSONL under grid/yaw symmetries.")
+    ap.add_argument("--in", dest="inp", type=str, required=True)
+    ap.add_argument("--out", type=str, required=True)
+    ap.add_argument("--dedup", action="store_true", help="Keep one record per symmetry class.")
+    ap.add_argument("--augment", action="store_true", help="Add the symmetric copies of every record.")
+    args = ap.parse_args(argv)
+
+    stats: Dict = {}
+    records: Iterable[Dict] = (r for _, r in iter_generator_jsonl(args.inp))
+    if args.dedup:
+        records = dedup(records, stats)
+    if args.augment:
+        records = augment(records, stats)
+    write_jsonl(args.out, records, record_to_json)
+    print(json.dumps(stats, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
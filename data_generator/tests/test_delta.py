@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from data_generator import delta
+from data_generator.episode import write_jsonl
+from data_generator.generate_dataset import generate
+from data_generator.memory_log import materialize_record
+
+
+def _plain(records):
+    return [json.loads(json.dumps(materialize_record(r), ensure_ascii=False)) for r in records]
+
+
+def test_delta_round_trips_generator_records(tmp_path: Path):
+    records, _ = generate(episodes=30, seed=5)
+    plain, packed = tmp_path / "gen.jsonl", tmp_path / "gen.delta.jsonl"
+    write_jsonl(str(plain), records)
+    delta.write_delta_jsonl(str(packed), records)
+
+    assert sum(1 for _ in packed.open()) == 30
+    assert packed.stat().st_size * 2 < plain.stat().st_size
+    got = list(delta.iter_generator_jsonl(str(packed)))
+    assert got == list(delta.iter_generator_jsonl(str(plain)))
+    assert [json.dumps(r) for _, r in got] == [json.dumps(r) for r in _plain(records)]
+
+
+def test_delta_stores_unusual_records_whole():
+    records = [
+        {"episode_id": 1, "objects": [], "gripper_hist": [], "memory": {"note": "x"}, "user_state": None, "target_tool_call": {"tool": "APPROACH", "args": {"obj": "o0"}}},
+        {"episode_id": 1, "extra": True},
+        {"episode_id": 2, "objects": [{"label": "mug", "id": "o1"}], "gripper_hist": [{"cell": "A1"}], "memory": {}, "user_state": {"mode": "translation"}, "target_tool_call": {"tool": "ALIGN_YAW", "args": {"obj": "o1"}}},
+    ]
+    enc = delta.DeltaEncoder()
+    lines = [line for line in (enc.add(r) for r in records) if line is not None] + [enc.finish()]
+    assert len(lines) == 2
+    out = [r for line in lines for r in delta.expand_episode(json.loads(line))]
+    assert [json.dumps(r) for r in out] == [json.dumps(r) for r in records]
+
+
+def test_delta_keeps_key_order_only_changes():
+    records, _ = generate(episodes=1, seed=8)
+    records = _plain(records)[:3]
+    assert len(records) == 3
+    # Same values, different key order: memory field, user_state and a gripper pose.
+    records[1]["memory"]["last_action"] = {"obj": "o0", "tool": "APPROACH"}
+    records[2]["memory"]["last_action"] = {"tool": "APPROACH", "obj": "o0"}
+    records[1]["user_state"] = {"mode": "rotation", "note": "x"}
+    records[2]["user_state"] = {"note": "x", "mode": "rotation"}
+    last = records[2]["gripper_hist"][-1]
+    records[2]["gripper_hist"][-1] = dict(reversed(list(last.items())))
+    enc = delta.DeltaEncoder()
+    lines = [line for line in (enc.add(r) for r in records) if line is not None] + [enc.finish()]
+    out = [r for line in lines for r in delta.expand_episode(json.loads(line))]
+    assert [json.dumps(r) for r in out] == [json.dumps(r) for r in records]
+
+
+@pytest.mark.parametrize("edit", ["drop", "extra"])
+def test_delta_step_after_unusual_memory(edit):
+    records, _ = generate(episodes=1, seed=8)
+    records = _plain(records)
+    assert len(records) == 5
+    if edit == "drop":
+        del records[1]["memory"]["last_tool_calls"]
+    else:
+        records[1]["memory"]["note"] = "only here"
+    enc = delta.DeltaEncoder()
+    lines = [line for line in (enc.add(r) for r in records) if line is not None] + [enc.finish()]
+    out = [r for line in lines for r in delta.expand_episode(json.loads(line))]
+    assert [json.dumps(r) for r in out] == [json.dumps(r) for r in records]
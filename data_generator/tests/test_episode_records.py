@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from data_generator.episode import Obj, Pose
+from data_generator.generate_dataset import generate, generate_episode
+
+
+def test_obj_record_is_cached_and_invalidated_on_change():
+    o = Obj(id="o0", label="mug", cell="B2", yaw="NE")
+    rec = o.shared_record()
+    assert rec == {"id": "o0", "label": "mug", "cell": "B2", "yaw": "NE", "is_held": False}
+    assert o.shared_record() is rec
+    assert o.to_record() == rec and o.to_record() is not rec
+    assert (o.cell_id, o.yaw_id) == (4, 1)
+
+    o.is_held = True
+    o.cell = "c3"
+    assert o.shared_record() is not rec
+    assert o.to_record() == {"id": "o0", "label": "mug", "cell": "C3", "yaw": "NE", "is_held": True}
+
+
+def test_pose_round_trips_labels_and_ids():
+    p = Pose(cell="A1", yaw="sw", z="LOW")
+    assert (p.cell, p.yaw, p.z) == ("A1", "SW", "LOW")
+    assert p == Pose.from_ids(p.cell_id, p.yaw_id, p.z_id)
+    assert p.shared_record() is p.shared_record()
+    assert p.to_record() is not p.to_record()
+    assert p.to_record() == {"cell": "A1", "yaw": "SW", "z": "LOW"}
+    with pytest.raises(ValueError):
+        Pose(cell="A1", yaw="N", z="TOP")
+    with pytest.raises(ValueError):
+        Obj(id="o0", label="mug", cell="D1", yaw="N")
+
+
+def test_generated_records_share_no_mutable_values():
+    records, _ = generate(episodes=1, seed=8)
+    assert len(records) >= 3
+    expected = json.dumps(records[1])
+    records[0]["objects"][0]["cell"] = "ZZ"
+    records[0]["gripper_hist"][-1]["yaw"] = "ZZ"
+    for entry in records[0]["memory"]["past_dialogs"]:
+        entry["content"] = "ZZ"
+    records[2]["memory"]["past_dialogs"][0]["content"] = "ZZ"
+    assert json.dumps(records[1]) == expected
+    assert [json.dumps(r) for r in generate_episode(8, 0)][1] == expected
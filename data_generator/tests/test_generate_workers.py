@@ -0,0 +1,46 @@
+import json
+
+from data_generator import generate_dataset
+
+
+def test_generate_is_identical_for_any_worker_count():
+    recs1, stats1 = generate_dataset.generate(episodes=6, seed=3, workers=1)
+    recs2, stats2 = generate_dataset.generate(episodes=6, seed=3, workers=2)
+    assert [json.dumps(r) for r in recs1] == [json.dumps(r) for r in recs2]
+    assert json.dumps(stats1, sort_keys=True) == json.dumps(stats2, sort_keys=True)
+
+
+def test_episode_records_do_not_depend_on_other_episodes():
+    recs_small, _ = generate_dataset.generate(episodes=2, seed=5)
+    recs_large, _ = generate_dataset.generate(episodes=4, seed=5)
+    first_two = [r for r in recs_large if r["episode_id"] < 2]
+    assert [json.dumps(r) for r in recs_small] == [json.dumps(r) for r in first_two]
+
+
+def test_iter_generate_streams_same_records_and_stats():
+    recs, stats = generate_dataset.generate(episodes=5, seed=2)
+    streamed_stats = {}
+    it = generate_dataset.iter_generate(episodes=5, seed=2, stats=streamed_stats)
+    first = next(it)
+    assert json.dumps(first) == json.dumps(recs[0])
+    rest = list(it)
+    assert [json.dumps(r) for r in [first] + rest] == [json.dumps(r) for r in recs]
+    assert json.dumps(streamed_stats, sort_keys=True) == json.dumps(stats, sort_keys=True)
+
+
+def test_any_episode_range_regenerates_on_its_own():
+    recs, _ = generate_dataset.generate(episodes=8, seed=9, n_obj_max=6)
+    middle, _ = generate_dataset.generate(episodes=3, seed=9, n_obj_max=6, first_episode=4, workers=2)
+    assert middle == [r for r in recs if 4 <= r["episode_id"] < 7]
+    assert generate_dataset.generate_episode(9, 6, n_obj_max=6) == [r for r in recs if r["episode_id"] == 6]
+
+
+def test_inspect_data_regenerates_episodes_from_mistakes(tmp_path, capsys):
+    from data_generator import inspect_data
+
+    mistakes = tmp_path / "mistakes_m.jsonl"
+    mistakes.write_text('{"id": "3_17"}\n{"id": "3_18"}\n{"id": "12_40"}\n', encoding="utf-8")
+    assert inspect_data._episode_ids_from_mistakes(mistakes) == [3, 12]
+    inspect_data.main(["--seed", "1", "--mistakes", str(mistakes), "--max-t", "1"])
+    out = capsys.readouterr().out
+    assert "=== EPISODE 3" in out and "=== EPISODE 12" in out
@@ -8,3 +8,28 @@ def test_grid_neighbors_and_manhattan():
     assert grid.step_toward("A1", "C3") == "B1"
     assert grid.step_toward("B1", "C3") == "C1"
 
+
+
+def test_grid_id_tables_match_label_geometry():
+    for a in grid.CELLS:
+        ca = grid.Cell.from_label(a)
+        assert grid.cell_label(grid.cell_id(a)) == a
+        assert grid.cell_id(a.lower()) == grid.cell_id(a)
+        for b in grid.CELLS:
+            cb = grid.Cell.from_label(b)
+            assert grid.manhattan(a, b) == abs(ca.r - cb.r) + abs(ca.c - cb.c)
+            assert grid.same_row_or_col(a, b) == (ca.r == cb.r or ca.c == cb.c)
+            if a != b:
+                nxt = grid.step_toward(a, b)
+                assert nxt in grid.neighbors(a)
+                assert grid.manhattan(nxt, b) == grid.manhattan(a, b) - 1
+                # Tie-break: rows first.
+                if ca.r != cb.r:
+                    assert grid.Cell.from_label(nxt).c == ca.c
+
+
+def test_grid_invalid_label_raises():
+    import pytest
+
+    with pytest.raises(ValueError):
+        grid.manhattan("D1", "A1")
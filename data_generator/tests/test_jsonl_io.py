@@ -0,0 +1,68 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from data_generator import jsonl_io
+from data_generator.collect_and_prepare import main as collect_main
+from data_generator.delta import iter_generator_jsonl
+
+
+def test_add_suffix_keeps_compression_extension():
+    assert jsonl_io.add_suffix("a.jsonl", ".tmp") == "a.jsonl.tmp"
+    assert jsonl_io.add_suffix("a.jsonl.gz", ".tmp") == "a.jsonl.tmp.gz"
+    assert jsonl_io.compression_suffix("a.jsonl.zst") == ".zst"
+
+
+@pytest.mark.parametrize("name", ["rows.jsonl", "rows.jsonl.gz"])
+def test_round_trip(tmp_path: Path, name: str):
+    rows = [{"id": str(i), "text": "é" * i} for i in range(50)]
+    path = tmp_path / name
+    assert jsonl_io.write_jsonl(path, rows) == 50
+    assert [r for _, r in jsonl_io.iter_jsonl(path)] == rows
+    if name.endswith(".gz"):
+        assert gzip.decompress(path.read_bytes()).decode("utf-8").count("\n") == 50
+
+
+@pytest.mark.parametrize("name", ["rows.jsonl", "rows.jsonl.gz"])
+def test_failed_write_leaves_no_partial_file(tmp_path: Path, name: str):
+    path = tmp_path / name
+    jsonl_io.write_jsonl(path, [{"id": "old"}])
+
+    def rows():
+        yield {"id": "0"}
+        yield {"id": object()}  # not JSON-serializable
+
+    with pytest.raises(TypeError):
+        jsonl_io.write_jsonl(path, rows())
+    assert [r for _, r in jsonl_io.iter_jsonl(path)] == [{"id": "old"}]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [name]
+
+    with pytest.raises(TypeError):
+        jsonl_io.write_jsonl(tmp_path / "new.jsonl", rows())
+    assert not (tmp_path / "new.jsonl").exists()
+
+
+def test_zst_round_trip(tmp_path: Path):
+    pytest.importorskip("zstandard")
+    rows = [{"id": str(i)} for i in range(1000)]
+    path = tmp_path / "rows.jsonl.zst"
+    jsonl_io.write_jsonl(path, rows)
+    assert [r for _, r in jsonl_io.iter_jsonl(path)] == rows
+
+
+def test_collect_with_compressed_outputs(tmp_path: Path):
+    plain, packed = tmp_path / "plain", tmp_path / "packed"
+    collect_main(["--episodes", "4", "--seed", "3", "--out_dir", str(plain), "--rebalance"])
+    collect_main(
+        [
+            "--episodes", "4", "--seed", "3", "--out_dir", str(packed), "--rebalance",
+            "--out_generator", str(packed / "grasp_gen.jsonl.gz"),
+            "--out_contract", str(packed / "llm_contract.jsonl.gz"),
+            "--out_chat", str(packed / "llm_chat.jsonl.gz"),
+        ]
+    )
+    assert list(iter_generator_jsonl(str(packed / "grasp_gen.jsonl.gz"))) == list(iter_generator_jsonl(str(plain / "grasp_gen.jsonl")))
+    for name in ("llm_contract", "llm_chat", "llm_contract_rebalanced", "llm_chat_rebalanced"):
+        got = gzip.decompress((packed / f"{name}.jsonl.gz").read_bytes())
+        assert got == (plain / f"{name}.jsonl").read_bytes(), name
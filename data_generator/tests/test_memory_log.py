@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from data_generator import memory_log
+from data_generator.memory_log import DialogLog, MemorySnapshot, materialize_record, record_to_json
+
+
+def _memory():
+    return {
+        "n_interactions": 0,
+        "past_dialogs": DialogLog(),
+        "candidates": ["o1", "o2"],
+        "last_tool_calls": [],
+        "excluded_obj_ids": [],
+        "last_action": {},
+        "last_prompt": {},
+    }
+
+
+def test_snapshot_is_unaffected_by_later_appends():
+    mem = _memory()
+    mem["past_dialogs"].append({"role": "assistant", "content": "Which one?"})
+    snap = MemorySnapshot(mem)
+    expected = json.loads(json.dumps(mem))
+
+    mem["past_dialogs"].append({"role": "user", "content": "mug — ü"})
+    mem["last_tool_calls"].append("INTERACT")
+    mem["n_interactions"] = 1
+
+    assert snap.to_dict() == expected
+    assert list(snap) == list(expected)
+    assert snap["past_dialogs"] == expected["past_dialogs"]
+
+
+def test_record_to_json_matches_json_dumps(monkeypatch):
+    mem = _memory()
+    records = []
+    for i in range(5):
+        mem["past_dialogs"].append({"role": "user", "content": f"{i}) ü"})
+        records.append({"episode_id": 0, "memory": MemorySnapshot(mem), "user_state": {"mode": "rotation"}})
+    expected = [json.dumps(materialize_record(r), ensure_ascii=False) for r in records]
+    assert isinstance(materialize_record(records[-1])["memory"], dict)
+    # Both the short-dialog path and the cached-fragment path.
+    assert [record_to_json(r) for r in records] == expected
+    monkeypatch.setattr(memory_log, "FRAGMENT_MIN_DIALOGS", 0)
+    assert [record_to_json(r) for r in records] == expected
+
+
+def test_dialog_log_is_append_only():
+    log = DialogLog([{"role": "user", "content": "hi"}])
+    with pytest.raises(TypeError):
+        log[0] = {}
+    with pytest.raises(TypeError):
+        log.pop()
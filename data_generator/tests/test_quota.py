@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from data_generator import generate_dataset
+from data_generator.quota import Quotas, bucket_key, load_quotas
+
+
+def test_bucket_key_and_wildcards():
+    record = {
+        "memory": {"candidates": ["o1", "o2", "o3", "o4"], "last_prompt": {"context": {"type": "confirm"}}},
+        "user_state": {"mode": "rotation"},
+        "target_tool_call": {"tool": "ALIGN_YAW", "args": {"obj": "o1"}},
+    }
+    assert bucket_key(record) == "ALIGN_YAW:confirm:rotation:3+"
+    quotas = Quotas({"ALIGN_YAW:*:*:*": 1, "*:confirm:*:*": 2})
+    assert quotas.offer(record) and quotas.offer(record)
+    assert not quotas.offer(record)
+    assert quotas.complete and quotas.filled == {"ALIGN_YAW:*:*:*": 2, "*:confirm:*:*": 2}
+    with pytest.raises(ValueError):
+        load_quotas('{"APPROACH:*": 3}')
+
+
+def test_quota_mode_stops_once_filled():
+    quotas = {"APPROACH:*:*:*": 3, "INTERACT:none:*:*": 5}
+    records, stats = generate_dataset.generate(episodes=500, seed=0, quotas=json.loads(json.dumps(quotas)))
+    report = stats["quota"]
+    assert report["complete"] and report["filled"] == quotas
+    assert len(records) == 8 and report["episodes_simulated"] < 500
+    # Kept records are the same ones the unrestricted run produced for those episodes.
+    full, _ = generate_dataset.generate(episodes=report["episodes_simulated"], seed=0)
+    assert all(r in full for r in records)
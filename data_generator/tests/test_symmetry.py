@@ -0,0 +1,62 @@
+import copy
+
+from data_generator import generate_dataset, grid, symmetry
+from data_generator import yaw as yawlib
+from data_generator.memory_log import materialize_record
+from data_generator.oracle import oracle_decide_tool
+
+
+def test_transforms_are_isometries():
+    assert symmetry.transform_cell("A2", 1) == "B3"  # quarter turn clockwise
+    assert symmetry.transform_yaw("N", 1) == "E"
+    assert symmetry.transform_yaw("NE", 4) == "NW"  # mirror
+    for g in range(symmetry.N_TRANSFORMS):
+        cells, yaws = symmetry.CELL_MAP[g], symmetry.YAW_MAP[g]
+        assert sorted(cells) == list(range(grid.N_CELLS))
+        assert sorted(yaws) == list(range(yawlib.N_YAW))
+        for a in range(grid.N_CELLS):
+            assert all(grid.DIST[a][b] == grid.DIST[cells[a]][cells[b]] for b in range(grid.N_CELLS))
+        for a in range(yawlib.N_YAW):
+            assert all(yawlib.DIST[a][b] == yawlib.DIST[yaws[a]][yaws[b]] for b in range(yawlib.N_YAW))
+
+
+def test_oracle_decision_is_unchanged_under_valid_transforms(monkeypatch):
+    calls = []
+
+    def capture(objects, gripper_hist, memory, state, user_state=None):
+        calls.append((copy.deepcopy(objects), copy.deepcopy(gripper_hist), copy.deepcopy(dict(memory)), copy.deepcopy(state), user_state))
+        return oracle_decide_tool(objects, gripper_hist, memory, state, user_state=user_state)
+
+    monkeypatch.setattr(generate_dataset, "oracle_decide_tool", capture)
+    generate_dataset.generate(episodes=40, seed=2)
+    assert calls
+    for objects, gripper_hist, memory, state, user_state in calls:
+        expected = oracle_decide_tool(objects, gripper_hist, memory, copy.deepcopy(state), user_state=user_state)
+        record = {"objects": objects, "gripper_hist": gripper_hist, "memory": memory, "user_state": user_state}
+        for g in range(1, symmetry.N_TRANSFORMS):
+            if not symmetry.is_invariant(record, g):
+                continue
+            moved = symmetry.transform_record(record, g)
+            got = oracle_decide_tool(moved["objects"], moved["gripper_hist"], memory, copy.deepcopy(state), user_state=user_state)
+            assert got == expected
+
+
+def test_augment_then_dedup_round_trips():
+    records, _ = generate_dataset.generate(episodes=20, seed=4)
+    stats = {}
+    augmented = [materialize_record(r) for r in symmetry.augment(records, stats)]
+    assert len(augmented) == len(records) + stats["augmented"] > len(records)
+    assert list(symmetry.dedup(augmented)) == records
+
+
+def test_transform_maps_yaw_help_context():
+    record = {
+        "objects": [{"id": "o0", "label": "mug", "cell": "A1", "yaw": "N", "is_held": False}],
+        "gripper_hist": [{"cell": "A1", "yaw": "E", "z": "HIGH"}],
+        "memory": {"last_prompt": {"kind": "SUGGESTION", "context": {"type": "help", "yaws": ["E", "W", "N"]}}},
+    }
+    moved = symmetry.transform_record(record, 1)
+    assert moved["objects"][0]["cell"] == "A3"
+    assert moved["memory"]["last_prompt"]["context"]["yaws"] == ["S", "N", "E"]
+    assert record["memory"]["last_prompt"]["context"]["yaws"] == ["E", "W", "N"]
+    assert symmetry.canonical_key(moved) == symmetry.canonical_key(record)
@@ -8,3 +8,33 @@ def test_yaw_wraparound_and_move_toward():
     assert yaw.move_toward("N", "NW", steps=1) == "NW"
     assert yaw.move_toward("N", "N", steps=3) == "N"
 
+
+
+def _reference_move_toward(current: str, target: str, steps: int) -> str:
+    n = len(yaw.YAW_BINS)
+    cur, tgt = yaw.YAW_BINS.index(current), yaw.YAW_BINS.index(target)
+    for _ in range(steps):
+        if cur == tgt:
+            break
+        cur = (cur + 1) % n if (tgt - cur) % n <= (cur - tgt) % n else (cur - 1) % n
+    return yaw.YAW_BINS[cur]
+
+
+def test_yaw_tables_match_stepwise_reference():
+    n = len(yaw.YAW_BINS)
+    for a in yaw.YAW_BINS:
+        for b in yaw.YAW_BINS:
+            d = abs(yaw.YAW_BINS.index(a) - yaw.YAW_BINS.index(b)) % n
+            assert yaw.cyclic_distance_steps(a, b) == min(d, n - d)
+            for steps in range(0, 10):
+                assert yaw.move_toward(a, b, steps=steps) == _reference_move_toward(a, b, steps)
+                assert yaw.move_toward(a.lower(), b, steps=steps) == _reference_move_toward(a, b, steps)
+
+
+def test_yaw_invalid_inputs_raise():
+    import pytest
+
+    with pytest.raises(ValueError):
+        yaw.move_toward("N", "S", steps=-1)
+    with pytest.raises(ValueError):
+        yaw.cyclic_distance_steps("UP", "N")
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 
 YAW_BINS: Tuple[str, ...] = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
-_IDX = {b: i for i, b in enumerate(YAW_BINS)}
+N_YAW: int = len(YAW_BINS)
+_IDX: Dict[str, int] = {b: i for i, b in enumerate(YAW_BINS)}
+
+# Largest cyclic distance on the ring; moving this many steps always reaches the target.
+MAX_STEPS: int = N_YAW // 2
 
 
 def normalize(bin_name: str) -> str:
@@ -14,10 +18,82 @@ def normalize(bin_name: str) -> str:
     return b
 
 
+# -----------------------------------------------------------------------------
+# Integer yaw-bin API.
+#
+# Bins are numbered clockwise (N=0, NE=1, ..., NW=7). Distances, neighbors and the
+# result of moving k steps toward a target are precomputed at import, so every call
+# is a constant-time lookup regardless of `steps`.
+# -----------------------------------------------------------------------------
+
+
+def _build_tables() -> Tuple[
+    Tuple[Tuple[int, ...], ...],
+    Tuple[Tuple[Tuple[int, ...], ...], ...],
+    Tuple[Tuple[int, int], ...],
+]:
+    n = N_YAW
+    dist = tuple(tuple(min(abs(a - b) % n, n - abs(a - b) % n) for b in range(n)) for a in range(n))
+
+    # move[cur][tgt][k] = bin reached after k single steps (k = 0..MAX_STEPS).
+    # Deterministic tie-breaker: move clockwise when equidistant.
+    move: List[Tuple[Tuple[int, ...], ...]] = []
+    for cur0 in range(n):
+        per_tgt: List[Tuple[int, ...]] = []
+        for tgt in range(n):
+            path = [cur0]
+            cur = cur0
+            for _ in range(MAX_STEPS):
+                if cur != tgt:
+                    cw = (tgt - cur) % n
+                    ccw = (cur - tgt) % n
+                    cur = (cur + 1) % n if cw <= ccw else (cur - 1) % n
+                path.append(cur)
+            per_tgt.append(tuple(path))
+        move.append(tuple(per_tgt))
+
+    neigh = tuple(((i - 1) % n, (i + 1) % n) for i in range(n))
+    return dist, tuple(move), neigh
+
+
+DIST, MOVE, NEIGHBORS = _build_tables()
+
+
+def yaw_id(bin_name: str) -> int:
+    """
+    Map a yaw-bin name (case-insensitive) to its integer id. Raises ValueError if invalid.
+    """
+    i = _IDX.get(bin_name)
+    if i is None:
+        i = _IDX[normalize(bin_name)]
+    return i
+
+
+def yaw_label(i: int) -> str:
+    return YAW_BINS[i]
+
+
+def cyclic_distance_id(a: int, b: int) -> int:
+    return DIST[a][b]
+
+
+def move_toward_id(current: int, target: int, steps: int = 1) -> int:
+    if steps < 0:
+        raise ValueError("steps must be >= 0")
+    return MOVE[current][target][steps if steps < MAX_STEPS else MAX_STEPS]
+
+
+def neighbors_id(i: int) -> Tuple[int, int]:
+    return NEIGHBORS[i]
+
+
+# -----------------------------------------------------------------------------
+# String API (thin wrappers over the id tables).
+# -----------------------------------------------------------------------------
+
+
 def cyclic_distance_steps(a: str, b: str) -> int:
-    ia, ib = _IDX[normalize(a)], _IDX[normalize(b)]
-    d = abs(ia - ib) % len(YAW_BINS)
-    return min(d, len(YAW_BINS) - d)
+    return DIST[yaw_id(a)][yaw_id(b)]
 
 
 def move_toward(current: str, target: str, steps: int = 1) -> str:
@@ -27,23 +103,9 @@ def move_toward(current: str, target: str, steps: int = 1) -> str:
     """
     if steps < 0:
         raise ValueError("steps must be >= 0")
-    cur, tgt = _IDX[normalize(current)], _IDX[normalize(target)]
-    n = len(YAW_BINS)
-    for _ in range(steps):
-        if cur == tgt:
-            break
-        cw = (tgt - cur) % n
-        ccw = (cur - tgt) % n
-        if cw <= ccw:
-            cur = (cur + 1) % n
-        else:
-            cur = (cur - 1) % n
-    return YAW_BINS[cur]
+    return YAW_BINS[MOVE[yaw_id(current)][yaw_id(target)][steps if steps < MAX_STEPS else MAX_STEPS]]
 
 
 def neighbors(bin_name: str) -> List[str]:
-    i = _IDX[normalize(bin_name)]
-    n = len(YAW_BINS)
-    return [YAW_BINS[(i - 1) % n], YAW_BINS[(i + 1) % n]]
-
-
+    a, b = NEIGHBORS[yaw_id(bin_name)]
+    return [YAW_BINS[a], YAW_BINS[b]]
@@ -22,16 +22,21 @@ import time
 from collections import Counter
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 try:
     from . import _bootstrap  # noqa: F401
 except Exception:
     import _bootstrap  # type: ignore  # noqa: F401
 
+from data_generator import jsonl_io
 from data_generator.oracle import validate_tool_call
 
-from llm.inference import InferenceConfig, _build_messages, _generate_once, _load_model_and_tokenizer
+from llm.inference import BatchedGenerations, InferenceConfig, decode_stats, get_model_and_tokenizer, prefix_cache_stats
+from llm.contract_index import DEFAULT_STRATIFY_BY, SAMPLE_MODES, select
+from llm.data import ContractRow
+from llm.sampling import RateSpec, StratumCounters, interleave_order, load_prior, summarize_rates
+from llm.templates import try_render_tool_call
 from llm.utils import json_loads_strict, set_seed
 
 
@@ -39,15 +44,6 @@ from llm.utils import json_loads_strict, set_seed
 # Utility functions
 # =============================================================================
 
-def _iter_jsonl(path: str) -> Iterable[Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            yield json.loads(line)
-
-
 def _extract_first_json_object(s: str) -> Optional[str]:
     if not isinstance(s, str):
         return None
@@ -129,12 +125,8 @@ def _normalize_tool_call(obj: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
-def _ctx_bucket(input_json_str: str) -> str:
-    """Extract context type from memory.last_prompt.context.type."""
-    try:
-        inp = json_loads_strict(input_json_str)
-    except Exception:
-        return "invalid_input_json"
+def _ctx_bucket(inp: Any) -> str:
+    """Extract context type from memory.last_prompt.context.type of the parsed input (None if unparsable)."""
     if not isinstance(inp, dict):
         return "invalid_input_json"
     mem = inp.get("memory")
@@ -160,10 +152,9 @@ def _label_by_id(objects: Sequence[Dict[str, Any]], obj_id: str) -> Optional[str
     return None
 
 
-def _get_num_candidates(input_str: str) -> int:
-    """Extract number of candidates from input."""
+def _get_num_candidates(inp: Any) -> int:
+    """Extract number of candidates from the parsed input."""
     try:
-        inp = json_loads_strict(input_str)
         mem = inp.get("memory") or {}
         candidates = mem.get("candidates") or []
         return len(candidates)
@@ -171,10 +162,9 @@ def _get_num_candidates(input_str: str) -> int:
         return 0
 
 
-def _get_user_mode(input_str: str) -> str:
-    """Extract user mode from input."""
+def _get_user_mode(inp: Any) -> str:
+    """Extract user mode from the parsed input."""
     try:
-        inp = json_loads_strict(input_str)
         user_state = inp.get("user_state") or {}
         return str(user_state.get("mode") or "translation").lower()
     except Exception:
@@ -185,14 +175,13 @@ def _get_user_mode(input_str: str) -> str:
 # Heuristic Baselines
 # =============================================================================
 
-def _heuristic_ask_if_ambiguous(input_str: str) -> Dict[str, Any]:
+def _heuristic_ask_if_ambiguous(inp: Any) -> Dict[str, Any]:
     """
     H1: Ask-if-ambiguous baseline.
     - If 0 candidates -> ask generic
     - If 1 candidate -> act directly
     - If 2+ candidates -> ask candidate menu
     """
-    inp = json_loads_strict(input_str)
     assert isinstance(inp, dict)
     objects = inp.get("objects") or []
     memory = inp.get("memory") or {}
@@ -224,12 +213,11 @@ def _heuristic_ask_if_ambiguous(input_str: str) -> Dict[str, Any]:
     return {"tool": "INTERACT", "args": {"kind": "QUESTION", "text": "Which object do you want help with?", "choices": choices}}
 
 
-def _heuristic_always_ask(input_str: str) -> Dict[str, Any]:
+def _heuristic_always_ask(inp: Any) -> Dict[str, Any]:
     """
     H2: Always-ask baseline.
     Always ask before any motion, even with 1 candidate.
     """
-    inp = json_loads_strict(input_str)
     assert isinstance(inp, dict)
     objects = inp.get("objects") or []
     memory = inp.get("memory") or {}
@@ -310,6 +298,19 @@ class Metrics:
     by_num_candidates: Dict[str, Dict[str, int]] = field(default_factory=dict)
 
 
+# Headline rates of a summary as (name, numerator counter, denominator counter).
+RATES: List[RateSpec] = [
+    ("json_valid_rate", "json_valid", "n"),
+    ("schema_valid_rate", "schema_valid", "n"),
+    ("tool_accuracy", "tool_correct", "n"),
+    ("motion_obj_accuracy", "motion_obj_correct", "motion_n"),
+    ("motion_tool_accuracy", "motion_tool_correct", "motion_n"),
+    ("interact_kind_accuracy", "interact_kind_correct", "interact_n"),
+    ("interact_choices_valid_rate", "interact_choices_valid", "interact_n"),
+    ("strict_exact_rate", "strict_exact", "n"),
+]
+
+
 def _bump(d: Dict[str, int], k: str, inc: int = 1) -> None:
     d[k] = int(d.get(k, 0)) + int(inc)
 
@@ -349,13 +350,34 @@ class ModelSpec:
     kind: str = "llm"  # "llm" | "heuristic_ask_if_ambiguous" | "heuristic_always_ask"
 
 
+@dataclass(frozen=True)
+class EarlyStop:
+    """
+    Stop a model's run once the 95% CI half-width of every metric in `metrics` is at most
+    `ci_halfwidth` (checked every `check_every` examples from `min_examples` on).
+    """
+    ci_halfwidth: float
+    metrics: Tuple[str, ...] = ("tool_accuracy",)
+    min_examples: int = 100
+    check_every: int = 10
+
+    def __post_init__(self) -> None:
+        unknown = sorted(set(self.metrics) - {name for name, _, _ in RATES})
+        if unknown:
+            raise ValueError(f"Unknown early-stop metric(s) {unknown}; choose from {[name for name, _, _ in RATES]}")
+
+    def halfwidths(self, per_stratum: StratumCounters, population: Optional[Dict[str, int]]) -> Dict[str, float]:
+        est = summarize_rates(per_stratum, [r for r in RATES if r[0] in self.metrics], population)["estimates"]
+        return {name: (e["ci95"][1] - e["ci95"][0]) / 2 for name, e in est.items()}
+
+
 # =============================================================================
 # Main evaluation function
 # =============================================================================
 
 def _eval_one_model(
     spec: ModelSpec,
-    rows: List[Dict[str, Any]],
+    rows: Sequence[Union[Dict[str, Any], ContractRow]],
     *,
     seed: int,
     max_examples: int,
@@ -367,9 +389,26 @@ def _eval_one_model(
     dump_mistakes_jsonl: Optional[Path],
     max_mistakes: int,
     progress_every: int = 100,
+    strata: Optional[Sequence[str]] = None,
+    population: Optional[Dict[str, int]] = None,
+    early_stop: Optional[EarlyStop] = None,
+    batch_size: int = 1,
+    prefix_cache: bool = True,
+    stop_at_json: bool = True,
+    constrained: bool = False,
 ) -> Dict[str, Any]:
+    """
+    `strata` (the stratum of each row) and `population` (rows per stratum) come from
+    llm.contract_index.select; when given, headline rates are reweighted population
+    estimates. Every summary carries 95% intervals under "ci95".
+
+    With `early_stop`, rows are scored in a seeded order that keeps every prefix
+    stratum-balanced (llm.sampling.interleave_order) and the run ends as soon as the
+    intervals are narrow enough; the stopping point is recorded under "early_stop".
+    """
     set_seed(int(seed))
     m = Metrics()
+    per_stratum = StratumCounters(m, sorted({f for _, a, b in RATES for f in (a, b)}))
     mistakes: List[Dict[str, Any]] = []
     all_predictions: List[Dict[str, Any]] = []
 
@@ -388,26 +427,55 @@ def _eval_one_model(
             max_new_tokens=int(max_new_tokens),
             seed=int(seed),
             deterministic=(float(temperature) == 0.0 and float(top_p) == 1.0),
+            prefix_cache=bool(prefix_cache),
+            stop_at_json=bool(stop_at_json),
+            constrained=bool(constrained),
         )
         t0 = time.time()
-        model, tok = _load_model_and_tokenizer(cfg)
+        model, tok = get_model_and_tokenizer(cfg)
         load_s = time.time() - t0
         print(f"[{spec.name}] Model loaded in {load_s:.1f}s")
 
     n = min(int(max_examples), len(rows)) if int(max_examples) > 0 else len(rows)
     sample = rows[:n]
+    sample_strata = list(strata[:n]) if strata is not None else ["all"] * n
+    halfwidths: Dict[str, float] = {}
+    stopped = False
+    if early_stop is not None:
+        order = interleave_order(sample_strata, seed)
+        sample = [sample[i] for i in order]
+        sample_strata = [sample_strata[i] for i in order]
+    generations = None
+    if spec.kind == "llm":
+        sample = [r if isinstance(r, ContractRow) else ContractRow(r) for r in sample]
+        prompts = [f"{ex.instruction}\n\nInput:\n{ex.input_text}" for ex in sample]
+        generations = BatchedGenerations(model, tok, prompts, cfg, batch_size=batch_size)
+    prefix_before = prefix_cache_stats(model) if model is not None else None
+    decode_before = decode_stats(model) if model is not None else None
     t0_eval = time.time()
 
     for idx, r in enumerate(sample, start=1):
+        if early_stop is not None and idx - 1 >= early_stop.min_examples and (idx - 1) % early_stop.check_every == 0:
+            per_stratum.finish()
+            halfwidths = early_stop.halfwidths(per_stratum, population)
+            if all(hw <= early_stop.ci_halfwidth for hw in halfwidths.values()):
+                stopped = True
+                print(f"[{spec.name}] early stop after {m.n}/{len(sample)} examples | CI half-widths {halfwidths}")
+                break
+        per_stratum.start(sample_strata[idx - 1])
         m.n += 1
-        ex_id = str(r.get("id", "")).strip()
-        instruction = str(r.get("instruction", "")).strip()
-        input_str = str(r.get("input", "")).strip()
-        gt_str = str(r.get("output", "")).strip()
-        
-        ctx = _ctx_bucket(input_str)
-        user_mode = _get_user_mode(input_str)
-        num_cands = _get_num_candidates(input_str)
+        # Each field is parsed once (v2 contract rows are not parsed at all) and shared by
+        # the bucketing helpers and heuristics below; pass ContractRows to share it across models.
+        ex = r if isinstance(r, ContractRow) else ContractRow(r)
+        ex_id = ex.id
+        try:
+            inp = ex.input_obj
+        except ValueError:
+            inp = None
+
+        ctx = _ctx_bucket(inp)
+        user_mode = _get_user_mode(inp)
+        num_cands = _get_num_candidates(inp)
         cand_bucket = f"cands_{num_cands}" if num_cands <= 5 else "cands_6+"
 
         _bump_nested(m, "by_context", ctx, "n", 1)
@@ -416,30 +484,30 @@ def _eval_one_model(
 
         # Parse GT
         try:
-            gt_obj = json_loads_strict(gt_str)
-        except Exception:
+            gt_obj = ex.output_obj
+        except ValueError:
             _bump_nested(m, "by_context", ctx, "gt_invalid_json", 1)
             continue
         if not isinstance(gt_obj, dict):
             _bump_nested(m, "by_context", ctx, "gt_not_object", 1)
             continue
-        gt = _normalize_tool_call(gt_obj)
+        # Template-id INTERACT outputs (llm.templates) are compared in rendered form.
+        gt = _normalize_tool_call(try_render_tool_call(gt_obj, inp))
 
         # Predict
         raw = ""
         parse_err = None
         if spec.kind == "heuristic_ask_if_ambiguous":
-            pred_raw_obj = _heuristic_ask_if_ambiguous(input_str)
+            pred_raw_obj = _heuristic_ask_if_ambiguous(inp)
             raw = json.dumps(pred_raw_obj, ensure_ascii=False)
             pred_obj = pred_raw_obj
         elif spec.kind == "heuristic_always_ask":
-            pred_raw_obj = _heuristic_always_ask(input_str)
+            pred_raw_obj = _heuristic_always_ask(inp)
             raw = json.dumps(pred_raw_obj, ensure_ascii=False)
             pred_obj = pred_raw_obj
         else:
-            assert cfg is not None and model is not None and tok is not None
-            prompt = f"{instruction}\n\nInput:\n{input_str}"
-            raw = _generate_once(model, tok, _build_messages(prompt), cfg)
+            assert generations is not None
+            raw = generations[idx - 1]
             pred_obj, parse_err = _parse_model_json(raw)
             if pred_obj is None:
                 m.json_errors += 1
@@ -454,7 +522,7 @@ def _eval_one_model(
         m.json_valid += 1
         _bump_nested(m, "by_context", ctx, "json_valid", 1)
         _bump_nested(m, "by_mode", user_mode, "json_valid", 1)
-        pred = _normalize_tool_call(pred_obj)
+        pred = _normalize_tool_call(try_render_tool_call(pred_obj, inp))
 
         # Schema validity
         try:
@@ -554,26 +622,35 @@ def _eval_one_model(
             print(f"[{spec.name}] {idx}/{len(sample)} | {rate:.1f} ex/s | ETA {eta/60:.1f}m | tool_acc={_rate(m.tool_correct, m.n):.3f}")
 
     eval_s = time.time() - t0_eval
+    per_stratum.finish()
+    est = summarize_rates(per_stratum, RATES, population)
 
     # Build summary
     summary = {
         "model": {"name": spec.name, "kind": spec.kind, "model_path": spec.model_path},
-        "timing": {"load_s": load_s, "eval_s": eval_s, "examples_per_sec": m.n / max(eval_s, 1e-6)},
+        "timing": {
+            "load_s": load_s,
+            "eval_s": eval_s,
+            "examples_per_sec": m.n / max(eval_s, 1e-6),
+            "prefix_cache": prefix_cache_stats(model, since=prefix_before) if model is not None else None,
+            "decode": decode_stats(model, since=decode_before) if model is not None else None,
+        },
         "n": m.n,
         
         # Validity rates
-        "json_valid_rate": _rate(m.json_valid, m.n),
-        "schema_valid_rate": _rate(m.schema_valid, m.n),
+        "json_valid_rate": est["estimates"]["json_valid_rate"]["value"],
+        "schema_valid_rate": est["estimates"]["schema_valid_rate"]["value"],
         "json_errors": m.json_errors,
         "schema_errors": m.schema_errors,
         
         # Primary metrics
-        "tool_accuracy": _rate(m.tool_correct, m.n),
-        "motion_obj_accuracy": _rate(m.motion_obj_correct, m.motion_n),
-        "motion_tool_accuracy": _rate(m.motion_tool_correct, m.motion_n),
-        "interact_kind_accuracy": _rate(m.interact_kind_correct, m.interact_n),
-        "interact_choices_valid_rate": _rate(m.interact_choices_valid, m.interact_n),
-        "strict_exact_rate": _rate(m.strict_exact, m.n),
+        "tool_accuracy": est["estimates"]["tool_accuracy"]["value"],
+        "motion_obj_accuracy": est["estimates"]["motion_obj_accuracy"]["value"],
+        "motion_tool_accuracy": est["estimates"]["motion_tool_accuracy"]["value"],
+        "interact_kind_accuracy": est["estimates"]["interact_kind_accuracy"]["value"],
+        "interact_choices_valid_rate": est["estimates"]["interact_choices_valid_rate"]["value"],
+        "strict_exact_rate": est["estimates"]["strict_exact_rate"]["value"],
+        "ci95": {name: e["ci95"] for name, e in est["estimates"].items()},
         
         # Counts
         "motion_n": m.motion_n,
@@ -584,13 +661,25 @@ def _eval_one_model(
         "by_context": m.by_context,
         "by_mode": m.by_mode,
         "by_num_candidates": m.by_num_candidates,
+        "strata": est["strata"],
     }
+    if early_stop is not None:
+        if not stopped:
+            halfwidths = early_stop.halfwidths(per_stratum, population)
+        summary["early_stop"] = {
+            "ci_halfwidth": early_stop.ci_halfwidth,
+            "metrics": list(early_stop.metrics),
+            "min_examples": early_stop.min_examples,
+            "check_every": early_stop.check_every,
+            "planned_n": len(sample),
+            "stopped_at": m.n,
+            "stopped": stopped,
+            "final_ci_halfwidth": halfwidths,
+        }
 
     if dump_mistakes_jsonl:
         dump_mistakes_jsonl.parent.mkdir(parents=True, exist_ok=True)
-        with open(dump_mistakes_jsonl, "w", encoding="utf-8") as f:
-            for row in mistakes:
-                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        jsonl_io.write_jsonl(dump_mistakes_jsonl, mistakes)
         summary["mistakes_path"] = str(dump_mistakes_jsonl)
         summary["mistakes_n"] = len(mistakes)
 
@@ -634,12 +723,13 @@ def _write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
     fieldnames = [
         "name", "kind", "model_path", "n",
         "json_valid_rate", "schema_valid_rate",
-        "tool_accuracy", "motion_obj_accuracy", "motion_tool_accuracy",
+        "tool_accuracy", "tool_accuracy_ci95_lo", "tool_accuracy_ci95_hi",
+        "motion_obj_accuracy", "motion_tool_accuracy",
         "interact_kind_accuracy", "interact_choices_valid_rate",
         "strict_exact_rate",
         "motion_n", "interact_n",
         "json_errors", "schema_errors",
-        "load_s", "eval_s", "examples_per_sec",
+        "load_s", "eval_s", "examples_per_sec", "new_tokens_per_request", "latency_s_per_request",
         "mistakes_path", "mistakes_n",
     ]
     with open(path, "w", encoding="utf-8", newline="") as f:
@@ -648,6 +738,8 @@ def _write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
         for r in rows:
             model = r.get("model") or {}
             timing = r.get("timing") or {}
+            decode = timing.get("decode") or {}
+            tool_ci = (r.get("ci95") or {}).get("tool_accuracy") or [0.0, 1.0]
             out = {
                 "name": model.get("name"),
                 "kind": model.get("kind"),
@@ -656,6 +748,8 @@ def _write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
                 "json_valid_rate": f"{r.get('json_valid_rate', 0):.4f}",
                 "schema_valid_rate": f"{r.get('schema_valid_rate', 0):.4f}",
                 "tool_accuracy": f"{r.get('tool_accuracy', 0):.4f}",
+                "tool_accuracy_ci95_lo": f"{tool_ci[0]:.4f}",
+                "tool_accuracy_ci95_hi": f"{tool_ci[1]:.4f}",
                 "motion_obj_accuracy": f"{r.get('motion_obj_accuracy', 0):.4f}",
                 "motion_tool_accuracy": f"{r.get('motion_tool_accuracy', 0):.4f}",
                 "interact_kind_accuracy": f"{r.get('interact_kind_accuracy', 0):.4f}",
@@ -668,6 +762,8 @@ def _write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
                 "load_s": f"{timing.get('load_s', 0):.1f}",
                 "eval_s": f"{timing.get('eval_s', 0):.1f}",
                 "examples_per_sec": f"{timing.get('examples_per_sec', 0):.2f}",
+                "new_tokens_per_request": f"{decode.get('new_tokens_per_request', 0):.1f}",
+                "latency_s_per_request": f"{decode.get('latency_s_per_request', 0):.3f}",
                 "mistakes_path": r.get("mistakes_path"),
                 "mistakes_n": r.get("mistakes_n"),
             }
@@ -729,6 +825,29 @@ def _write_confusion_matrix_csv(path: Path, summaries: List[Dict[str, Any]]) ->
 # Main
 # =============================================================================
 
+def _add_early_stop_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--stop_ci_halfwidth",
+        type=float,
+        default=0.0,
+        help="Stop a model's run once the 95%% CI half-width of every --stop_metrics metric is <= this (0 = off).",
+    )
+    ap.add_argument("--stop_metrics", type=str, default="tool_accuracy", help="Comma-separated metrics for --stop_ci_halfwidth.")
+    ap.add_argument("--stop_min_examples", type=int, default=100, help="Never stop before this many examples.")
+    ap.add_argument("--stop_check_every", type=int, default=10, help="Check the stopping rule every N examples.")
+
+
+def _early_stop_from_args(args: argparse.Namespace) -> Optional[EarlyStop]:
+    if float(args.stop_ci_halfwidth) <= 0:
+        return None
+    return EarlyStop(
+        ci_halfwidth=float(args.stop_ci_halfwidth),
+        metrics=tuple(m.strip() for m in str(args.stop_metrics).split(",") if m.strip()),
+        min_examples=int(args.stop_min_examples),
+        check_every=max(1, int(args.stop_check_every)),
+    )
+
+
 def main(argv: Optional[List[str]] = None) -> None:
     ap = argparse.ArgumentParser(description="Offline executive benchmark (multi-model) on contract JSONL.")
     ap.add_argument("--contract_jsonl", type=str, required=True, help="Path to llm_contract*.jsonl.")
@@ -738,12 +857,53 @@ def main(argv: Optional[List[str]] = None) -> None:
     ap.add_argument("--out_dir", type=str, default="evaluation/eval_outputs/offline_exec", help="Output directory.")
 
     ap.add_argument("--max_examples", type=int, default=0, help="Max examples (0=all).")
+    ap.add_argument(
+        "--sample",
+        choices=SAMPLE_MODES,
+        default="head",
+        help="How --max_examples rows are picked: the first rows, uniformly (--seed), or stratified over --stratify_by.",
+    )
+    ap.add_argument(
+        "--stratify_by",
+        type=str,
+        default=",".join(DEFAULT_STRATIFY_BY),
+        help="Comma-separated features for --sample stratified (context, tool, mode, cands).",
+    )
+    ap.add_argument("--min_per_stratum", type=int, default=5, help="With --sample stratified: floor on examples per stratum.")
+    ap.add_argument(
+        "--prior_summary",
+        type=str,
+        default=None,
+        help="With --sample stratified: an earlier summary_all.json whose per-stratum tool accuracy drives Neyman allocation.",
+    )
+    ap.add_argument("--num_shards", type=int, default=1, help="Evaluate one of N contiguous shards of the contract (see --shard_id).")
+    ap.add_argument("--shard_id", type=int, default=0, help="Shard to evaluate with --num_shards.")
     ap.add_argument("--seed", type=int, default=0)
     ap.add_argument("--progress_every", type=int, default=100, help="Print progress every N examples.")
+    _add_early_stop_args(ap)
 
     ap.add_argument("--temperature", type=float, default=0.0)
     ap.add_argument("--top_p", type=float, default=1.0)
     ap.add_argument("--max_new_tokens", type=int, default=256)
+    ap.add_argument("--batch_size", type=int, default=1, help="Prompts per generate() call (left-padded, length-sorted).")
+    ap.add_argument(
+        "--prefix_cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Prefill the shared system prompt + instruction once per model and reuse its KV cache.",
+    )
+    ap.add_argument(
+        "--stop_at_json",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Stop decoding each example once its first top-level JSON object has closed.",
+    )
+    ap.add_argument(
+        "--constrained",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Constrain decoding to the tool-call grammar, obj ids from each example's objects.",
+    )
     ap.add_argument("--use_4bit", action=argparse.BooleanOptionalAction, default=False)
 
     ap.add_argument("--ignore_interact_text_in_strict", action=argparse.BooleanOptionalAction, default=True)
@@ -751,12 +911,25 @@ def main(argv: Optional[List[str]] = None) -> None:
     ap.add_argument("--max_mistakes", type=int, default=200)
 
     args = ap.parse_args(argv)
+    early_stop = _early_stop_from_args(args)
 
     contract_path = str(args.contract_jsonl)
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    rows = list(_iter_jsonl(contract_path))
+    # Only the selected rows are read (random access through the .idx sidecar).
+    selection = select(
+        contract_path,
+        max_examples=int(args.max_examples),
+        seed=int(args.seed),
+        mode=args.sample,
+        stratify_by=str(args.stratify_by).split(","),
+        min_per_stratum=int(args.min_per_stratum),
+        prior=load_prior(args.prior_summary) if args.prior_summary else None,
+        num_shards=int(args.num_shards),
+        shard_id=int(args.shard_id),
+    )
+    rows = [ContractRow(r) for r in selection.rows]
     if not rows:
         raise SystemExit("Empty contract_jsonl")
     print(f"[benchmark] Loaded {len(rows)} examples from {contract_path}")
@@ -792,12 +965,20 @@ def main(argv: Optional[List[str]] = None) -> None:
             dump_mistakes_jsonl=mistakes_path,
             max_mistakes=int(args.max_mistakes),
             progress_every=int(args.progress_every),
+            strata=selection.strata,
+            population=selection.population,
+            early_stop=early_stop,
+            batch_size=int(args.batch_size),
+            prefix_cache=bool(args.prefix_cache),
+            stop_at_json=bool(args.stop_at_json),
+            constrained=bool(args.constrained),
         )
         all_summaries.append(summary)
         
         # Print summary
         print(f"\n[{spec.name}] Results:")
-        print(f"  Tool accuracy:        {summary['tool_accuracy']:.4f}")
+        ci = summary["ci95"]
+        print(f"  Tool accuracy:        {summary['tool_accuracy']:.4f}  [{ci['tool_accuracy'][0]:.4f}, {ci['tool_accuracy'][1]:.4f}]")
         print(f"  Motion obj accuracy:  {summary['motion_obj_accuracy']:.4f}")
         print(f"  Interact kind acc:    {summary['interact_kind_accuracy']:.4f}")
         print(f"  Schema valid rate:    {summary['schema_valid_rate']:.4f}")
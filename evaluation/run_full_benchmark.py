@@ -27,13 +27,16 @@ import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 try:
     from . import _bootstrap  # noqa: F401
 except Exception:
     import _bootstrap  # type: ignore  # noqa: F401
 
+if TYPE_CHECKING:
+    from evaluation.offline_exec_benchmark import EarlyStop
+
 
 # =============================================================================
 # Configuration
@@ -140,19 +143,24 @@ def run_benchmark(
     use_4bit: bool = False,
     dump_mistakes: bool = True,
     progress_every: int = 100,
+    early_stop: Optional["EarlyStop"] = None,
+    batch_size: int = 1,
 ) -> Dict[str, Any]:
     """Run the benchmark using offline_exec_benchmark module."""
     from evaluation.offline_exec_benchmark import (
         ModelSpec,
         _eval_one_model,
-        _iter_jsonl,
         _write_json,
         _write_csv,
         _write_context_breakdown_csv,
         _write_confusion_matrix_csv,
     )
+    from llm.contract_index import select_rows
+    from llm.data import ContractRow
 
-    rows = list(_iter_jsonl(contract_jsonl))
+    # Wrapped once so every model shares the parsed inputs; only the first max_examples
+    # rows are read.
+    rows = [ContractRow(r) for r in select_rows(str(contract_jsonl), max_examples=max_examples, mode="head")]
     if not rows:
         raise RuntimeError(f"Empty contract JSONL: {contract_jsonl}")
     print(f"[benchmark] Loaded {len(rows)} examples from {contract_jsonl}")
@@ -191,6 +199,8 @@ def run_benchmark(
             dump_mistakes_jsonl=mistakes_path,
             max_mistakes=200,
             progress_every=progress_every,
+            early_stop=early_stop,
+            batch_size=batch_size,
         )
         all_summaries.append(summary)
 
@@ -200,6 +210,8 @@ def run_benchmark(
         print(f"  Motion obj accuracy:  {summary['motion_obj_accuracy']:.4f}")
         print(f"  Interact kind acc:    {summary['interact_kind_accuracy']:.4f}")
         print(f"  Schema valid rate:    {summary['schema_valid_rate']:.4f}")
+        if "early_stop" in summary:
+            print(f"  Evaluated:            {summary['early_stop']['stopped_at']}/{summary['early_stop']['planned_n']}")
 
     # Write outputs
     _write_json(out_dir / "summary_all.json", {"contract_jsonl": contract_jsonl, "summaries": all_summaries})
@@ -271,6 +283,8 @@ def print_context_breakdown(summaries: List[Dict[str, Any]]) -> None:
 
 
 def main() -> None:
+    from evaluation.offline_exec_benchmark import _add_early_stop_args, _early_stop_from_args
+
     ap = argparse.ArgumentParser(description="Run full offline executive benchmark for PRIME paper.")
     ap.add_argument("--contract_jsonl", type=str, default=None, help="Path to contract JSONL (default: data/runs/010/llm_contract.jsonl)")
     ap.add_argument("--out_dir", type=str, default=None, help="Output directory (default: auto-generated timestamp)")
@@ -282,7 +296,10 @@ def main() -> None:
     ap.add_argument("--use_4bit", action="store_true", help="Use 4-bit quantization")
     ap.add_argument("--no_dump_mistakes", action="store_true", help="Don't dump mistake JSONLs")
     ap.add_argument("--progress_every", type=int, default=100)
+    ap.add_argument("--batch_size", type=int, default=1, help="Prompts per generate() call for LLM models.")
+    _add_early_stop_args(ap)
     args = ap.parse_args()
+    early_stop = _early_stop_from_args(args)
 
     root = get_grasp_copilot_root()
     print(f"[benchmark] grasp-copilot root: {root}")
@@ -336,6 +353,8 @@ def main() -> None:
         use_4bit=args.use_4bit,
         dump_mistakes=not args.no_dump_mistakes,
         progress_every=args.progress_every,
+        early_stop=early_stop,
+        batch_size=args.batch_size,
     )
 
     # Print formatted results
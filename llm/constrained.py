@@ -0,0 +1,357 @@
+"""
+Schema-constrained decoding for the tool-call grammar.
+
+The model's output must be the compact tool-call JSON the contract trains on
+(`llm.data.generator_record_to_contract_parts`):
+
+  {"tool":"APPROACH"|"ALIGN_YAW","args":{"obj":<id>}}
+  {"tool":"INTERACT","args":{"kind":"QUESTION"|"SUGGESTION"|"CONFIRM","text":<str>,"choices":["1) <str>",...]}}
+  {"tool":"INTERACT","args":{"template":<id>,<slots>}}  (llm.templates)
+
+with `obj`/`objs` ids from the input's `objects` and at most MAX_INTERACT_CHOICES
+numbered choices. ToolCallGrammar is a character automaton for that language;
+ToolCallProcessor masks, per row of a batch and per step, every token that would leave
+it, and force-emits a single token wherever the continuation is fixed (keys, closing
+brackets, the "k) " choice numbers), so the output parses and validates without a repair
+pass.
+"""
+
+from __future__ import annotations
+
+import os
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from data_generator.oracle import MAX_INTERACT_CHOICES
+
+from .inference import prompt_input
+from .templates import ACTIONS, MAX_TEMPLATE_OBJS, TEMPLATES
+
+# Every constrained output starts with this; it is appended to the generation prompt
+# (prefilled, not decoded) and put back in front of the decoded text.
+GRAMMAR_PREFIX = '{"tool":"'
+INTERACT_KINDS = ("QUESTION", "SUGGESTION", "CONFIRM")
+
+END = "end"
+# Nodes of the full INTERACT form: their language does not depend on the object ids, so
+# their allowed-token sets are shared by every grammar with the same max_choices.
+SHARED_NODES = frozenset({"kind", "text_open", "text", "choices_open"})
+# (node, text matched inside the node)
+State = Tuple[str, str]
+
+
+def prompt_object_ids(prompt: str) -> List[str]:
+    """
+    Ids of the `objects` in a prompt's input JSON ([] if it has none or does not parse).
+    """
+    blob = prompt_input(prompt)
+    objects = blob.get("objects") if isinstance(blob, dict) else None
+    if not isinstance(objects, list):
+        return []
+    return [o["id"] for o in objects if isinstance(o, dict) and isinstance(o.get("id"), str) and o["id"]]
+
+
+def _free_char(ch: str) -> bool:
+    # Inside a string: anything but the closing quote, escapes and control characters.
+    return ch != '"' and ch != "\\" and ch >= " "
+
+
+class ToolCallGrammar:
+    """
+    Character automaton for the compact tool-call JSON. Nodes are literals ("lit"),
+    finite alternatives ("alt", value -> next node) and free strings ("str", ended by
+    the '"' that starts the next node). Object ids must not contain '"' or '\\'; the
+    motion tools and object templates are dropped when there are no ids.
+    """
+
+    def __init__(self, obj_ids: Sequence[str], max_choices: int = MAX_INTERACT_CHOICES):
+        ids = [i for i in dict.fromkeys(obj_ids) if i and all(_free_char(c) for c in i)]
+        tools = {"INTERACT": "interact"}
+        if ids:
+            tools.update({"APPROACH": "motion", "ALIGN_YAW": "motion"})
+        self.nodes: Dict[str, Tuple[str, Any, Any]] = {
+            "start": ("lit", GRAMMAR_PREFIX, "tool"),
+            "tool": ("alt", tools, None),
+            "motion": ("lit", '","args":{"obj":"', "obj"),
+            "obj": ("alt", {i: "motion_end" for i in ids}, None),
+            "motion_end": ("lit", '"}}', END),
+            "interact": ("lit", '","args":{"', "interact_args"),
+            "interact_args": ("alt", {'kind":"': "kind", 'template":"': "tpl"}, None),
+            "kind": ("alt", {k: "text_open" for k in INTERACT_KINDS}, None),
+            "text_open": ("lit", '","text":"', "text"),
+            "text": ("str", None, "choices_open"),
+            "choices_open": ("lit", '","choices":["1) ', "choice1"),
+        }
+        n = max(1, int(max_choices))
+        for k in range(1, n + 1):
+            self.nodes[f"choice{k}"] = ("str", None, f"sep{k}")
+            alts = {'"]}}': END}
+            if k < n:
+                alts[f'","{k + 1}) '] = f"choice{k + 1}"
+            self.nodes[f"sep{k}"] = ("alt", alts, None)
+        names = [name for name, t in TEMPLATES.items() if ids or not ({"obj", "objs"} & set(t.slots))]
+        self.nodes["tpl"] = ("alt", {name: f"tpl:{name}:0" for name in names}, None)
+        for name in names:
+            self._add_template(name, TEMPLATES[name].slots, ids)
+        self.shared_nodes = SHARED_NODES | {f"choice{k}" for k in range(1, n + 1)} | {f"sep{k}" for k in range(1, n + 1)}
+        self.obj_ids = tuple(ids)
+        self.max_choices = n
+        self.start: State = ("start", "")
+
+    def _add_template(self, name: str, slots: Tuple[str, ...], ids: Sequence[str]) -> None:
+        """
+        Nodes for `"template":"<name>` followed by its slots: node tpl:<name>:<k> holds
+        the ways to go on after slot k-1's closing quote.
+        """
+        p = f"tpl:{name}"
+
+        def follow(k: int) -> Dict[str, str]:
+            if k == len(slots):
+                return {'"}}': END}
+            slot = slots[k].rstrip("?")
+            out = {f'","{slot}":"' if slot != "objs" else '","objs":["': f"{p}:{slot}{k}"}
+            if slots[k].endswith("?"):
+                out.update(follow(k + 1))
+            return out
+
+        for k in range(len(slots) + 1):
+            self.nodes[f"{p}:{k}"] = ("alt", follow(k), None)
+        for k, slot in enumerate(slots):
+            slot = slot.rstrip("?")
+            if slot == "obj":
+                self.nodes[f"{p}:obj{k}"] = ("alt", {i: f"{p}:{k + 1}" for i in ids}, None)
+            elif slot == "action":
+                self.nodes[f"{p}:action{k}"] = ("alt", {a: f"{p}:{k + 1}" for a in ACTIONS}, None)
+            else:
+                # objs: up to MAX_TEMPLATE_OBJS ids, closed by '"]' + what follows the slot.
+                close = {'"]' + t[1:]: node for t, node in follow(k + 1).items()}
+                for j in range(MAX_TEMPLATE_OBJS):
+                    node = f"{p}:objs{k}" if j == 0 else f"{p}:objs{k}.{j}"
+                    self.nodes[node] = ("alt", {i: f"{p}:objs{k}.{j}.sep" for i in ids}, None)
+                    sep = dict(close)
+                    if j + 1 < MAX_TEMPLATE_OBJS:
+                        sep['","'] = f"{p}:objs{k}.{j + 1}"
+                    self.nodes[f"{p}:objs{k}.{j}.sep"] = ("alt", sep, None)
+
+    def step(self, state: State, ch: str) -> Optional[State]:
+        node, buf = state
+        if node == END:
+            return None
+        kind, payload, nxt = self.nodes[node]
+        if kind == "str":
+            if ch == '"':
+                return self.step((nxt, ""), ch)
+            return state if _free_char(ch) else None
+        if kind == "lit":
+            if payload[len(buf)] != ch:
+                return None
+            buf += ch
+            return (nxt, "") if buf == payload else (node, buf)
+        ext = buf + ch
+        longer = [v for v in payload if v.startswith(ext)]
+        if longer:
+            if longer == [ext]:
+                return (payload[ext], "")
+            return (node, ext)
+        if buf in payload:
+            return self.step((payload[buf], ""), ch)
+        return None
+
+    def feed(self, state: Optional[State], text: str) -> Optional[State]:
+        for ch in text:
+            if state is None:
+                return None
+            state = self.step(state, ch)
+        return state
+
+    def done(self, state: Optional[State]) -> bool:
+        return state is not None and state[0] == END
+
+    def first_chars(self, state: State) -> Optional[Set[str]]:
+        """
+        Characters that can follow `state` (None: any free-string character or '"').
+        """
+        node, buf = state
+        if node == END:
+            return set()
+        kind, payload, _ = self.nodes[node]
+        if kind == "str":
+            return None
+        if kind == "lit":
+            return {payload[len(buf)]}
+        chars = {v[len(buf)] for v in payload if v.startswith(buf) and len(v) > len(buf)}
+        if buf in payload:
+            after = self.first_chars((payload[buf], ""))
+            if after is None:
+                return None
+            chars |= after
+        return chars
+
+    def forced(self, state: State) -> str:
+        """
+        The text every valid continuation of `state` starts with, up to the next choice
+        point ("" inside free strings and at the end).
+        """
+        out = ""
+        node, buf = state
+        while node != END:
+            kind, payload, nxt = self.nodes[node]
+            if kind == "str":
+                break
+            if kind == "lit":
+                out += payload[len(buf) :]
+                node, buf = nxt, ""
+                continue
+            values = [v for v in payload if v.startswith(buf)]
+            if len(values) != 1:
+                out += os.path.commonprefix(values)[len(buf) :] if values else ""
+                break
+            out += values[0][len(buf) :]
+            node, buf = payload[values[0]], ""
+        return out
+
+
+class TokenIndex:
+    """
+    Standalone decoding of every token id of a tokenizer, built once per tokenizer.
+    Assumes a token's text does not depend on its neighbours (true for byte-level BPE
+    such as Qwen's; a split multi-byte character decodes to U+FFFD, a free-string
+    character). `free` holds the ids made only of free-string characters; the rest are
+    checked against the automaton when a state is first seen.
+    """
+
+    def __init__(self, tok):
+        special = set(getattr(tok, "all_special_ids", None) or [])
+        self.eos_token_id = tok.eos_token_id
+        self.strs: List[str] = []
+        self.free: List[int] = []
+        self.other: List[int] = []
+        self.by_first: Dict[str, List[int]] = {}
+        for i in range(len(tok)):
+            s = "" if i in special else tok.decode([i], skip_special_tokens=True)
+            self.strs.append(s)
+            if not s:
+                continue
+            (self.free if all(_free_char(c) for c in s) else self.other).append(i)
+            self.by_first.setdefault(s[0], []).append(i)
+        # Allowed sets of ID-independent states, keyed by (state, max_choices).
+        self.shared: Dict[Tuple[State, int], Tuple[List[int], bool]] = {}
+        self._constraints: "OrderedDict[Tuple[str, ...], TokenConstraint]" = OrderedDict()
+
+    def constraint(self, obj_ids: Sequence[str], max_cached: int = 64) -> "TokenConstraint":
+        key = tuple(obj_ids)
+        tc = self._constraints.get(key)
+        if tc is None:
+            tc = self._constraints[key] = TokenConstraint(self, ToolCallGrammar(key))
+            while len(self._constraints) > max_cached:
+                self._constraints.popitem(last=False)
+        self._constraints.move_to_end(key)
+        return tc
+
+
+_TOKEN_INDEXES: "weakref.WeakKeyDictionary[Any, TokenIndex]" = weakref.WeakKeyDictionary()
+
+
+def token_index(tok) -> TokenIndex:
+    index = _TOKEN_INDEXES.get(tok)
+    if index is None:
+        index = _TOKEN_INDEXES[tok] = TokenIndex(tok)
+    return index
+
+
+class TokenConstraint:
+    """
+    Allowed next-token ids of a ToolCallGrammar, memoized per automaton state (the
+    states outside free strings are few, and a free string's allowed set does not depend
+    on its content). Where the continuation is forced, only the longest token covering
+    a prefix of it is allowed.
+    """
+
+    def __init__(self, index: TokenIndex, grammar: ToolCallGrammar):
+        self.index = index
+        self.grammar = grammar
+        self.eos: Tuple[List[int], bool] = ([index.eos_token_id], True)
+        self._allowed: Dict[State, Tuple[List[int], bool]] = {}
+
+    def allowed(self, state: Optional[State]) -> Tuple[List[int], bool]:
+        """
+        (ids, forced) for `state`; EOS only once the object is complete (or the row has
+        left the grammar, which the mask prevents).
+        """
+        if state is None or self.grammar.done(state):
+            return self.eos
+        if state[0] not in self.grammar.shared_nodes:
+            hit = self._allowed.get(state)
+            if hit is None:
+                hit = self._allowed[state] = self._compute(state)
+            return hit
+        key = (state, self.grammar.max_choices)
+        hit = self.index.shared.get(key)
+        if hit is None:
+            hit = self.index.shared[key] = self._compute(state)
+        return hit
+
+    def _compute(self, state: State) -> Tuple[List[int], bool]:
+        g, index, strs = self.grammar, self.index, self.index.strs
+        chars = g.first_chars(state)
+        if chars is None:
+            # Free string: every free token, plus the tokens that close it validly.
+            candidates, ids = index.other, list(index.free)
+        else:
+            candidates, ids = [i for c in sorted(chars) for i in index.by_first.get(c, ())], []
+        forced = g.forced(state)
+        if forced:
+            fits = [i for i in candidates if forced.startswith(strs[i])]
+            if fits:
+                return [max(fits, key=lambda i: (len(strs[i]), -i))], True
+        ids += [i for i in candidates if g.feed(state, strs[i]) is not None]
+        if not ids:
+            raise ValueError(f"No token of the vocabulary continues the tool-call grammar at {state!r}")
+        return sorted(ids), False
+
+
+class ToolCallProcessor:
+    """
+    Logits processor (the transformers LogitsProcessor call protocol) constraining row b
+    of a generate() batch to `constraints[b]`. Each call feeds the row's newest token to
+    its automaton, then keeps only the allowed ids' scores; a forced id gets score 0 so
+    it is emitted whatever the sampling settings.
+    """
+
+    def __init__(self, constraints: Sequence[TokenConstraint], prompt_len: int):
+        self.constraints = list(constraints)
+        self.prompt_len = int(prompt_len)
+        self.states: List[Optional[State]] = [tc.grammar.feed(tc.grammar.start, GRAMMAR_PREFIX) for tc in self.constraints]
+        self.forced_tokens = 0
+        self._ids: Dict[Tuple[int, Any], Any] = {}
+
+    def _tensor(self, ids: List[int], device):
+        import torch
+
+        key = (id(ids), device)
+        t = self._ids.get(key)
+        if t is None:
+            t = self._ids[key] = torch.tensor(ids, dtype=torch.long, device=device)
+        return t
+
+    def __call__(self, input_ids, scores):
+        import torch
+
+        if input_ids.shape[-1] > self.prompt_len:
+            for b, tc in enumerate(self.constraints):
+                if self.states[b] is not None and not tc.grammar.done(self.states[b]):
+                    self.states[b] = tc.grammar.feed(self.states[b], tc.index.strs[int(input_ids[b, -1])])
+        out = torch.full_like(scores, float("-inf"))
+        for b, tc in enumerate(self.constraints):
+            ids, forced = tc.allowed(self.states[b])
+            idx = self._tensor(ids, scores.device)
+            if forced:
+                out[b, idx] = 0.0
+                self.forced_tokens += int(ids is not tc.eos[0])
+                continue
+            out[b, idx] = scores[b, idx]
+            if not torch.isfinite(out[b, idx]).any():
+                # Sampling filters (top_p) removed every allowed id; fall back to uniform.
+                out[b, idx] = 0.0
+        return out
@@ -0,0 +1,405 @@
+"""
+Byte-offset index for contract JSONL files.
+
+`<contract>.jsonl.idx` is a sidecar holding, per row, the byte offset and length of its
+line plus precomputed features (tool, context type, mode, candidate count). Readers mmap
+both files, so sampling, stratified sampling and sharding read only the selected rows:
+
+    index = ContractIndex.open("llm_contract.jsonl")  # builds/refreshes the sidecar
+    picks = index.stratified_sample(500, seed=0, by=("tool", "context"))
+    rows = list(index.read(picks))
+
+Sidecar layout: one JSON header line (format, row count, source size/mtime, feature
+vocabularies), padded to INDEX_ALIGN bytes, followed by `len(index)` fixed-size
+RECORD_DTYPE records. A sidecar whose source size/mtime no longer match is rebuilt.
+
+Compressed contracts (.gz/.zst) cannot be seeked into; for them (and when the sidecar
+cannot be written) `open` parses the file once and keeps the rows in memory, with the
+same API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_generator.jsonl_io import compression_suffix, iter_jsonl
+
+from .data import ContractRow
+from .sampling import allocate
+
+INDEX_FORMAT = "grasp-contract-idx/1"
+INDEX_SUFFIX = ".idx"
+INDEX_ALIGN = 64
+FEATURES: Tuple[str, ...] = ("tool", "context", "mode")
+SAMPLE_MODES: Tuple[str, ...] = ("random", "stratified", "head")
+DEFAULT_STRATIFY_BY: Tuple[str, ...] = ("context", "tool", "mode")
+ALL_ROWS = "all"
+RECORD_DTYPE = np.dtype(
+    [("offset", "<u8"), ("length", "<u4"), ("tool", "<u2"), ("context", "<u2"), ("mode", "<u2"), ("cands", "<u2")]
+)
+
+
+def row_features(row: Mapping[str, Any]) -> Tuple[str, str, str, int]:
+    """
+    (tool, context type, mode, number of candidates) of one contract row. Missing values
+    are "none" (as in data_generator.quota.bucket_key); unparsable fields are "invalid".
+    """
+    ex = ContractRow(row)
+    try:
+        out = ex.output_obj
+        tool = str(out.get("tool")) if isinstance(out, dict) else "invalid"
+    except ValueError:
+        tool = "invalid"
+    try:
+        inp = ex.input_obj
+    except ValueError:
+        return tool, "invalid", "invalid", 0
+    if not isinstance(inp, dict):
+        return tool, "invalid", "invalid", 0
+    memory = inp.get("memory") if isinstance(inp.get("memory"), dict) else {}
+    last_prompt = memory.get("last_prompt") if isinstance(memory.get("last_prompt"), dict) else {}
+    ctx = last_prompt.get("context")
+    ctx_type = ctx.get("type") if isinstance(ctx, dict) else None
+    user_state = inp.get("user_state") if isinstance(inp.get("user_state"), dict) else {}
+    return (
+        tool,
+        str(ctx_type or "none"),
+        str(user_state.get("mode") or "none"),
+        len(memory.get("candidates") or []),
+    )
+
+
+def index_path(path: str) -> str:
+    return str(path) + INDEX_SUFFIX
+
+
+class _Vocab:
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        c = self._codes.get(name)
+        if c is None:
+            c = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return c
+
+
+def _records(rows: Iterable[Tuple[int, int, Mapping[str, Any]]]) -> Tuple[np.ndarray, Dict[str, List[str]]]:
+    vocabs = {f: _Vocab() for f in FEATURES}
+    recs: List[Tuple[int, int, int, int, int, int]] = []
+    for offset, length, row in rows:
+        tool, ctx, mode, cands = row_features(row)
+        recs.append(
+            (offset, length, vocabs["tool"].code(tool), vocabs["context"].code(ctx), vocabs["mode"].code(mode), min(cands, 0xFFFF))
+        )
+    return np.array(recs, dtype=RECORD_DTYPE), {f: v.names for f, v in vocabs.items()}
+
+
+def _source_stamp(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns)}
+
+
+def build_index(path: str) -> str:
+    """
+    Scan `path` once and write its sidecar (atomically); returns the sidecar path.
+    """
+    if compression_suffix(path):
+        raise ValueError(f"Cannot index a compressed file (no random access): {path}")
+
+    def lines() -> Iterator[Tuple[int, int, Mapping[str, Any]]]:
+        offset = 0
+        with open(path, "rb") as f:
+            for i, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        obj = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"{path}:{i}: Invalid JSON: {e}") from e
+                    yield offset, len(line), obj
+                offset += len(line)
+
+    stamp = _source_stamp(path)
+    recs, vocab = _records(lines())
+    header = json.dumps(
+        {"format": INDEX_FORMAT, "rows": int(len(recs)), "source": stamp, "vocab": vocab, "dtype": RECORD_DTYPE.descr},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    pad = -(len(header) + 1) % INDEX_ALIGN
+    out = index_path(path)
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header + b" " * pad + b"\n")
+        f.write(recs.tobytes())
+    os.replace(tmp, out)
+    return out
+
+
+def _read_header(idx: str) -> Tuple[Dict[str, Any], int]:
+    with open(idx, "rb") as f:
+        line = f.readline()
+    header = json.loads(line)
+    if header.get("format") != INDEX_FORMAT:
+        raise ValueError(f"Not a contract index: {idx}")
+    return header, len(line)
+
+
+class ContractIndex:
+    """
+    Random access to the rows of one contract JSONL plus their precomputed features.
+    Row numbers are 0-based positions among the non-blank lines.
+    """
+
+    def __init__(self, path: str, records: np.ndarray, vocab: Dict[str, List[str]], rows: Optional[List[Dict]] = None):
+        self.path = str(path)
+        self.records = records
+        self.vocab = vocab
+        self._rows = rows
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+
+    @classmethod
+    def open(cls, path: str, *, build: bool = True) -> "ContractIndex":
+        """
+        Open `path` through its sidecar, (re)building it first if it is missing or stale
+        and `build` is true.
+        """
+        path = str(path)
+        if compression_suffix(path):
+            return cls._in_memory(path)
+        idx = index_path(path)
+        header: Optional[Dict[str, Any]] = None
+        if os.path.exists(idx):
+            header, header_len = _read_header(idx)
+            if header.get("source") != _source_stamp(path):
+                header = None
+        if header is None:
+            if not build:
+                raise FileNotFoundError(f"Missing or stale index for {path}; run `python -m llm.contract_index {path}`")
+            try:
+                build_index(path)
+            except OSError:
+                # Unwritable data directory (EACCES, or EROFS on a read-only mount): index
+                # in memory for this run instead.
+                return cls._in_memory(path)
+            header, header_len = _read_header(idx)
+        n = int(header["rows"])
+        recs = (
+            np.memmap(idx, dtype=RECORD_DTYPE, mode="r", offset=header_len, shape=(n,))
+            if n
+            else np.zeros(0, dtype=RECORD_DTYPE)
+        )
+        return cls(path, recs, {f: list(header["vocab"][f]) for f in FEATURES})
+
+    @classmethod
+    def _in_memory(cls, path: str) -> "ContractIndex":
+        loaded = [obj for _, obj in iter_jsonl(path)]
+        recs, vocab = _records((0, 0, obj) for obj in loaded)
+        return cls(path, recs, vocab, rows=loaded)
+
+    def __len__(self) -> int:
+        return int(len(self.records))
+
+    def __enter__(self) -> "ContractIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _map(self) -> mmap.mmap:
+        if self._mm is None:
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def read(self, indices: Iterable[int]) -> Iterator[Dict]:
+        """
+        Yield the rows at `indices` (in the given order), reading only those lines.
+        """
+        if self._rows is not None:
+            for i in indices:
+                yield self._rows[int(i)]
+            return
+        if not len(self.records):
+            return
+        mm = self._map()
+        for i in indices:
+            rec = self.records[int(i)]
+            start = int(rec["offset"])
+            yield json.loads(mm[start : start + int(rec["length"])])
+
+    def labels(self, feature: str) -> List[str]:
+        """
+        Per-row values of a feature ("tool", "context", "mode" or "cands").
+        """
+        if feature == "cands":
+            return [str(c) for c in self.records["cands"]]
+        names = self.vocab[feature]
+        return [names[c] for c in self.records[feature]]
+
+    def strata(self, by: Sequence[str] = ("tool", "context")) -> Dict[str, np.ndarray]:
+        """
+        Row indices grouped by the joined feature values, e.g. {"INTERACT|confirm": [...]}.
+        """
+        if not len(self.records):
+            return {}
+        cols = np.stack([np.asarray(self.records[f], dtype=np.int64) for f in by], axis=1)
+        keys, inverse = np.unique(cols, axis=0, return_inverse=True)
+        inverse = np.asarray(inverse).reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        out: Dict[str, np.ndarray] = {}
+        for k, key in enumerate(keys):
+            name = "|".join(str(v) if f == "cands" else self.vocab[f][int(v)] for f, v in zip(by, key))
+            out[name] = order[bounds[k] : bounds[k + 1]]
+        return out
+
+    def counts(self, by: Sequence[str] = ("tool", "context")) -> Dict[str, int]:
+        return {k: int(len(v)) for k, v in self.strata(by).items()}
+
+    def sample(self, n: int, seed: int = 0, rows: Optional[Sequence[int]] = None) -> List[int]:
+        """
+        `n` row indices drawn uniformly without replacement from `rows` (default: all).
+        Picks the same rows as `random.Random(seed).sample(all_rows, n)` on the loaded list.
+        """
+        pool = range(len(self)) if rows is None else rows
+        if n >= len(pool):
+            return list(pool)
+        return [pool[i] for i in random.Random(int(seed)).sample(range(len(pool)), int(n))]
+
+    def _pool_strata(self, by: Sequence[str], rows: Optional[Sequence[int]]) -> Dict[str, np.ndarray]:
+        strata = self.strata(by)
+        if rows is not None:
+            keep = np.zeros(len(self), dtype=bool)
+            keep[np.asarray(list(rows), dtype=np.int64)] = True
+            strata = {k: v[keep[v]] for k, v in strata.items()}
+            strata = {k: v for k, v in strata.items() if len(v)}
+        return strata
+
+    def stratified_sample(
+        self,
+        n: int,
+        seed: int = 0,
+        by: Sequence[str] = ("tool", "context"),
+        rows: Optional[Sequence[int]] = None,
+        *,
+        min_per_stratum: int = 0,
+        prior: Optional[Mapping[str, float]] = None,
+    ) -> List[int]:
+        """
+        `n` row indices split across strata by `llm.sampling.allocate` (proportional to
+        stratum size by default; at least `min_per_stratum` each; Neyman-weighted by a
+        per-stratum `prior` accuracy), uniformly within each stratum; in file order.
+        """
+        strata = self._pool_strata(by, rows)
+        total = sum(len(v) for v in strata.values())
+        if n >= total:
+            return sorted(int(i) for v in strata.values() for i in v)
+        alloc = allocate({k: len(v) for k, v in strata.items()}, n, min_per_stratum=min_per_stratum, prior=prior)
+        rng = random.Random(int(seed))
+        picked: List[int] = []
+        for k in sorted(strata):
+            members = strata[k]
+            picked.extend(int(members[i]) for i in rng.sample(range(len(members)), alloc[k]))
+        return sorted(picked)
+
+    def shard(self, num_shards: int, shard_id: int) -> range:
+        """
+        Contiguous row range of shard `shard_id` out of `num_shards` (sizes differ by <= 1).
+        """
+        if not 0 <= int(shard_id) < int(num_shards):
+            raise ValueError(f"shard_id must be in [0, {num_shards}), got {shard_id}")
+        n = len(self)
+        return range(n * int(shard_id) // int(num_shards), n * (int(shard_id) + 1) // int(num_shards))
+
+
+@dataclass
+class Selection:
+    """
+    Rows picked for an evaluation run, the stratum of each (ALL_ROWS unless sampled
+    with mode="stratified") and how many rows of this shard each stratum stands for.
+    """
+
+    rows: List[Dict]
+    strata: List[str]
+    population: Dict[str, int]
+
+
+def select(
+    path: str,
+    *,
+    max_examples: int = 0,
+    seed: int = 0,
+    mode: str = "random",
+    stratify_by: Sequence[str] = DEFAULT_STRATIFY_BY,
+    min_per_stratum: int = 0,
+    prior: Optional[Mapping[str, float]] = None,
+    num_shards: int = 1,
+    shard_id: int = 0,
+) -> Selection:
+    """
+    Rows of `path` for an evaluation run: this shard's rows, then `max_examples` of them
+    (0 = all) picked by `mode` ("head", "random" or "stratified"). Only the picked rows
+    are read.
+    """
+    with ContractIndex.open(path) as index:
+        pool = index.shard(num_shards, shard_id)
+        n = len(pool) if int(max_examples) <= 0 else min(int(max_examples), len(pool))
+        if mode == "stratified":
+            picks: Sequence[int] = index.stratified_sample(
+                n, seed, by=stratify_by, rows=pool, min_per_stratum=min_per_stratum, prior=prior
+            )
+            strata = index._pool_strata(stratify_by, pool)
+            key = {int(i): k for k, members in strata.items() for i in members}
+            return Selection(
+                list(index.read(picks)), [key[int(i)] for i in picks], {k: int(len(v)) for k, v in strata.items()}
+            )
+        if mode == "head" or n >= len(pool):
+            picks = pool[:n]
+        elif mode == "random":
+            picks = index.sample(n, seed, rows=pool)
+        else:
+            raise ValueError(f"Unknown sampling mode: {mode!r}")
+        rows = list(index.read(picks))
+        return Selection(rows, [ALL_ROWS] * len(rows), {ALL_ROWS: len(pool)})
+
+
+def select_rows(path: str, **kwargs: Any) -> List[Dict]:
+    """
+    `select(path, **kwargs).rows`.
+    """
+    return select(path, **kwargs).rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Build (or refresh) the .idx sidecar of contract JSONL files.")
+    ap.add_argument("paths", nargs="+", help="Contract JSONL files.")
+    ap.add_argument("--by", type=str, default="tool,context", help="Features to print row counts for.")
+    args = ap.parse_args(argv)
+    for path in args.paths:
+        build_index(path)
+        with ContractIndex.open(path) as index:
+            print(json.dumps({"path": path, "rows": len(index), "counts": index.counts(args.by.split(","))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import Dict, Iterable, Iterator, List, NoReturn, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, NoReturn, Optional, Sequence, Tuple
 
+from data_generator import jsonl_io
+from data_generator.delta import iter_generator_jsonl
+
+from .templates import OUTPUT_FORMATS, TEMPLATE_INSTRUCTION, encode_interact
 from .utils import json_loads_strict
 
 
@@ -51,20 +56,119 @@ def _fail(path: str, line_no: int, msg: str) -> NoReturn:
     raise ValueError(f"{path}:{line_no}: {msg}")
 
 
+# Contract versions: v1 stores input/output as JSON strings; v2 stores them as nested
+# objects, so a row is parsed once instead of once per JSON-in-JSON field.
+CONTRACT_VERSIONS: Tuple[int, ...] = (1, 2)
+_UNSET = object()
+
+
+def _compact(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class ContractRow:
+    """
+    Lazy view of one contract row (v1 or v2).
+
+    `input_obj`/`output_obj` are parsed at most once (v2 fields are already objects) and
+    raise ValueError if the field is not valid JSON. `input_text`/`output_text` are the
+    model-facing strings; for v2 rows they are the compact encoding, which is exactly
+    what the v1 row would store.
+    """
+
+    __slots__ = ("raw", "_input", "_output")
+
+    def __init__(self, raw: Mapping[str, Any]):
+        self.raw = raw
+        self._input: Any = _UNSET
+        self._output: Any = _UNSET
+
+    @property
+    def id(self) -> str:
+        return str(self.raw.get("id", "")).strip()
+
+    @property
+    def instruction(self) -> str:
+        return str(self.raw.get("instruction", "")).strip()
+
+    @staticmethod
+    def _parse(value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        try:
+            return json_loads_strict(value)
+        except ValueError as e:
+            return e
+
+    def _get(self, slot: str, key: str) -> Any:
+        value = getattr(self, slot)
+        if value is _UNSET:
+            value = self._parse(self.raw.get(key, ""))
+            setattr(self, slot, value)
+        if isinstance(value, ValueError):
+            raise value
+        return value
+
+    @property
+    def input_obj(self) -> Any:
+        return self._get("_input", "input")
+
+    @property
+    def output_obj(self) -> Any:
+        return self._get("_output", "output")
+
+    @property
+    def input_text(self) -> str:
+        value = self.raw.get("input", "")
+        return value.strip() if isinstance(value, str) else _compact(value)
+
+    @property
+    def output_text(self) -> str:
+        value = self.raw.get("output", "")
+        return value.strip() if isinstance(value, str) else _compact(value)
+
+
+def contract_version(row: Mapping[str, Any]) -> int:
+    """
+    1 if input and output are both strings, 2 if both are objects; ValueError for a row
+    that mixes the two layouts.
+    """
+    input_is_str = isinstance(row.get("input", ""), str)
+    if input_is_str != isinstance(row.get("output", ""), str):
+        raise ValueError("Contract row mixes v1 (string) and v2 (object) input/output")
+    return 1 if input_is_str else 2
+
+
 def iter_jsonl(path: str) -> Iterator[Tuple[int, Dict]]:
-    with open(path, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, start=1):
-            line = line.strip()
-            if not line:
-                continue
-            obj: Dict
-            try:
-                obj = json.loads(line)
-            except Exception as e:
-                _fail(path, i, f"Invalid JSON: {e}")
-            if not isinstance(obj, dict):
-                _fail(path, i, "Expected JSON object per line")
-            yield i, obj
+    # Plain, .gz or .zst by extension.
+    return jsonl_io.iter_jsonl(path)
+
+
+def validate_contract_row(obj: Mapping[str, Any], where: Tuple[str, int] = ("<records>", 0)) -> None:
+    """
+    Check one contract row (see `validate_dataset_contract_jsonl`); `where` is the
+    (path, line_no) used in error messages.
+    """
+    path, line_no = where
+    missing = {k for k in ("id", "instruction", "input", "output") if k not in obj}
+    if missing:
+        _fail(path, line_no, f"Missing keys: {sorted(missing)}")
+    if not isinstance(obj["id"], str):
+        _fail(path, line_no, "id must be a string")
+    if not isinstance(obj["instruction"], str):
+        _fail(path, line_no, "instruction must be a string")
+    if not isinstance(obj["input"], (str, dict)):
+        _fail(path, line_no, "input must be a string or an object")
+    if isinstance(obj["input"], str) != isinstance(obj["output"], str):
+        _fail(path, line_no, "input and output must both be strings (v1) or both objects (v2)")
+    if isinstance(obj["output"], dict):
+        return
+    if not isinstance(obj["output"], str):
+        _fail(path, line_no, "output must be a string or an object")
+    try:
+        json_loads_strict(obj["output"])
+    except Exception as e:
+        _fail(path, line_no, f"output must be valid JSON string: {e}")
 
 
 def validate_dataset_contract_jsonl(path: str) -> None:
@@ -72,25 +176,12 @@ def validate_dataset_contract_jsonl(path: str) -> None:
     Dataset contract:
       - id: string
       - instruction: string
-      - input: string (may be empty)
-      - output: string (must parse as JSON)
+      - input: string (may be empty); v2: object
+      - output: string (must parse as JSON); v2: object
+      - input and output use the same layout (both strings or both objects)
     """
     for line_no, obj in iter_jsonl(path):
-        missing = {k for k in ("id", "instruction", "input", "output") if k not in obj}
-        if missing:
-            _fail(path, line_no, f"Missing keys: {sorted(missing)}")
-        if not isinstance(obj["id"], str):
-            _fail(path, line_no, "id must be a string")
-        if not isinstance(obj["instruction"], str):
-            _fail(path, line_no, "instruction must be a string")
-        if not isinstance(obj["input"], str):
-            _fail(path, line_no, "input must be a string")
-        if not isinstance(obj["output"], str):
-            _fail(path, line_no, "output must be a string")
-        try:
-            json_loads_strict(obj["output"])
-        except Exception as e:
-            _fail(path, line_no, f"output must be valid JSON string: {e}")
+        validate_contract_row(obj, (path, line_no))
 
 
 def dataset_contract_to_qwen_chat_messages(ex: DatasetExample) -> Dict:
@@ -107,25 +198,109 @@ def dataset_contract_to_qwen_chat_messages(ex: DatasetExample) -> Dict:
     }
 
 
+def iter_dataset_contract(path: str) -> Iterator[DatasetExample]:
+    """
+    Stream contract examples without loading the whole file. Call
+    `validate_dataset_contract_jsonl` first if the file is untrusted. v2 rows yield the
+    same (string) examples as the equivalent v1 rows.
+    """
+    for _, obj in iter_jsonl(path):
+        if contract_version(obj) == 1:
+            yield DatasetExample(id=obj["id"], instruction=obj["instruction"], input=obj["input"], output=obj["output"])
+        else:
+            row = ContractRow(obj)
+            yield DatasetExample(id=obj["id"], instruction=obj["instruction"], input=row.input_text, output=row.output_text)
+
+
 def load_dataset_contract(path: str) -> List[DatasetExample]:
     validate_dataset_contract_jsonl(path)
-    out: List[DatasetExample] = []
-    for _, obj in iter_jsonl(path):
-        out.append(
-            DatasetExample(
-                id=obj["id"],
-                instruction=obj["instruction"],
-                input=obj["input"],
-                output=obj["output"],
-            )
-        )
-    return out
+    return list(iter_dataset_contract(path))
 
 
 def write_jsonl(path: str, rows: Iterable[Dict]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    jsonl_io.write_jsonl(path, rows)
+
+
+DEFAULT_INSTRUCTION = (
+    "Given the robot observation and dialog context, infer the user's intent and "
+    "emit exactly one tool call. Output ONLY the tool call JSON with keys tool and args. "
+    "If the tool is INTERACT, you must output at most 5 choices total."
+)
+
+
+def default_instruction(output_format: str = "full") -> str:
+    return TEMPLATE_INSTRUCTION if output_format == "template" else DEFAULT_INSTRUCTION
+
+
+GENERATOR_RECORD_KEYS: Tuple[str, ...] = ("episode_id", "objects", "gripper_hist", "memory", "user_state", "target_tool_call")
+
+
+def generator_record_to_contract_parts(
+    obj: Dict,
+    *,
+    max_past_dialogs: int = 12,
+    where: Tuple[str, int] = ("<records>", 0),
+    output_format: str = "full",
+) -> Tuple[str, str]:
+    """
+    Convert one generator record into its contract (input, output) JSON strings.
+    `where` is the (path, line_no) used in error messages. With output_format="template",
+    INTERACT outputs are written as template id + slots (llm.templates) whenever that
+    renders back to the oracle call exactly.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output_format: {output_format!r} (expected one of {OUTPUT_FORMATS})")
+    for k in GENERATOR_RECORD_KEYS:
+        if k not in obj:
+            _fail(where[0], where[1], f"Missing key: {k}")
+    mem = obj["memory"]
+    if isinstance(mem, Mapping) and not isinstance(mem, dict):
+        # Streamed generator records carry a read-only memory snapshot.
+        mem = dict(mem)
+    # Reduce truncation noise: keep a short dialog window (most recent messages).
+    # This makes the supervised mapping more consistent at fixed max_seq_length.
+    if isinstance(mem, dict) and isinstance(mem.get("past_dialogs"), list) and int(max_past_dialogs) > 0:
+        mem = dict(mem)
+        mem["past_dialogs"] = list(mem.get("past_dialogs") or [])[-int(max_past_dialogs) :]
+
+    input_blob = {"objects": obj["objects"], "gripper_hist": obj["gripper_hist"], "memory": mem, "user_state": obj["user_state"]}
+    output_obj = obj["target_tool_call"]
+    if not isinstance(output_obj, dict):
+        _fail(where[0], where[1], "target_tool_call must be an object")
+    if output_format == "template":
+        output_obj = encode_interact(output_obj, obj["objects"]) or output_obj
+    output_str = json.dumps(output_obj, ensure_ascii=False, separators=(",", ":"))
+    json_loads_strict(output_str)  # sanity
+    # Compact JSON to reduce token count and avoid max_seq_length truncation.
+    input_str = json.dumps(input_blob, ensure_ascii=False, separators=(",", ":"))
+    return input_str, output_str
+
+
+def contract_line(ex_id: str, instruction: str, input_str: str, output_str: str, *, version: int = 1) -> str:
+    """
+    One contract JSONL line (no newline) from the compact strings of
+    `generator_record_to_contract_parts`. v2 splices them in as nested objects.
+    """
+    if version == 1:
+        return json.dumps({"id": ex_id, "instruction": instruction, "input": input_str, "output": output_str}, ensure_ascii=False)
+    if version != 2:
+        raise ValueError(f"Unknown contract version: {version!r} (expected one of {CONTRACT_VERSIONS})")
+    return (
+        f'{{"id": {json.dumps(ex_id, ensure_ascii=False)}, "instruction": {json.dumps(instruction, ensure_ascii=False)}, '
+        f'"input": {input_str}, "output": {output_str}}}'
+    )
+
+
+def encode_contract_row(row: Mapping[str, Any]) -> str:
+    """
+    Encode a contract row as `contract_line` would have written it (v2 nested fields stay
+    compact), so rewritten files match freshly converted ones.
+    """
+    if contract_version(row) == 2 and list(row) == ["id", "instruction", "input", "output"]:
+        return contract_line(
+            row["id"], row["instruction"], _compact(row["input"]), _compact(row["output"]), version=2
+        )
+    return json.dumps(row, ensure_ascii=False)
 
 
 def convert_generator_jsonl_to_contract(
@@ -134,55 +309,36 @@ def convert_generator_jsonl_to_contract(
     instruction: Optional[str] = None,
     *,
     max_past_dialogs: int = 12,
+    contract_version: int = 1,
+    output_format: str = "full",
 ) -> None:
     """
     Thin adapter to reuse the existing generator output.
 
     Expected generator record keys:
       - episode_id, objects, gripper_hist, memory, user_state, target_tool_call
-    Produces dataset-contract JSONL with output as a JSON string.
+    Produces dataset-contract JSONL with input/output as JSON strings (contract_version=2:
+    as nested objects). Episode-delta generator
+    files (data_generator.delta) are read directly; example ids are the same as for the
+    per-step file. output_format="template" writes template-id INTERACT outputs (and
+    defaults the instruction to TEMPLATE_INSTRUCTION).
     """
     if instruction is None:
-        instruction = (
-            "Given the robot observation and dialog context, infer the user's intent and "
-            "emit exactly one tool call. Output ONLY the tool call JSON with keys tool and args. "
-            "If the tool is INTERACT, you must output at most 5 choices total."
-        )
+        instruction = default_instruction(output_format)
 
-    rows: List[Dict] = []
-    for line_no, obj in iter_jsonl(generator_path):
-        for k in ("episode_id", "objects", "gripper_hist", "memory", "user_state", "target_tool_call"):
-            if k not in obj:
-                _fail(generator_path, line_no, f"Missing key: {k}")
-        ex_id = f"{obj['episode_id']}_{line_no}"
-        mem = obj["memory"]
-        # Reduce truncation noise: keep a short dialog window (most recent messages).
-        # This makes the supervised mapping more consistent at fixed max_seq_length.
-        if isinstance(mem, dict) and isinstance(mem.get("past_dialogs"), list) and int(max_past_dialogs) > 0:
-            mem = dict(mem)
-            mem["past_dialogs"] = list(mem.get("past_dialogs") or [])[-int(max_past_dialogs) :]
-
-        input_blob = {"objects": obj["objects"], "gripper_hist": obj["gripper_hist"], "memory": mem, "user_state": obj["user_state"]}
-        output_obj = obj["target_tool_call"]
-        if not isinstance(output_obj, dict):
-            _fail(generator_path, line_no, "target_tool_call must be an object")
-        output_str = json.dumps(output_obj, ensure_ascii=False, separators=(",", ":"))
-        json_loads_strict(output_str)  # sanity
-        rows.append(
-            {
-                "id": ex_id,
-                "instruction": instruction,
-                # Compact JSON to reduce token count and avoid max_seq_length truncation.
-                "input": json.dumps(input_blob, ensure_ascii=False, separators=(",", ":")),
-                "output": output_str,
-            }
-        )
+    def lines() -> Iterator[str]:
+        for line_no, obj in iter_generator_jsonl(generator_path):
+            input_str, output_str = generator_record_to_contract_parts(
+                obj, max_past_dialogs=max_past_dialogs, where=(generator_path, line_no), output_format=output_format
+            )
+            yield contract_line(f"{obj['episode_id']}_{line_no}", str(instruction), input_str, output_str, version=contract_version)
 
-    write_jsonl(out_path, rows)
+    # Rows are streamed to disk; memory does not grow with the generator file size.
+    jsonl_io.write_jsonl(out_path, lines(), str)
     validate_dataset_contract_jsonl(out_path)
 
 
 def convert_contract_to_qwen_chat_jsonl(contract_path: str, out_path: str) -> None:
-    examples = load_dataset_contract(contract_path)
-    rows = [dataset_contract_to_qwen_chat_messages(ex) for ex in examples]
+    validate_dataset_contract_jsonl(contract_path)
+    rows = (dataset_contract_to_qwen_chat_messages(ex) for ex in iter_dataset_contract(contract_path))
     write_jsonl(out_path, rows)
@@ -2,25 +2,20 @@ from __future__ import annotations
 
 import argparse
 import json
-import random
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from data_generator import jsonl_io
 from data_generator.oracle import validate_tool_call
 
+from .contract_index import DEFAULT_STRATIFY_BY, SAMPLE_MODES, select
+from .data import ContractRow
+from .sampling import RateSpec, StratumCounters, load_prior, summarize_rates
+from .templates import try_render_tool_call
 from .utils import json_loads_strict, set_seed
 
 
-def _iter_jsonl(path: str) -> Iterable[Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            yield json.loads(line)
-
-
 def _extract_first_json_object(s: str) -> Optional[str]:
     start = s.find("{")
     if start < 0:
@@ -134,15 +129,23 @@ class EvalMetrics:
             self.by_context = {}
 
 
-def _ctx_bucket(input_json_str: str) -> str:
+# Headline rates of the summary as (name, numerator counter, denominator counter).
+EVAL_RATES: List[RateSpec] = [
+    ("json_valid_rate", "json_valid", "n"),
+    ("schema_valid_rate", "schema_valid", "n"),
+    ("tool_exact_rate", "tool_exact", "n"),
+    ("motion_obj_exact_rate", "motion_obj_exact", "motion_n"),
+    ("interact_kind_exact_rate", "interact_kind_exact", "interact_n"),
+    ("interact_choices_len_ok_rate", "interact_choices_len_ok", "interact_n"),
+]
+
+
+def _ctx_bucket(inp: Any) -> str:
     """
-    Attempt to bucket an example by the last prompt context type.
-    This is useful to see *where* the policy fails (candidate_choice vs confirm vs mode_select, etc).
+    Attempt to bucket an example (its parsed input; None if unparsable) by the last prompt
+    context type. This is useful to see *where* the policy fails (candidate_choice vs
+    confirm vs mode_select, etc).
     """
-    try:
-        inp = json_loads_strict(input_json_str)
-    except Exception:
-        return "invalid_input_json"
     if not isinstance(inp, dict):
         return "invalid_input_json"
     mem = inp.get("memory")
@@ -166,9 +169,7 @@ def _bump_ctx(m: EvalMetrics, ctx: str, key: str, inc: int = 1) -> None:
 
 
 def _write_jsonl(path: str, rows: List[Dict[str, Any]]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    jsonl_io.write_jsonl(path, rows)
 
 
 def _bump_confusion(m: EvalMetrics, gt_tool: str, pred_tool: str) -> None:
@@ -185,12 +186,52 @@ def main(argv: Optional[list[str]] = None) -> None:
     ap.add_argument("--merged_model_path", type=str, default=None, help="DEPRECATED: use --model_path")
     ap.add_argument("--adapter_path", type=str, default=None, help="DEPRECATED: adapters are no longer supported here; use merged models.")
     ap.add_argument("--use_4bit", action=argparse.BooleanOptionalAction, default=False)
-    ap.add_argument("--max_examples", type=int, default=200, help="Max examples to evaluate (sampled).")
+    ap.add_argument("--max_examples", type=int, default=200, help="Max examples to evaluate (sampled; 0 = all).")
+    ap.add_argument(
+        "--sample",
+        choices=SAMPLE_MODES,
+        default="random",
+        help="How --max_examples rows are picked: uniformly, stratified over --stratify_by, or the first rows.",
+    )
+    ap.add_argument(
+        "--stratify_by",
+        type=str,
+        default=",".join(DEFAULT_STRATIFY_BY),
+        help="Comma-separated features for --sample stratified (context, tool, mode, cands).",
+    )
+    ap.add_argument("--min_per_stratum", type=int, default=5, help="With --sample stratified: floor on examples per stratum.")
+    ap.add_argument(
+        "--prior_summary",
+        type=str,
+        default=None,
+        help="With --sample stratified: JSON with per-stratum accuracies (e.g. an earlier summary) for Neyman allocation.",
+    )
+    ap.add_argument("--num_shards", type=int, default=1, help="Evaluate one of N contiguous shards of the contract (see --shard_id).")
+    ap.add_argument("--shard_id", type=int, default=0, help="Shard to evaluate with --num_shards.")
     ap.add_argument("--progress_every", type=int, default=25, help="Print progress every N examples.")
     ap.add_argument("--seed", type=int, default=0)
     ap.add_argument("--temperature", type=float, default=0.0)
     ap.add_argument("--top_p", type=float, default=1.0)
     ap.add_argument("--max_new_tokens", type=int, default=256)
+    ap.add_argument("--batch_size", type=int, default=1, help="Prompts per generate() call (left-padded, length-sorted).")
+    ap.add_argument(
+        "--prefix_cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Prefill the shared system prompt + instruction once and reuse its KV cache.",
+    )
+    ap.add_argument(
+        "--stop_at_json",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Stop decoding each example once its first top-level JSON object has closed.",
+    )
+    ap.add_argument(
+        "--constrained",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Constrain decoding to the tool-call grammar, obj ids from each example's objects.",
+    )
     ap.add_argument("--dump_mistakes_jsonl", type=str, default=None, help="If set, write per-example failures as JSONL.")
     ap.add_argument("--max_mistakes", type=int, default=200, help="Cap number of mistake records written.")
     ap.add_argument("--dump_all_jsonl", type=str, default=None, help="If set, write per-example records (including correct) as JSONL.")
@@ -203,17 +244,26 @@ def main(argv: Optional[list[str]] = None) -> None:
         raise SystemExit("adapter_path is deprecated and not supported. Please pass a merged model via --model_path.")
 
     set_seed(int(args.seed))
-    rng = random.Random(int(args.seed))
 
-    # Load and sample examples (keeps runtime bounded).
-    rows = list(_iter_jsonl(str(args.contract_jsonl)))
-    if not rows:
+    # Sample examples through the .idx sidecar: only the picked rows are read (same rows as
+    # random.Random(seed).sample over the whole file).
+    selection = select(
+        str(args.contract_jsonl),
+        max_examples=int(args.max_examples),
+        seed=int(args.seed),
+        mode=args.sample,
+        stratify_by=str(args.stratify_by).split(","),
+        min_per_stratum=int(args.min_per_stratum),
+        prior=load_prior(args.prior_summary, "tool_exact_rate") if args.prior_summary else None,
+        num_shards=int(args.num_shards),
+        shard_id=int(args.shard_id),
+    )
+    sample = [ContractRow(r) for r in selection.rows]
+    if not sample:
         raise SystemExit("Empty contract_jsonl")
-    n = min(int(args.max_examples), len(rows))
-    sample = rng.sample(rows, n) if n < len(rows) else rows
 
     # Load model once.
-    from .inference import InferenceConfig, _build_messages, _generate_once, _load_model_and_tokenizer
+    from .inference import BatchedGenerations, InferenceConfig, decode_stats, get_model_and_tokenizer, prefix_cache_stats
 
     cfg = InferenceConfig(
         model_path=str(model_path),
@@ -223,36 +273,49 @@ def main(argv: Optional[list[str]] = None) -> None:
         max_new_tokens=int(args.max_new_tokens),
         seed=int(args.seed),
         deterministic=True,
+        prefix_cache=bool(args.prefix_cache),
+        stop_at_json=bool(args.stop_at_json),
+        constrained=bool(args.constrained),
     )
     t0_load = time.time()
-    model, tok = _load_model_and_tokenizer(cfg)
+    model, tok = get_model_and_tokenizer(cfg)
     print(f"[eval] model loaded in {time.time() - t0_load:.1f}s | evaluating {len(sample)} examples")
 
+    prompts = [f"{row.instruction}\n\nInput:\n{row.input_text}" for row in sample]
+    generations = BatchedGenerations(model, tok, prompts, cfg, batch_size=int(args.batch_size))
+    prefix_before = prefix_cache_stats(model)
+    decode_before = decode_stats(model)
+
     m = EvalMetrics()
+    per_stratum = StratumCounters(m, sorted({f for _, a, b in EVAL_RATES for f in (a, b)}))
     mistakes: List[Dict[str, Any]] = []
     all_rows: List[Dict[str, Any]] = []
     t0 = time.time()
 
-    for idx, r in enumerate(sample, start=1):
+    for idx, row in enumerate(sample, start=1):
+        per_stratum.start(selection.strata[idx - 1])
         m.n += 1
-        ex_id = str(r.get("id", "")).strip()
-        instruction = str(r.get("instruction", "")).strip()
-        input_str = str(r.get("input", "")).strip()
-        gt_str = str(r.get("output", "")).strip()
-        ctx = _ctx_bucket(input_str)
+        ex_id = row.id
+        try:
+            inp = row.input_obj
+        except ValueError:
+            inp = None
+        ctx = _ctx_bucket(inp)
         _bump_ctx(m, ctx, "n", 1)
         # Ground truth tool call object (oracle).
         try:
-            gt = json_loads_strict(gt_str)
-        except Exception:
+            gt = row.output_obj
+        except ValueError:
             _bump_ctx(m, ctx, "gt_invalid_json", 1)
             continue
         if not isinstance(gt, dict):
             _bump_ctx(m, ctx, "gt_not_object", 1)
             continue
+        # Template-id INTERACT outputs (llm.templates) are compared in rendered form.
+        gt = try_render_tool_call(gt, inp)
 
-        prompt = f"{instruction}\n\nInput:\n{input_str}"
-        raw = _generate_once(model, tok, _build_messages(prompt), cfg)
+        prompt = prompts[idx - 1]
+        raw = generations[idx - 1]
 
         pred_obj, err = _parse_model_json(raw)
         if pred_obj is None:
@@ -274,7 +337,7 @@ def main(argv: Optional[list[str]] = None) -> None:
 
         m.json_valid += 1
         _bump_ctx(m, ctx, "json_valid", 1)
-        pred = _normalize_tool_call(pred_obj)
+        pred = _normalize_tool_call(try_render_tool_call(pred_obj, inp))
 
         # Schema validity (also enforces <=5 choices).
         try:
@@ -350,21 +413,27 @@ def main(argv: Optional[list[str]] = None) -> None:
             eta_s = remaining / max(1e-9, ex_per_s)
             print(f"[eval] {idx}/{len(sample)} examples | {ex_per_s:.2f} ex/s | ETA {eta_s/60:.1f} min")
 
-    # Print a compact summary + JSON for programmatic use.
-    def rate(a: int, b: int) -> float:
-        return float(a) / float(b) if b else 0.0
-
-    summary = {
-        "n": m.n,
-        "json_valid_rate": rate(m.json_valid, m.n),
-        "schema_valid_rate": rate(m.schema_valid, m.n),
-        "tool_exact_rate": rate(m.tool_exact, m.n),
-        "motion_obj_exact_rate": rate(m.motion_obj_exact, m.motion_n),
-        "interact_kind_exact_rate": rate(m.interact_kind_exact, m.interact_n),
-        "interact_choices_len_ok_rate": rate(m.interact_choices_len_ok, m.interact_n),
-        "tool_confusion": m.tool_confusion,
-        "by_context_counts": m.by_context,
-    }
+    per_stratum.finish()
+
+    # Print a compact summary + JSON for programmatic use. Rates are population estimates:
+    # plain rates unless --sample stratified, where strata are reweighted by N_h / n_h.
+    est = summarize_rates(per_stratum, EVAL_RATES, selection.population)
+    summary: Dict[str, Any] = {"n": m.n}
+    summary.update({name: e["value"] for name, e in est["estimates"].items()})
+    summary.update(
+        {
+            "ci95": {name: e["ci95"] for name, e in est["estimates"].items()},
+            "sample": args.sample,
+            "timing": {
+                "eval_s": time.time() - t0,
+                "prefix_cache": prefix_cache_stats(model, since=prefix_before),
+                "decode": decode_stats(model, since=decode_before),
+            },
+            "strata": est["strata"],
+            "tool_confusion": m.tool_confusion,
+            "by_context_counts": m.by_context,
+        }
+    )
     print(json.dumps(summary, indent=2, sort_keys=True))
 
     if args.dump_mistakes_jsonl:
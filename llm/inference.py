@@ -1,16 +1,24 @@
 from __future__ import annotations
 
 import argparse
+import copy
+import gc
 import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING, cast
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING, cast
 
 if TYPE_CHECKING:
     # Optional dependency; not required for merged-model inference.
     from peft import PeftModel  # type: ignore[import]  # pragma: no cover
 
-from .utils import json_loads_strict, set_seed
+from .utils import JsonObjectScanner, json_loads_strict, set_seed
 from .data import SYSTEM_PROMPT
 
 
@@ -24,6 +32,15 @@ class InferenceConfig:
     max_new_tokens: int = 512
     seed: int = 0
     deterministic: bool = False
+    # "auto" (checkpoint dtype) or a torch dtype name such as "bfloat16".
+    dtype: str = "auto"
+    # Reuse the KV cache of the shared system-prompt + instruction prefix (see PrefixCache).
+    prefix_cache: bool = True
+    # Stop each sequence once its first top-level JSON object has closed (see JsonStop).
+    stop_at_json: bool = True
+    # Only allow tokens of the tool-call grammar, with `obj` restricted to the prompt's
+    # object ids (see llm.constrained); valid output needs no repair pass.
+    constrained: bool = False
 
 
 def _resolve_model_path(model_path: str) -> str:
@@ -67,6 +84,17 @@ def _build_messages(prompt: str) -> List[Dict[str, str]]:
     ]
 
 
+def _torch_dtype(name: str) -> Any:
+    if name == "auto":
+        return "auto"
+    import torch
+
+    dtype = getattr(torch, str(name), None)
+    if not isinstance(dtype, torch.dtype):
+        raise ValueError(f"Unknown torch dtype: {name!r}")
+    return dtype
+
+
 def _load_model_and_tokenizer(cfg: InferenceConfig):
     import torch
     from transformers import AutoModelForCausalLM, AutoTokenizer
@@ -112,7 +140,7 @@ def _load_model_and_tokenizer(cfg: InferenceConfig):
         model = AutoModelForCausalLM.from_pretrained(
             model_path,
             trust_remote_code=True,
-            dtype="auto",
+            dtype=_torch_dtype(cfg.dtype),
             quantization_config=quant_cfg,
             device_map=device_map,
         )
@@ -121,7 +149,7 @@ def _load_model_and_tokenizer(cfg: InferenceConfig):
         model = AutoModelForCausalLM.from_pretrained(
             model_path,
             trust_remote_code=True,
-            dtype="auto",
+            dtype=_torch_dtype(cfg.dtype),
             quantization_config=quant_cfg,
         )
         if torch.cuda.is_available():
@@ -132,24 +160,444 @@ def _load_model_and_tokenizer(cfg: InferenceConfig):
     return model, tok
 
 
-def _generate_once(model, tok, messages: List[Dict[str, str]], cfg: InferenceConfig) -> str:
+# Weight files counted when estimating a local checkpoint's size before loading it.
+WEIGHT_SUFFIXES = (".safetensors", ".bin", ".pt", ".pth")
+# Model cache budget in MB; 0 keeps only the most recently used model resident (the
+# memory profile of loading models one after another).
+MODEL_CACHE_ENV = "GRASP_MODEL_CACHE_MB"
+
+CacheKey = Tuple[str, bool, str]
+
+
+def _cache_key(cfg: InferenceConfig) -> CacheKey:
+    path = _resolve_model_path(cfg.model_path)
+    if os.path.exists(path):
+        path = os.path.realpath(path)
+    return path, bool(cfg.use_4bit), str(cfg.dtype)
+
+
+def _model_nbytes(model: Any) -> int:
+    try:
+        return int(model.get_memory_footprint())
+    except Exception:
+        pass
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return 0
+
+
+def _weights_nbytes(path: str) -> int:
+    """
+    Size of the weight files of a local checkpoint directory (0 for Hub ids).
+    """
+    if not os.path.isdir(path):
+        return 0
+    return sum(
+        e.stat().st_size for e in os.scandir(path) if e.is_file() and e.name.endswith(WEIGHT_SUFFIXES)
+    )
+
+
+class ModelCache:
+    """
+    Process-wide LRU of loaded (model, tokenizer) pairs keyed by (resolved model path,
+    use_4bit, dtype), so repeated requests only pay for generation.
+
+    `budget_bytes` bounds the total footprint: before a load, least recently used models
+    are evicted until the cached ones plus the new checkpoint's on-disk size fit, and
+    again after the load with its measured footprint. The newest model is never evicted;
+    a budget of 0 keeps only that one.
+    """
+
+    def __init__(self, budget_bytes: int = 0):
+        self.budget_bytes = int(budget_bytes)
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, Any, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, cfg: InferenceConfig) -> bool:
+        return _cache_key(cfg) in self._entries
+
+    def keys(self) -> List[CacheKey]:
+        return list(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(size for _, _, size in self._entries.values())
+
+    def get(self, cfg: InferenceConfig) -> Tuple[Any, Any]:
+        key = _cache_key(cfg)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                return hit[0], hit[1]
+            self._evict(incoming=_weights_nbytes(key[0]))
+            # Looked up on the module at call time (tests replace it).
+            model, tok = _load_model_and_tokenizer(cfg)
+            self._entries[key] = (model, tok, _model_nbytes(model))
+            self._evict(incoming=0, keep=key)
+            return model, tok
+
+    def _evict(self, *, incoming: int, keep: Optional[CacheKey] = None) -> None:
+        dropped = False
+        for key in list(self._entries):
+            if key == keep:
+                continue
+            if self.budget_bytes > 0 and self.nbytes + incoming <= self.budget_bytes:
+                break
+            del self._entries[key]
+            dropped = True
+        if dropped:
+            _release_memory()
+
+    def unload(self, model_path: Optional[str] = None) -> int:
+        """
+        Drop the cached models of `model_path` (any use_4bit/dtype), or all of them.
+        Returns how many were dropped.
+        """
+        with self._lock:
+            if model_path is None:
+                keys = list(self._entries)
+            else:
+                path = _cache_key(InferenceConfig(model_path=model_path))[0]
+                keys = [k for k in self._entries if k[0] == path]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            _release_memory()
+        return len(keys)
+
+
+def _release_memory() -> None:
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+MODEL_CACHE = ModelCache(int(float(os.environ.get(MODEL_CACHE_ENV, "0")) * 1024 * 1024))
+
+
+def get_model_and_tokenizer(cfg: InferenceConfig) -> Tuple[Any, Any]:
+    """
+    (model, tokenizer) for `cfg` from the process-wide MODEL_CACHE, loading on a miss.
+    """
+    return MODEL_CACHE.get(cfg)
+
+
+def unload(model_path: Optional[str] = None) -> int:
+    """
+    Free cached models (all, or those of `model_path`); see ModelCache.unload.
+    """
+    return MODEL_CACHE.unload(model_path)
+
+
+# Every prompt is "<instruction>\n\nInput:\n<input JSON>" (see llm.data), so the chat-template
+# text up to and including this separator is shared by all requests of a contract.
+PROMPT_INPUT_SEPARATOR = "\n\nInput:\n"
+MAX_PREFIXES_PER_MODEL = 8
+
+
+def prompt_input(prompt: str) -> Any:
+    """
+    The parsed input JSON of a prompt (None if it does not parse).
+    """
+    _, sep, tail = prompt.partition(PROMPT_INPUT_SEPARATOR)
+    try:
+        return json.loads(tail if sep else prompt)
+    except ValueError:
+        return None
+
+
+class PrefixCache:
+    """
+    Past key/values of a token prefix shared by many requests (system prompt, and the
+    instruction when present), prefilled once per model. `fork(batch)` returns a private
+    copy for one generate() call; generation only prefills the tokens after the prefix.
+    """
+
+    def __init__(self, model, ids: Sequence[int]):
+        import torch
+
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            out = model(input_ids=torch.tensor([list(ids)], device=model.device), use_cache=True)
+        self.ids = list(ids)
+        self.past = out.past_key_values
+        self.prefill_s = time.perf_counter() - t0
+        self.rows = 0
+
+    def fork(self, batch: int = 1):
+        past = copy.deepcopy(self.past)
+        if batch > 1:
+            past.batch_repeat_interleave(batch)
+        self.rows += batch
+        return past
+
+
+_PREFIX_CACHES: "weakref.WeakKeyDictionary[Any, OrderedDict[str, PrefixCache]]" = weakref.WeakKeyDictionary()
+
+
+def _shared_prefix_text(tok, messages: List[Dict[str, str]]) -> str:
+    head, sep, _ = messages[-1]["content"].partition(PROMPT_INPUT_SEPARATOR)
+    marker = "\x00"
+    text = tok.apply_chat_template(
+        messages[:-1] + [{"role": messages[-1]["role"], "content": marker}], tokenize=False, add_generation_prompt=True
+    )
+    return text[: text.index(marker)] + (head + sep if sep else "")
+
+
+def _prefix_for(model, tok, messages: List[Dict[str, str]], ids: Sequence[int]) -> Optional[PrefixCache]:
+    """
+    The model's PrefixCache for this request, built on first use; None when the request's
+    tokens do not start with the prefix tokens (tokenizer merges across the boundary).
+    """
+    text = _shared_prefix_text(tok, messages)
+    caches = _PREFIX_CACHES.setdefault(model, OrderedDict())
+    pc = caches.get(text)
+    if pc is None:
+        # Drop the last prefix token: it may merge with the text that follows.
+        prefix_ids = list(tok(text)["input_ids"][:-1])
+        if len(prefix_ids) < 2 or list(ids[: len(prefix_ids)]) != prefix_ids:
+            return None
+        pc = caches[text] = PrefixCache(model, prefix_ids)
+        while len(caches) > MAX_PREFIXES_PER_MODEL:
+            caches.popitem(last=False)
+    caches.move_to_end(text)
+    if len(ids) <= len(pc.ids) or list(ids[: len(pc.ids)]) != pc.ids:
+        return None
+    return pc
+
+
+def prefix_cache_stats(model, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Per-model prefix reuse: prefix tokens, one-off prefill time, rows served and the
+    prefill time they skipped (rows * single-row prefix prefill time; an estimate).
+    With `since` (an earlier result), counts are relative to it.
+    """
+    caches = list(_PREFIX_CACHES.get(model, {}).values())
+    stats = {
+        "prefixes": len(caches),
+        "prefix_tokens": max((len(pc.ids) for pc in caches), default=0),
+        "prefill_s": sum(pc.prefill_s for pc in caches),
+        "rows": sum(pc.rows for pc in caches),
+        "est_prefill_saved_s": sum(pc.rows * pc.prefill_s for pc in caches),
+    }
+    if since:
+        for k in ("prefill_s", "rows", "est_prefill_saved_s"):
+            stats[k] -= since.get(k, 0)
+    return stats
+
+
+class JsonStop:
+    """
+    Stopping criterion (the transformers StoppingCriteria call protocol) that finishes
+    each row of a batch once the first top-level JSON object of its new tokens has closed.
+    Only the tokens added since the previous step are decoded and fed to the row's
+    JsonObjectScanner, so the check is O(1) per step and row; finished rows are padded by
+    generate() while the others continue. `seed` is output text already in the prompt
+    (the constrained-decoding prefix).
+    """
+
+    def __init__(self, tok, prompt_len: int, seed: str = ""):
+        self.tok = tok
+        self.prompt_len = int(prompt_len)
+        self.seed = seed
+        self.scanners: List[JsonObjectScanner] = []
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        if not self.scanners:
+            self.scanners = [JsonObjectScanner() for _ in range(input_ids.shape[0])]
+            for sc in self.scanners:
+                sc.feed(self.seed)
+        # generate() calls this after every appended token; decode just that token per row.
+        if input_ids.shape[-1] > self.prompt_len:
+            for row, sc in zip(input_ids, self.scanners):
+                if not sc.done:
+                    sc.feed(self.tok.decode(row[-1:], skip_special_tokens=True))
+        return torch.tensor([sc.done for sc in self.scanners], dtype=torch.bool, device=input_ids.device)
+
+
+_DECODE_STATS: "weakref.WeakKeyDictionary[Any, Dict[str, float]]" = weakref.WeakKeyDictionary()
+_DECODE_KEYS = ("requests", "new_tokens", "forced_tokens", "stopped_at_json", "generate_s")
+
+
+def decode_stats(model, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Per-model decoding totals: requests (rows), new tokens (up to and including the
+    stopping token), tokens forced by constrained decoding, rows stopped by JsonStop,
+    and generate() wall time, plus per-request means. With `since` (an earlier result),
+    counts are relative to it.
+    """
+    stats = {k: _DECODE_STATS.get(model, {}).get(k, 0) for k in _DECODE_KEYS}
+    if since:
+        for k in _DECODE_KEYS:
+            stats[k] -= since.get(k, 0)
+    n = max(1, stats["requests"])
+    stats["new_tokens_per_request"] = stats["new_tokens"] / n
+    stats["latency_s_per_request"] = stats["generate_s"] / n
+    return stats
+
+
+def _output_prefix(cfg: InferenceConfig) -> str:
+    """
+    Output text put at the end of the generation prompt instead of being decoded.
+    """
+    if not cfg.constrained:
+        return ""
+    from .constrained import GRAMMAR_PREFIX
+
+    return GRAMMAR_PREFIX
+
+
+def _generate(
+    model, tok, inputs: Dict[str, Any], cfg: InferenceConfig, past=None, prompts: Optional[Sequence[str]] = None
+):
+    """
+    New token ids of one generate() call. `prompts` (the user message of each row) give
+    the object ids for cfg.constrained.
+    """
     import torch
 
-    text = tok.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-    inputs = tok(text, return_tensors="pt")
     inputs = {k: v.to(model.device) for k, v in inputs.items()}
-
+    extra: Dict[str, Any] = {} if past is None else {"past_key_values": past}
+    prompt_len = inputs["input_ids"].shape[-1]
+    stop = JsonStop(tok, prompt_len, _output_prefix(cfg)) if cfg.stop_at_json else None
+    if stop is not None:
+        from transformers import StoppingCriteriaList
+
+        extra["stopping_criteria"] = StoppingCriteriaList([stop])
+    grammar = None
+    if cfg.constrained:
+        from transformers import LogitsProcessorList
+
+        from .constrained import ToolCallProcessor, prompt_object_ids, token_index
+
+        index = token_index(tok)
+        rows = list(prompts or [""] * inputs["input_ids"].shape[0])
+        grammar = ToolCallProcessor([index.constraint(prompt_object_ids(p)) for p in rows], prompt_len)
+        extra["logits_processor"] = LogitsProcessorList([grammar])
+    t0 = time.perf_counter()
     with torch.no_grad():
         out = model.generate(
             **inputs,
+            **extra,
             do_sample=cfg.temperature > 0,
             temperature=cfg.temperature,
             top_p=cfg.top_p,
             max_new_tokens=cfg.max_new_tokens,
             pad_token_id=tok.pad_token_id,
         )
-    gen = out[0, inputs["input_ids"].shape[-1] :]
-    return tok.decode(gen, skip_special_tokens=True).strip()
+    gen = out[:, prompt_len:]
+    stats = _DECODE_STATS.setdefault(model, dict.fromkeys(_DECODE_KEYS, 0))
+    stats["requests"] += gen.shape[0]
+    stats["new_tokens"] += int((gen != tok.pad_token_id).sum()) if tok.pad_token_id is not None else gen.numel()
+    stats["forced_tokens"] += grammar.forced_tokens if grammar is not None else 0
+    stats["stopped_at_json"] += sum(sc.done for sc in stop.scanners) if stop is not None else 0
+    stats["generate_s"] += time.perf_counter() - t0
+    return gen
+
+
+def _generate_once(model, tok, messages: List[Dict[str, str]], cfg: InferenceConfig) -> str:
+    head = _output_prefix(cfg)
+    text = tok.apply_chat_template(messages, tokenize=False, add_generation_prompt=True) + head
+    inputs = tok(text, return_tensors="pt")
+    pc = _prefix_for(model, tok, messages, inputs["input_ids"][0].tolist()) if cfg.prefix_cache else None
+    gen = _generate(model, tok, inputs, cfg, pc.fork(1) if pc is not None else None, [messages[-1]["content"]])
+    return (head + tok.decode(gen[0], skip_special_tokens=True)).strip()
+
+
+def _generate_batch(
+    model, tok, messages_batch: Sequence[List[Dict[str, str]]], cfg: InferenceConfig, batch_size: int = 8
+) -> List[str]:
+    """
+    `_generate_once` for many chats: prompts are sorted by token length (so each batch
+    pads little), split into batches of `batch_size`, left-padded so every row's new
+    tokens start at the same column, and returned in input order. batch_size <= 1 runs
+    `_generate_once` per chat.
+
+    With cfg.prefix_cache, a batch whose rows share a PrefixCache is laid out as
+    prefix + padding + suffix (the padding masked out), so the cached prefix is reused.
+    """
+    if int(batch_size) <= 1:
+        return [_generate_once(model, tok, messages, cfg) for messages in messages_batch]
+    import torch
+
+    head = _output_prefix(cfg)
+    texts = [tok.apply_chat_template(m, tokenize=False, add_generation_prompt=True) + head for m in messages_batch]
+    prompts = [m[-1]["content"] for m in messages_batch]
+    ids = tok(texts)["input_ids"]
+    prefixes = [_prefix_for(model, tok, m, i) if cfg.prefix_cache else None for m, i in zip(messages_batch, ids)]
+    order = sorted(range(len(texts)), key=lambda i: len(ids[i]))
+    out_text: List[str] = [""] * len(texts)
+    padding_side = tok.padding_side
+    tok.padding_side = "left"
+    try:
+        for start in range(0, len(order), int(batch_size)):
+            rows = order[start : start + int(batch_size)]
+            pc = prefixes[rows[0]]
+            if pc is not None and all(prefixes[i] is pc for i in rows):
+                p = len(pc.ids)
+                tails = tok.pad({"input_ids": [ids[i][p:] for i in rows]}, padding=True, return_tensors="pt")
+                prefix_ids = torch.tensor([pc.ids] * len(rows), dtype=tails["input_ids"].dtype)
+                inputs = {
+                    "input_ids": torch.cat([prefix_ids, tails["input_ids"]], dim=1),
+                    "attention_mask": torch.cat([torch.ones_like(prefix_ids), tails["attention_mask"]], dim=1),
+                }
+                gen = _generate(model, tok, inputs, cfg, pc.fork(len(rows)), [prompts[i] for i in rows])
+            else:
+                inputs = tok.pad({"input_ids": [ids[i] for i in rows]}, padding=True, return_tensors="pt")
+                gen = _generate(model, tok, inputs, cfg, prompts=[prompts[i] for i in rows])
+            for i, row in zip(rows, gen):
+                out_text[i] = (head + tok.decode(row, skip_special_tokens=True)).strip()
+    finally:
+        tok.padding_side = padding_side
+    return out_text
+
+
+def generate_batch(prompts: Sequence[str], cfg: InferenceConfig, batch_size: int = 8) -> List[str]:
+    """
+    Raw completions for `prompts` (user messages), `batch_size` at a time, with the
+    model from the process-wide cache.
+    """
+    model, tok = get_model_and_tokenizer(cfg)
+    return _generate_batch(model, tok, [_build_messages(p) for p in prompts], cfg, batch_size)
+
+
+class BatchedGenerations:
+    """
+    Completions of a fixed prompt list for loops that consume them one at a time: the
+    first access to row i generates rows i .. i + batch_size * lookahead - 1 together
+    (length-sorted across that window), so a loop that stops early wastes at most one
+    window. With batch_size <= 1 each row is generated on access, as before.
+    """
+
+    def __init__(self, model, tok, prompts: Sequence[str], cfg: InferenceConfig, batch_size: int = 1, lookahead: int = 4):
+        self._model, self._tok, self._cfg = model, tok, cfg
+        self._prompts = prompts
+        self._batch_size = max(1, int(batch_size))
+        self._window = self._batch_size * max(1, int(lookahead))
+        self._done: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+    def __getitem__(self, i: int) -> str:
+        if i not in self._done:
+            if self._batch_size == 1:
+                return _generate_once(self._model, self._tok, _build_messages(self._prompts[i]), self._cfg)
+            self._done.clear()
+            window = range(i, min(i + self._window, len(self._prompts)))
+            outs = _generate_batch(
+                self._model, self._tok, [_build_messages(self._prompts[j]) for j in window], self._cfg, self._batch_size
+            )
+            self._done.update(zip(window, outs))
+        return self._done[i]
 
 
 def generate_json_only(prompt: str, cfg: InferenceConfig) -> Dict[str, Any]:
@@ -168,19 +616,29 @@ def generate_json_only(prompt: str, cfg: InferenceConfig) -> Dict[str, Any]:
                 pass
         except Exception:
             pass
-    model, tok = _load_model_and_tokenizer(cfg)
+    model, tok = get_model_and_tokenizer(cfg)
 
     messages = _build_messages(prompt)
     raw1 = _generate_once(model, tok, messages, cfg)
     try:
-        return json_loads_strict(raw1)
-    except Exception:
+        out = json_loads_strict(raw1)
+    except Exception as e:
+        if cfg.constrained:
+            # Only a max_new_tokens cut leaves grammar output unparsable; a repair pass
+            # would hit the same limit.
+            raise ValueError(f"Constrained output is not valid JSON (max_new_tokens too small?): {e}\nRAW:\n{raw1}") from e
         repair_messages = _build_messages("Return ONLY valid JSON for the previous answer.\n\nPrevious answer:\n" + raw1)
         raw2 = _generate_once(model, tok, repair_messages, cfg)
         try:
-            return json_loads_strict(raw2)
+            out = json_loads_strict(raw2)
         except Exception as e:
             raise ValueError(f"Model did not return valid JSON after repair attempt: {e}\nRAW:\n{raw2}") from e
+    # Template-id INTERACT output is rendered from the prompt's objects (llm.templates).
+    from .templates import render_tool_call
+
+    inp = prompt_input(prompt)
+    objects = inp.get("objects") if isinstance(inp, dict) else None
+    return render_tool_call(out, objects if isinstance(objects, list) else [])
 
 
 def main() -> None:
@@ -191,12 +649,19 @@ def main() -> None:
     ap.add_argument("--merged_model_path", type=str, default=None, help="DEPRECATED: use --model_path")
     ap.add_argument("--adapter_path", type=str, default=None, help="DEPRECATED: adapters are no longer supported here; use merged models.")
     ap.add_argument("--use_4bit", action=argparse.BooleanOptionalAction, default=False)
+    ap.add_argument("--dtype", type=str, default="auto", help='Model dtype: "auto" (checkpoint) or e.g. bfloat16, float16, float32.')
     ap.add_argument("--prompt", type=str, default=None)
     ap.add_argument("--prompt_file", type=str, default=None)
     ap.add_argument("--temperature", type=float, default=0.2)
     ap.add_argument("--top_p", type=float, default=0.9)
     ap.add_argument("--max_new_tokens", type=int, default=512)
     ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument(
+        "--constrained",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Constrain decoding to the tool-call grammar (object ids from the prompt); no repair pass.",
+    )
     ap.add_argument(
         "--deterministic",
         action="store_true",
@@ -226,6 +691,8 @@ def main() -> None:
         max_new_tokens=args.max_new_tokens,
         seed=args.seed,
         deterministic=bool(args.deterministic),
+        dtype=str(args.dtype),
+        constrained=bool(args.constrained),
     )
     obj = generate_json_only(prompt, cfg)
     print(json.dumps(obj, ensure_ascii=False))
@@ -1,10 +1,153 @@
 from __future__ import annotations
 
 import argparse
-from typing import Optional
+import json
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-from .data import convert_contract_to_qwen_chat_jsonl, convert_generator_jsonl_to_contract
-from .rebalance_contract import rebalance_contract
+from data_generator.delta import DeltaEncoder
+from data_generator.jsonl_io import add_suffix, atomic_outputs
+from data_generator.memory_log import record_to_json
+
+from .data import (
+    CONTRACT_VERSIONS,
+    DatasetExample,
+    convert_contract_to_qwen_chat_jsonl,
+    convert_generator_jsonl_to_contract,
+    dataset_contract_to_qwen_chat_messages,
+    default_instruction,
+    generator_record_to_contract_parts,
+    validate_contract_row,
+)
+from .rebalance_contract import _new_rebalance_stats, rebalance_contract, rebalance_row
+from .templates import OUTPUT_FORMATS
+
+
+def _object_line(fields: Sequence[Tuple[str, str]]) -> str:
+    """
+    Assemble a JSONL line from already-encoded values. Byte-identical to
+    `json.dumps(dict(...), ensure_ascii=False)` for the same key order.
+    """
+    return "{" + ", ".join(f"{json.dumps(k)}: {v}" for k, v in fields) + "}\n"
+
+
+def prepare_fused(
+    records: Iterable[Dict],
+    *,
+    out_contract: str,
+    out_chat: str,
+    out_generator: Optional[str] = None,
+    generator_format: str = "jsonl",
+    instruction: Optional[str] = None,
+    max_past_dialogs: int = 12,
+    out_contract_rebalanced: Optional[str] = None,
+    out_chat_rebalanced: Optional[str] = None,
+    rebalance_seed: int = 0,
+    motion_repeat: int = 1,
+    interact_keep_prob: float = 1.0,
+    contract_version: int = 1,
+    output_format: str = "full",
+) -> Dict[str, int]:
+    """
+    Single-pass preparation: write generator, contract and chat JSONL (plus the rebalanced
+    contract/chat when both rebalanced paths are given) from one pass over `records`.
+
+    Each record is encoded once; output lines are assembled from the encoded pieces.
+    Outputs are byte-identical to the multi-pass path (generator file ->
+    convert_generator_jsonl_to_contract -> rebalance_contract -> chat conversion).
+    Only the rebalanced lines are buffered, because rebalancing shuffles the whole file.
+    contract_version=2 writes nested input/output (see llm.data.ContractRow).
+    With generator_format="delta" the generator file is written in the episode-delta layout.
+    output_format="template" writes template-id INTERACT outputs (see llm.templates).
+    Every row passes the same checks as `validate_dataset_contract_jsonl` as it is written.
+    """
+    if instruction is None:
+        instruction = default_instruction(output_format)
+    rebalance = out_contract_rebalanced is not None and out_chat_rebalanced is not None
+    instruction_enc = json.dumps(instruction, ensure_ascii=False)
+    rng = random.Random(int(rebalance_seed))
+    reb_stats = _new_rebalance_stats()
+    # (contract_line, chat_id, chat_messages_tail) per rebalanced row. The system message is
+    # identical for every row, so it is encoded once and spliced back in at write time.
+    reb_lines: List[Tuple[str, str, str]] = []
+    system_enc: Optional[str] = None
+    n = 0
+
+    # Every output goes to a .tmp sibling and replaces its destination only once all of
+    # them are complete (see jsonl_io.atomic_outputs).
+    with atomic_outputs() as open_out:
+        f_gen = open_out(out_generator) if out_generator else None
+        delta = DeltaEncoder() if f_gen is not None and generator_format == "delta" else None
+        f_contract = open_out(out_contract)
+        f_chat = open_out(out_chat)
+
+        for line_no, rec in enumerate(records, start=1):
+            if delta is not None:
+                gen_line = delta.add(rec)
+                if gen_line is not None:
+                    f_gen.write(gen_line + "\n")
+            elif f_gen is not None:
+                f_gen.write(record_to_json(rec) + "\n")
+            input_str, output_str = generator_record_to_contract_parts(
+                rec, max_past_dialogs=max_past_dialogs, where=("<records>", line_no), output_format=output_format
+            )
+            ex_id = f"{rec['episode_id']}_{line_no}"
+            # Checked in the v1 (string) layout, which v2 rows splice in unchanged.
+            validate_contract_row(
+                {"id": ex_id, "instruction": instruction, "input": input_str, "output": output_str}, ("<records>", line_no)
+            )
+            if contract_version == 2:
+                # The compact strings are valid JSON values already: splice them in as-is.
+                input_enc, output_enc = input_str, output_str
+            else:
+                input_enc = json.dumps(input_str, ensure_ascii=False)
+                output_enc = json.dumps(output_str, ensure_ascii=False)
+            ex = DatasetExample(id=ex_id, instruction=instruction, input=input_str, output=output_str)
+            messages = dataset_contract_to_qwen_chat_messages(ex)["messages"]
+            if system_enc is None:
+                system_enc = json.dumps(messages[0], ensure_ascii=False)
+            # "[<system>, <user>, <assistant>]" == "[" + system_enc + ", " + tail_enc[1:]
+            tail_enc = json.dumps(messages[1:], ensure_ascii=False)
+            messages_enc = "[" + system_enc + ", " + tail_enc[1:]
+
+            def contract_line(row_id: str) -> str:
+                return _object_line(
+                    (("id", json.dumps(row_id, ensure_ascii=False)), ("instruction", instruction_enc), ("input", input_enc), ("output", output_enc))
+                )
+
+            f_contract.write(contract_line(ex_id))
+            f_chat.write(_object_line((("id", json.dumps(ex_id, ensure_ascii=False)), ("messages", messages_enc))))
+            n += 1
+
+            if rebalance:
+                tool = rec["target_tool_call"].get("tool")
+                for rr in rebalance_row(
+                    {"id": ex_id},
+                    tool if isinstance(tool, str) else None,
+                    rng,
+                    reb_stats,
+                    motion_repeat=motion_repeat,
+                    interact_keep_prob=interact_keep_prob,
+                ):
+                    reb_lines.append((contract_line(rr["id"]), rr["id"], tail_enc))
+
+        if delta is not None:
+            gen_line = delta.finish()
+            if gen_line is not None:
+                f_gen.write(gen_line + "\n")
+
+        stats: Dict[str, int] = {"records": n}
+        if rebalance:
+            assert out_contract_rebalanced is not None and out_chat_rebalanced is not None
+            rng.shuffle(reb_lines)
+            reb_stats["written"] = len(reb_lines)
+            fc, fh = open_out(out_contract_rebalanced), open_out(out_chat_rebalanced)
+            for c_line, row_id, tail_enc in reb_lines:
+                fc.write(c_line)
+                messages_enc = "[" + str(system_enc) + ", " + tail_enc[1:]
+                fh.write(_object_line((("id", json.dumps(row_id, ensure_ascii=False)), ("messages", messages_enc))))
+            stats.update({f"rebalance_{k}": v for k, v in reb_stats.items()})
+    return stats
 
 
 def main(argv: Optional[list[str]] = None) -> None:
@@ -31,16 +174,35 @@ def main(argv: Optional[list[str]] = None) -> None:
         help="Optional preprocessing: keep probability for INTERACT examples (1.0 keeps all, <1.0 downsamples).",
     )
     ap.add_argument("--rebalance_seed", type=int, default=0)
+    ap.add_argument(
+        "--contract_version",
+        type=int,
+        choices=CONTRACT_VERSIONS,
+        default=1,
+        help="Contract layout: 1 = input/output as JSON strings, 2 = nested objects (parsed once by readers).",
+    )
+    ap.add_argument(
+        "--output_format",
+        choices=OUTPUT_FORMATS,
+        default="full",
+        help="INTERACT outputs: 'full' (kind/text/choices) or 'template' (template id + slots, rendered at inference).",
+    )
     args = ap.parse_args(argv)
 
     # Step 1: generator -> contract
-    convert_generator_jsonl_to_contract(args.generator_jsonl, args.out_contract, max_past_dialogs=int(args.max_past_dialogs))
+    convert_generator_jsonl_to_contract(
+        args.generator_jsonl,
+        args.out_contract,
+        max_past_dialogs=int(args.max_past_dialogs),
+        contract_version=int(args.contract_version),
+        output_format=args.output_format,
+    )
 
     # Step 2 (optional): rebalance tool-call frequencies *as a preprocessing step*
     if int(args.motion_repeat) != 1 or float(args.interact_keep_prob) != 1.0:
         # Keep original contract and also write a separate rebalanced one.
-        out_contract_reb = str(args.out_contract) + ".rebalanced"
-        tmp_out = out_contract_reb + ".tmp"
+        out_contract_reb = add_suffix(str(args.out_contract), ".rebalanced")
+        tmp_out = add_suffix(out_contract_reb, ".tmp")
         stats = rebalance_contract(
             in_path=str(args.out_contract),
             out_path=tmp_out,
@@ -54,7 +216,7 @@ def main(argv: Optional[list[str]] = None) -> None:
         print(f"[prepare] rebalanced contract written to {out_contract_reb} | stats={stats}")
 
         # Write matching rebalanced chat file too.
-        out_chat_reb = str(args.out_chat) + ".rebalanced"
+        out_chat_reb = add_suffix(str(args.out_chat), ".rebalanced")
         convert_contract_to_qwen_chat_jsonl(out_contract_reb, out_chat_reb)
         print(f"[prepare] rebalanced chat written to {out_chat_reb}")
 
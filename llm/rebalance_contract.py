@@ -5,28 +5,23 @@ import json
 import random
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from .utils import json_loads_strict
+from data_generator import jsonl_io
+
+from .data import ContractRow, encode_contract_row
 
 
 def _iter_jsonl(path: str) -> Iterable[Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            yield json.loads(line)
+    return (obj for _, obj in jsonl_io.iter_jsonl(path))
 
 
 def _write_jsonl(path: str, rows: Iterable[Dict[str, Any]]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    jsonl_io.write_jsonl(path, rows, encode_contract_row)
 
 
-def _tool_from_output_str(output_str: str) -> Optional[str]:
+def _tool_from_output(row: ContractRow) -> Optional[str]:
     try:
-        obj = json_loads_strict(output_str)
-    except Exception:
+        obj = row.output_obj
+    except ValueError:
         return None
     if not isinstance(obj, dict):
         return None
@@ -57,27 +52,14 @@ def rebalance_contract(
       interact_keep_prob: probability of keeping each INTERACT example (1.0 keeps all).
     """
     rng = random.Random(int(seed))
-    stats = {"kept_interact": 0, "kept_motion": 0, "dropped_interact": 0, "unknown": 0, "written": 0}
+    stats = _new_rebalance_stats()
 
     out_rows: List[Dict[str, Any]] = []
     for r in _iter_jsonl(in_path):
-        tool = _tool_from_output_str(str(r.get("output", "")))
-        if tool in {"APPROACH", "ALIGN_YAW"}:
-            stats["kept_motion"] += 1
-            rep = max(1, int(motion_repeat))
-            for k in range(rep):
-                rr = dict(r)
-                # Make ids unique for datasets/trl bookkeeping.
-                rr["id"] = f"{r.get('id','')}_m{k}"
-                out_rows.append(rr)
-        elif tool == "INTERACT":
-            if float(interact_keep_prob) >= 1.0 or rng.random() < float(interact_keep_prob):
-                stats["kept_interact"] += 1
-                out_rows.append(r)
-            else:
-                stats["dropped_interact"] += 1
-        else:
-            stats["unknown"] += 1
+        tool = _tool_from_output(ContractRow(r))
+        out_rows.extend(
+            rebalance_row(r, tool, rng, stats, motion_repeat=motion_repeat, interact_keep_prob=interact_keep_prob)
+        )
 
     rng.shuffle(out_rows)
     stats["written"] = len(out_rows)
@@ -85,6 +67,45 @@ def rebalance_contract(
     return stats
 
 
+def _new_rebalance_stats() -> Dict[str, int]:
+    return {"kept_interact": 0, "kept_motion": 0, "dropped_interact": 0, "unknown": 0, "written": 0}
+
+
+def rebalance_row(
+    r: Dict[str, Any],
+    tool: Optional[str],
+    rng: random.Random,
+    stats: Dict[str, int],
+    *,
+    motion_repeat: int,
+    interact_keep_prob: float,
+) -> List[Dict[str, Any]]:
+    """
+    Rebalance decision for a single contract row: returns the rows to emit (possibly none).
+
+    Consumes `rng` exactly like `rebalance_contract`, so callers that feed rows in file
+    order and then shuffle with the same rng reproduce its output.
+    """
+    if tool in {"APPROACH", "ALIGN_YAW"}:
+        stats["kept_motion"] += 1
+        rep = max(1, int(motion_repeat))
+        out: List[Dict[str, Any]] = []
+        for k in range(rep):
+            rr = dict(r)
+            # Make ids unique for datasets/trl bookkeeping.
+            rr["id"] = f"{r.get('id','')}_m{k}"
+            out.append(rr)
+        return out
+    if tool == "INTERACT":
+        if float(interact_keep_prob) >= 1.0 or rng.random() < float(interact_keep_prob):
+            stats["kept_interact"] += 1
+            return [r]
+        stats["dropped_interact"] += 1
+        return []
+    stats["unknown"] += 1
+    return []
+
+
 def main(argv: Optional[List[str]] = None) -> None:
     ap = argparse.ArgumentParser(description="Rebalance a contract JSONL to emphasize motion-tool examples.")
     ap.add_argument("--in_contract", type=str, required=True)
@@ -0,0 +1,267 @@
+"""
+Stratified evaluation sampling and estimates with confidence intervals.
+
+`allocate` splits an example budget across strata in proportion to N_h * S_h (Neyman
+allocation) with a floor per stratum (so rare contexts are measured at all), where S_h
+is the per-example standard deviation sqrt(p_h * (1 - p_h)) from a prior accuracy per
+stratum (0.5 when unknown, which reduces to proportional allocation).
+
+`StratumCounters` attributes an evaluator's integer counters to the stratum of the
+example being scored, and `summarize_rates` turns per-stratum counts into population
+estimates: each stratum is weighted by N_h / n_h (population rows per sampled row), rates
+with a conditional denominator (e.g. motion_obj_correct / motion_n) use the weighted
+ratio estimator, and the 95% interval is a Wilson interval on the design-effect-adjusted
+sample size. With a single stratum the estimate is the plain rate and the interval the
+plain Wilson interval.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+Z_95 = 1.959963984540054
+DEFAULT_SPREAD = 0.5
+
+# (metric name, numerator counter, denominator counter)
+RateSpec = Tuple[str, str, str]
+
+
+def wilson_interval(p: float, n: float, z: float = Z_95) -> Tuple[float, float]:
+    """
+    Wilson score interval for a proportion `p` observed over `n` (possibly effective,
+    non-integer) trials. (0.0, 1.0) when n == 0.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    z2 = z * z
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half = z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def allocate(
+    sizes: Mapping[str, int],
+    n: int,
+    *,
+    min_per_stratum: int = 0,
+    prior: Optional[Mapping[str, float]] = None,
+) -> Dict[str, int]:
+    """
+    Split `n` examples across strata of the given population sizes (see module doc).
+    Never allocates more than a stratum holds; the total is min(n, sum(sizes)).
+    """
+    n = min(int(n), sum(int(v) for v in sizes.values()))
+    alloc = {h: min(int(N), int(min_per_stratum)) for h, N in sizes.items()}
+    if sum(alloc.values()) > n:
+        # Budget below the floors: deal it out one example per stratum at a time.
+        floors = alloc
+        alloc = {h: 0 for h in sizes}
+        order = sorted(sizes, key=lambda h: (-int(sizes[h]), h))
+        left = n
+        while left > 0:
+            for h in order:
+                if left > 0 and alloc[h] < floors[h]:
+                    alloc[h] += 1
+                    left -= 1
+        return alloc
+
+    def weight(h: str) -> float:
+        p = float((prior or {}).get(h, DEFAULT_SPREAD))
+        # Keep a little spread for strata that looked perfect (or hopeless) so far.
+        p = min(max(p, 0.02), 0.98)
+        return float(sizes[h]) * math.sqrt(p * (1 - p))
+
+    # The stratum whose share falls furthest below its floor (or above its size) is pinned
+    # there and the rest of the budget is re-split among the others, one stratum at a time.
+    floors = alloc
+    pinned: Dict[str, int] = {}
+    while True:
+        free = [h for h in sizes if h not in pinned]
+        left = n - sum(pinned.values())
+        total = sum(weight(h) for h in free)
+        quotas = {h: left * weight(h) / total for h in free} if total > 0 else {}
+        excess = {h: max(floors[h] - q, q - int(sizes[h])) for h, q in quotas.items()}
+        worst = max(excess, key=lambda h: (excess[h], h), default=None)
+        if worst is None or excess[worst] <= 0:
+            break
+        pinned[worst] = floors[worst] if quotas[worst] < floors[worst] else int(sizes[worst])
+    alloc = {h: pinned[h] if h in pinned else int(quotas.get(h, 0)) for h in sizes}
+    # Largest remainder for the free strata.
+    for h in sorted(quotas, key=lambda h: (alloc[h] - quotas[h], h))[: max(0, n - sum(alloc.values()))]:
+        alloc[h] += 1
+    # Pins made early can leave the total off (e.g. once every stratum is pinned): move
+    # single rows where the allocation is furthest from the unconstrained share.
+    total = sum(weight(h) for h in sizes)
+    share = {h: n * weight(h) / total if total > 0 else 0.0 for h in sizes}
+    while sum(alloc.values()) < n:
+        h = max((h for h in sizes if alloc[h] < int(sizes[h])), key=lambda h: (share[h] - alloc[h], h))
+        alloc[h] += 1
+    while sum(alloc.values()) > n:
+        h = max((h for h in sizes if alloc[h] > floors[h]), key=lambda h: (alloc[h] - share[h], h))
+        alloc[h] -= 1
+    return alloc
+
+
+def interleave_order(strata: Sequence[str], seed: int = 0, lead: int = 2) -> List[int]:
+    """
+    Seeded permutation of range(len(strata)) for scoring that may stop early: first
+    `lead` rounds with one position of every stratum each, then the rest ordered so that
+    every prefix holds the strata in about the same proportions as the whole list (the
+    k-th of a stratum's n_h positions, shuffled, gets sort key (k + u) / n_h with
+    u ~ U[0, 1)). With one stratum it is a plain shuffle.
+    """
+    rng = random.Random(int(seed))
+    groups: Dict[str, List[int]] = {}
+    for i, h in enumerate(strata):
+        groups.setdefault(h, []).append(i)
+    keyed: List[Tuple[float, int]] = []
+    for h in sorted(groups):
+        members = groups[h]
+        rng.shuffle(members)
+        keyed.extend(
+            (k - lead + rng.random() if k < lead else (k + rng.random()) / len(members), i)
+            for k, i in enumerate(members)
+        )
+    return [i for _, i in sorted(keyed)]
+
+
+class StratumCounters:
+    """
+    Per-stratum totals of the integer counter attributes `fields` of a metrics object.
+
+    Call `start(stratum)` at the top of each example (before anything is counted) and
+    `finish()` after the last one: the counter changes since the previous call are
+    credited to the previous example's stratum, so `continue` paths need no extra calls.
+    """
+
+    def __init__(self, metrics: Any, fields: Sequence[str]):
+        self._metrics = metrics
+        self.fields = tuple(fields)
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._current: Optional[str] = None
+        self._last = self._snapshot()
+
+    def _snapshot(self) -> Tuple[int, ...]:
+        return tuple(int(getattr(self._metrics, f)) for f in self.fields)
+
+    def _flush(self) -> None:
+        now = self._snapshot()
+        if self._current is not None:
+            row = self.counts.setdefault(self._current, {f: 0 for f in self.fields})
+            for f, a, b in zip(self.fields, self._last, now):
+                row[f] += b - a
+        self._last = now
+
+    def start(self, stratum: str) -> None:
+        self._flush()
+        self._current = stratum
+
+    def finish(self) -> None:
+        self._flush()
+        self._current = None
+
+
+def estimate_rate(
+    counts: Mapping[str, Mapping[str, int]],
+    population: Mapping[str, int],
+    numerator: str,
+    denominator: str,
+    sampled: Mapping[str, int],
+) -> Dict[str, Any]:
+    """
+    Population estimate of sum(numerator) / sum(denominator) over stratified counts.
+    `sampled[h]` is the number of examples scored in stratum h (n_h), `population[h]` the
+    number of rows it stands for (N_h). Returns {"value", "ci95": [lo, hi], "n"}.
+    """
+    strata = [h for h in counts if sampled.get(h, 0) > 0]
+    a = {h: int(counts[h].get(numerator, 0)) for h in strata}
+    b = {h: int(counts[h].get(denominator, 0)) for h in strata}
+    n_b = sum(b.values())
+    if n_b == 0:
+        return {"value": 0.0, "ci95": [0.0, 1.0], "n": 0}
+    if len(strata) == 1:
+        h = strata[0]
+        lo, hi = wilson_interval(a[h] / b[h], b[h])
+        return {"value": a[h] / b[h], "ci95": [lo, hi], "n": b[h]}
+
+    w = {h: float(population.get(h, sampled[h])) / float(sampled[h]) for h in strata}
+    B = sum(w[h] * b[h] for h in strata)
+    R = sum(w[h] * a[h] for h in strata) / B
+    # Linearized variance of the ratio: residual d = a - R*b per example, within strata.
+    # Each example has (a, b) in {(1, 1), (0, 1), (0, 0)}. A stratum that was all right
+    # (or all wrong) so far gets one pseudo-success and one pseudo-failure, so that a
+    # handful of lucky examples does not count as zero variance.
+    var = 0.0
+    pseudo_a = pseudo_b = 0.0
+    for h in strata:
+        if not b[h]:
+            continue
+        n_h = int(sampled[h])
+        a_h, b_h, m_h = a[h], b[h], n_h
+        if a_h in (0, b_h):
+            a_h, b_h, m_h = a_h + 1, b_h + 2, m_h + 2
+            pseudo_a += w[h]
+            pseudo_b += 2 * w[h]
+        sum_d = a_h - R * b_h
+        sum_d2 = a_h * (1 - R) ** 2 + (b_h - a_h) * R * R
+        s2 = (sum_d2 - sum_d * sum_d / m_h) / (m_h - 1)
+        var += (w[h] * n_h) ** 2 * s2 / n_h
+    var /= B * B
+    # Effective sample size for the Wilson interval, from the same smoothed counts so that
+    # R = 0 or 1 still gets a one-sided interval.
+    R_s = (R * B + pseudo_a) / (B + pseudo_b)
+    n_eff = R_s * (1 - R_s) / var if var > 0 else float(n_b)
+    lo, hi = wilson_interval(R, n_eff)
+    return {"value": R, "ci95": [lo, hi], "n": n_b}
+
+
+def summarize_rates(
+    counters: StratumCounters,
+    rates: Sequence[RateSpec],
+    population: Optional[Mapping[str, int]] = None,
+    *,
+    size_field: str = "n",
+) -> Dict[str, Any]:
+    """
+    {"estimates": {metric: estimate_rate(...)}, "strata": {stratum: {"population",
+    "sampled", metric: rate}}} for the counted examples. `population` defaults to the
+    sampled counts (i.e. the sample is the population).
+    """
+    sampled = {h: int(c.get(size_field, 0)) for h, c in counters.counts.items()}
+    population = dict(population or sampled)
+    estimates = {
+        name: estimate_rate(counters.counts, population, num, den, sampled) for name, num, den in rates
+    }
+    strata: Dict[str, Dict[str, Any]] = {}
+    for h in sorted(counters.counts):
+        c = counters.counts[h]
+        row: Dict[str, Any] = {"population": int(population.get(h, sampled[h])), "sampled": sampled[h]}
+        for name, num, den in rates:
+            row[name] = float(c[num]) / float(c[den]) if c.get(den) else None
+        strata[h] = row
+    return {"estimates": estimates, "strata": strata}
+
+
+def load_prior(path: str, metric: str = "tool_accuracy") -> Dict[str, float]:
+    """
+    Per-stratum prior accuracy for `allocate`: a JSON {stratum: p}, a summary with
+    "strata", or a summary_all.json (strata averaged over its models).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        obj = json.load(f)
+    summaries: List[Mapping[str, Any]]
+    if isinstance(obj, dict) and "summaries" in obj:
+        summaries = list(obj["summaries"])
+    elif isinstance(obj, dict) and "strata" in obj:
+        summaries = [obj]
+    else:
+        return {str(k): float(v) for k, v in dict(obj).items()}
+    acc: Dict[str, List[float]] = {}
+    for s in summaries:
+        for h, row in (s.get("strata") or {}).items():
+            if isinstance(row, dict) and row.get(metric) is not None:
+                acc.setdefault(str(h), []).append(float(row[metric]))
+    return {h: sum(v) / len(v) for h, v in acc.items()}
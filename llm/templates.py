@@ -0,0 +1,222 @@
+"""
+Template-id INTERACT output.
+
+The oracle words every INTERACT from a small closed set of phrasings (see
+data_generator.oracle). In the "template" output format the model emits only the
+phrasing's id and its slots, e.g.
+
+  {"tool":"INTERACT","args":{"template":"confirm","obj":"o3","action":"APPROACH"}}
+
+and `render_interact` rebuilds the full {"kind","text","choices"} call from the input's
+`objects` (ids -> labels). `encode_interact` is the inverse used by the contract
+converter: it returns the compact call only if rendering it reproduces the oracle call
+exactly, so converted data never changes meaning.
+
+Slots: `obj` (one object id), `objs` (ordered object ids) and `action`
+(APPROACH | ALIGN_YAW; optional for candidate_choice).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from data_generator.oracle import MAX_INTERACT_CHOICES
+
+OUTPUT_FORMATS: Tuple[str, ...] = ("full", "template")
+ACTIONS: Tuple[str, ...] = ("APPROACH", "ALIGN_YAW")
+YES_NO = ["1) YES", "2) NO"]
+# candidate_choice lists at most this many objects, then "None of them".
+MAX_TEMPLATE_OBJS = MAX_INTERACT_CHOICES - 1
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    kind: str
+    # Slot keys in output order; "action?" is an optional action.
+    slots: Tuple[str, ...] = ()
+
+
+TEMPLATES: Dict[str, Template] = {
+    "confirm": Template("CONFIRM", ("obj", "action")),
+    "confirm_also_align": Template("CONFIRM", ("obj",)),
+    "intent_gate_yaw": Template("QUESTION", ("obj",)),
+    "intent_gate_candidates": Template("QUESTION", ("objs", "action")),
+    "candidate_choice": Template("QUESTION", ("objs", "action?")),
+    "mode_select": Template("SUGGESTION"),
+    "anything_else": Template("QUESTION"),
+    "none_of_those": Template("QUESTION"),
+    "help": Template("SUGGESTION", ("obj",)),
+    "terminal_ack": Template("SUGGESTION"),
+}
+
+TEMPLATE_INSTRUCTION = (
+    "Given the robot observation and dialog context, infer the user's intent and "
+    "emit exactly one tool call. Output ONLY the tool call JSON with keys tool and args. "
+    'If the tool is INTERACT, args are {"template": <id>} plus the template\'s slots '
+    "(obj, objs, action) with object ids from the input: "
+    + ", ".join(f"{name}({', '.join(t.slots)})" if t.slots else name for name, t in TEMPLATES.items())
+    + "."
+)
+
+
+def _labels(objects: Sequence[Mapping[str, Any]]) -> Dict[str, str]:
+    return {str(o.get("id")): str(o.get("label")) for o in objects if isinstance(o, Mapping)}
+
+
+def _text(template: str, labels: List[str], action: Optional[str]) -> str:
+    if template == "confirm":
+        if action == "ALIGN_YAW":
+            return f"Do you want me to align yaw to the {labels[0]}?"
+        return f"Do you want me to approach the {labels[0]}?"
+    if template == "confirm_also_align":
+        return f"Do you want me to also align yaw to the {labels[0]}?"
+    if template == "intent_gate_yaw":
+        return (
+            f"I notice you are struggling aligning the gripper yaw while near the {labels[0]}. "
+            f"Is that what you are trying to do?"
+        )
+    if template == "intent_gate_candidates":
+        others = labels[1:]
+        verb = "is" if len(others) == 1 else "are"
+        if action == "ALIGN_YAW":
+            return (
+                f"I notice you are rotating the gripper near the {labels[0]}. However, {', '.join(others)} "
+                f"{verb} also close. Are you trying to align yaw to one of these?"
+            )
+        return (
+            f"I notice you are approaching the {labels[0]}. However, {', '.join(others)} "
+            f"{verb} also close. Are you trying to grasp one of these?"
+        )
+    if template == "candidate_choice":
+        if action == "ALIGN_YAW":
+            return "Which object do you want me to align yaw to?"
+        if action == "APPROACH":
+            return "Which object do you want me to help you approach?"
+        return "Uh, which one do you want?"
+    if template == "mode_select":
+        return "Do you want help with approaching an object or aligning the gripper yaw to an object?"
+    if template == "anything_else":
+        return "Uh, I should have misunderstood. Is there anything else I can help with?"
+    if template == "none_of_those":
+        return "Okay — none of those. Is there anything else I can help with?"
+    if template == "help":
+        return f"Do you want me to help you align yaw to the {labels[0]}?"
+    return "Okay. I'll stay out of the way."
+
+
+def _choices(template: str, labels: List[str]) -> List[str]:
+    if template == "candidate_choice":
+        return [f"{i + 1}) {lab}" for i, lab in enumerate(labels)] + [f"{len(labels) + 1}) None of them"]
+    if template == "mode_select":
+        return ["1) APPROACH", "2) ALIGN_YAW"]
+    if template == "terminal_ack":
+        return ["1) OK"]
+    return list(YES_NO)
+
+
+def render_interact(args: Mapping[str, Any], objects: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Full INTERACT tool call for template-form `args`. Raises ValueError for an unknown
+    template, missing/extra slots, bad actions, or object ids not in `objects`.
+    """
+    name = args.get("template")
+    template = TEMPLATES.get(name) if isinstance(name, str) else None
+    if template is None:
+        raise ValueError(f"Unknown INTERACT template: {name!r}")
+    required = {s for s in template.slots if not s.endswith("?")}
+    allowed = {"template"} | {s.rstrip("?") for s in template.slots}
+    if not required <= set(args) <= allowed:
+        raise ValueError(f"INTERACT template {name} takes slots {sorted(allowed - {'template'})}")
+    by_id = _labels(objects)
+    ids = [args["obj"]] if "obj" in args else list(args.get("objs") or [])
+    if "objs" in args and not (isinstance(args["objs"], list) and 1 <= len(ids) <= MAX_TEMPLATE_OBJS):
+        raise ValueError(f"INTERACT template {name}: objs must list 1..{MAX_TEMPLATE_OBJS} object ids")
+    missing = [i for i in ids if not isinstance(i, str) or i not in by_id]
+    if missing:
+        raise ValueError(f"INTERACT template {name}: unknown object ids {missing}")
+    action = args.get("action")
+    if "action" in args and action not in ACTIONS:
+        raise ValueError(f"INTERACT template {name}: action must be one of {ACTIONS}")
+    labels = [by_id[i] for i in ids]
+    return {
+        "tool": "INTERACT",
+        "args": {"kind": template.kind, "text": _text(name, labels, action), "choices": _choices(name, labels)},
+    }
+
+
+def is_template_call(tool_call: Any) -> bool:
+    if not isinstance(tool_call, Mapping) or tool_call.get("tool") != "INTERACT":
+        return False
+    args = tool_call.get("args")
+    return isinstance(args, Mapping) and "template" in args
+
+
+def render_tool_call(tool_call: Any, objects: Sequence[Mapping[str, Any]]) -> Any:
+    """
+    `tool_call` with a template-form INTERACT rendered in full (ValueError if it does
+    not render); anything else (full calls, motion tools) is returned unchanged.
+    """
+    if not is_template_call(tool_call):
+        return tool_call
+    return render_interact(tool_call["args"], objects)
+
+
+def _candidate_args(tool_call: Mapping[str, Any], objects: Sequence[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+    args = tool_call["args"]
+    text = str(args.get("text", ""))
+    by_id = _labels(objects)
+    # Objects named in the text, in order of first mention.
+    named = sorted((text.find(label), i) for i, label in by_id.items() if label in text)
+    ids = [i for _, i in named]
+    by_label = {v: k for k, v in by_id.items()}
+    choice_ids = [by_label.get(c.split(") ", 1)[-1]) for c in args.get("choices") or [] if isinstance(c, str)][:-1]
+    for name, template in TEMPLATES.items():
+        if template.kind != args.get("kind"):
+            continue
+        slots = {s.rstrip("?") for s in template.slots}
+        actions: List[Optional[str]] = list(ACTIONS) if "action" in slots else [None]
+        if "action?" in template.slots:
+            actions.append(None)
+        if "obj" in slots:
+            obj_sets: List[Dict[str, Any]] = [{"obj": i} for i in ids]
+        elif "objs" in slots:
+            objs = choice_ids if name == "candidate_choice" else ids
+            obj_sets = [{"objs": objs}] if objs and all(objs) else []
+        else:
+            obj_sets = [{}]
+        for obj_slots in obj_sets:
+            for action in actions:
+                out: Dict[str, Any] = {"template": name, **obj_slots}
+                if action is not None:
+                    out["action"] = action
+                yield out
+
+
+def encode_interact(tool_call: Mapping[str, Any], objects: Sequence[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Template form of a full INTERACT call, or None when no template renders it exactly
+    (or the call is not an INTERACT).
+    """
+    if tool_call.get("tool") != "INTERACT" or not isinstance(tool_call.get("args"), Mapping):
+        return None
+    for args in _candidate_args(tool_call, objects):
+        try:
+            if render_interact(args, objects) == tool_call:
+                return {"tool": "INTERACT", "args": args}
+        except ValueError:
+            continue
+    return None
+
+
+def try_render_tool_call(tool_call: Any, inp: Any) -> Any:
+    """
+    render_tool_call with the `objects` of a parsed contract input; a template call that
+    does not render (unknown template, ids or slots) is returned unchanged, so schema
+    validation reports it.
+    """
+    objects = inp.get("objects") if isinstance(inp, Mapping) else None
+    try:
+        return render_tool_call(tool_call, objects if isinstance(objects, list) else [])
+    except ValueError:
+        return tool_call
@@ -0,0 +1,81 @@
+import errno
+import json
+import os
+import random
+from collections import Counter
+from pathlib import Path
+
+from data_generator import jsonl_io
+from data_generator.episode import write_jsonl
+from data_generator.generate_dataset import generate
+from llm import contract_index
+from llm.contract_index import ContractIndex, index_path, row_features, select_rows
+from llm.data import convert_generator_jsonl_to_contract
+
+
+def _contract(tmp_path: Path, name: str = "contract.jsonl") -> Path:
+    records, _ = generate(episodes=30, seed=3)
+    gen = tmp_path / "gen.jsonl"
+    write_jsonl(str(gen), records)
+    out = tmp_path / name
+    convert_generator_jsonl_to_contract(str(gen), str(out))
+    return out
+
+
+def test_index_random_access_matches_file(tmp_path: Path):
+    path = _contract(tmp_path)
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    with ContractIndex.open(str(path)) as index:
+        assert os.path.exists(index_path(str(path)))
+        assert len(index) == len(rows)
+        assert list(index.read([5, 0, len(rows) - 1])) == [rows[5], rows[0], rows[-1]]
+        assert index.labels("tool") == [row_features(r)[0] for r in rows]
+        # Same picks as sampling the loaded list (what llm.eval used to do).
+        assert list(index.read(index.sample(20, seed=7))) == random.Random(7).sample(rows, 20)
+
+        shards = [index.shard(3, i) for i in range(3)]
+        assert [i for s in shards for i in s] == list(range(len(rows)))
+
+        counts = index.counts(("tool",))
+        picks = index.stratified_sample(40, seed=0, by=("tool",))
+        assert len(set(picks)) == 40 and picks == sorted(picks)
+        labels = index.labels("tool")
+        got = Counter(labels[i] for i in picks)
+        for tool, n in counts.items():
+            assert abs(got[tool] - 40 * n / len(rows)) <= 1
+
+
+def test_stale_index_is_rebuilt(tmp_path: Path):
+    path = _contract(tmp_path)
+    with ContractIndex.open(str(path)) as index:
+        n = len(index)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "extra", "instruction": "", "input": "{}", "output": "{\"tool\":\"APPROACH\",\"args\":{}}"}) + "\n")
+    with ContractIndex.open(str(path)) as index:
+        assert len(index) == n + 1
+        assert next(index.read([n]))["id"] == "extra"
+
+
+def test_read_only_mount_falls_back_to_memory(tmp_path: Path, monkeypatch):
+    path = _contract(tmp_path)
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+    def read_only(_path):
+        raise OSError(errno.EROFS, "Read-only file system")
+
+    monkeypatch.setattr(contract_index, "build_index", read_only)
+    with ContractIndex.open(str(path)) as index:
+        assert len(index) == len(rows)
+        assert list(index.read([3, 0])) == [rows[3], rows[0]]
+    assert not os.path.exists(index_path(str(path)))
+    assert select_rows(str(path), max_examples=5, mode="head") == rows[:5]
+
+
+def test_select_rows_on_compressed_contract(tmp_path: Path):
+    plain = _contract(tmp_path)
+    packed = tmp_path / "contract.jsonl.gz"
+    jsonl_io.write_jsonl(packed, (r for _, r in jsonl_io.iter_jsonl(plain)))
+    for mode in ("head", "random", "stratified"):
+        kw = dict(max_examples=15, seed=1, mode=mode, num_shards=2, shard_id=1)
+        assert select_rows(str(packed), **kw) == select_rows(str(plain), **kw)
+    assert not os.path.exists(index_path(str(packed)))
@@ -1,9 +1,17 @@
 import json
 from pathlib import Path
 
+import pytest
+
+from data_generator.episode import write_jsonl
+from data_generator.generate_dataset import generate
 from llm.data import (
+    ContractRow,
+    contract_version,
     convert_contract_to_qwen_chat_jsonl,
     convert_generator_jsonl_to_contract,
+    iter_dataset_contract,
+    iter_jsonl,
     validate_dataset_contract_jsonl,
 )
 
@@ -69,3 +77,59 @@ def test_convert_generator_jsonl_to_contract(tmp_path: Path):
     out = tmp_path / "contract.jsonl"
     convert_generator_jsonl_to_contract(str(gen), str(out))
     validate_dataset_contract_jsonl(str(out))
+
+
+def test_contract_v2_reads_like_v1(tmp_path: Path):
+    records, _ = generate(episodes=5, seed=0)
+    gen = tmp_path / "gen.jsonl"
+    write_jsonl(str(gen), records)
+    for v in (1, 2):
+        convert_generator_jsonl_to_contract(str(gen), str(tmp_path / f"c{v}.jsonl"), contract_version=v)
+        validate_dataset_contract_jsonl(str(tmp_path / f"c{v}.jsonl"))
+        convert_contract_to_qwen_chat_jsonl(str(tmp_path / f"c{v}.jsonl"), str(tmp_path / f"chat{v}.jsonl"))
+    assert (tmp_path / "chat1.jsonl").read_bytes() == (tmp_path / "chat2.jsonl").read_bytes()
+
+    v1 = [ContractRow(r) for _, r in iter_jsonl(str(tmp_path / "c1.jsonl"))]
+    v2 = [ContractRow(r) for _, r in iter_jsonl(str(tmp_path / "c2.jsonl"))]
+    assert isinstance(v2[0].raw["input"], dict)
+    for a, b in zip(v1, v2):
+        assert (a.id, a.input_text, a.output_text) == (b.id, b.input_text, b.output_text)
+        assert a.input_obj == b.input_obj and a.output_obj == b.output_obj
+        assert a.input_obj is a.input_obj  # parsed once, then cached
+
+
+def test_contract_row_invalid_json_raises():
+    row = ContractRow({"id": "x", "instruction": "", "input": "{bad", "output": "{}"})
+    with pytest.raises(ValueError):
+        row.input_obj
+    assert row.output_obj == {}
+
+
+def test_contract_rejects_mixed_v1_v2_rows(tmp_path: Path):
+    row = {"id": "x", "instruction": "", "input": "{}", "output": {"tool": "APPROACH", "args": {"obj": "o1"}}}
+    with pytest.raises(ValueError, match="mixes"):
+        contract_version(row)
+    contract = tmp_path / "contract.jsonl"
+    contract.write_text(json.dumps(row) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="both be strings"):
+        validate_dataset_contract_jsonl(str(contract))
+
+
+def test_mixed_version_contract_file_reads_as_v1_strings(tmp_path: Path):
+    output = {"tool": "APPROACH", "args": {"obj": "o1"}}
+    rows = [
+        {"id": "a", "instruction": "i", "input": '{"x":1}', "output": json.dumps(output)},
+        {"id": "b", "instruction": "i", "input": {"x": 1}, "output": output},
+    ]
+    contract = tmp_path / "mixed.jsonl"
+    contract.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+    validate_dataset_contract_jsonl(str(contract))
+    examples = list(iter_dataset_contract(str(contract)))
+    assert [json.loads(ex.input) for ex in examples] == [{"x": 1}, {"x": 1}]
+    assert [json.loads(ex.output) for ex in examples] == [output, output]
+
+    pytest.importorskip("datasets")
+    from llm.train import _load_contract_dataset
+
+    ds = _load_contract_dataset(str(contract))
+    assert ds[1]["input"] == '{"x":1}' and json.loads(ds[1]["output"]) == output
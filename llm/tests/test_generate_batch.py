@@ -0,0 +1,116 @@
+import pytest
+
+import llm.inference as inf
+
+
+def test_batched_generations_windows(monkeypatch):
+    calls = []
+
+    def fake_generate_batch(model, tok, messages_batch, cfg, batch_size=8):
+        prompts = [m[-1]["content"] for m in messages_batch]
+        calls.append(prompts)
+        return [p.upper() for p in prompts]
+
+    monkeypatch.setattr(inf, "_generate_batch", fake_generate_batch)
+    cfg = inf.InferenceConfig(model_path="dummy")
+    prompts = [f"p{i}" for i in range(10)]
+    gens = inf.BatchedGenerations(None, None, prompts, cfg, batch_size=2, lookahead=2)
+    assert [gens[i] for i in range(10)] == [p.upper() for p in prompts]
+    assert calls == [prompts[0:4], prompts[4:8], prompts[8:10]]
+
+
+def test_generate_batch_left_pads_and_restores_order():
+    torch = pytest.importorskip("torch")
+
+    class Tok:
+        pad_token_id = 0
+        padding_side = "right"
+
+        def apply_chat_template(self, messages, tokenize, add_generation_prompt):
+            return messages[-1]["content"]
+
+        def __call__(self, texts):
+            return {"input_ids": [[ord(c) for c in t] for t in texts]}
+
+        def pad(self, enc, padding, return_tensors):
+            assert self.padding_side == "left"
+            width = max(len(ids) for ids in enc["input_ids"])
+            ids = [[0] * (width - len(r)) + r for r in enc["input_ids"]]
+            mask = [[0] * (width - len(r)) + [1] * len(r) for r in enc["input_ids"]]
+            return {"input_ids": torch.tensor(ids), "attention_mask": torch.tensor(mask)}
+
+        def decode(self, ids, skip_special_tokens):
+            return "".join(chr(int(i)) for i in ids if int(i) != 0)
+
+    class Model:
+        device = "cpu"
+        widths = []
+
+        def generate(self, input_ids, attention_mask, **kw):
+            self.widths.append(input_ids.shape[-1])
+            # "Generate" each row's prompt reversed, right-padded.
+            rows = [[int(t) for t, m in zip(r, mk) if m][::-1] for r, mk in zip(input_ids, attention_mask)]
+            width = max(len(r) for r in rows)
+            gen = torch.tensor([r + [0] * (width - len(r)) for r in rows])
+            return torch.cat([input_ids, gen], dim=1)
+
+    prompts = ["ccc", "a", "bbbbbb", "dd", "eeeee"]
+    tok, model = Tok(), Model()
+    cfg = inf.InferenceConfig(model_path="dummy", temperature=0.0, prefix_cache=False)
+    out = inf._generate_batch(model, tok, [inf._build_messages(p) for p in prompts], cfg, batch_size=2)
+    assert out == [p[::-1] for p in prompts]
+    assert model.widths == [2, 5, 6]  # length-sorted batches: (a, dd), (ccc, eeeee), (bbbbbb)
+    assert tok.padding_side == "right"
+
+
+def _tiny_model():
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast, Qwen2Config, Qwen2ForCausalLM
+
+    corpus = [inf.SYSTEM_PROMPT, 'Given the observation, emit one tool call.\n\nInput:\n{"objects": [], "memory": {}}']
+    tk = Tokenizer(models.BPE())
+    tk.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tk.decoder = decoders.ByteLevel()
+    specials = ["<|endoftext|>", "<|im_start|>", "<|im_end|>"]
+    tk.train_from_iterator(
+        corpus, trainers.BpeTrainer(vocab_size=400, special_tokens=specials, initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    )
+    tok = PreTrainedTokenizerFast(tokenizer_object=tk, eos_token="<|im_end|>", pad_token="<|endoftext|>")
+    tok.chat_template = (
+        "{% for m in messages %}<|im_start|>{{ m['role'] }}\n{{ m['content'] }}<|im_end|>\n{% endfor %}"
+        "{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+    )
+    torch.manual_seed(0)
+    cfg = Qwen2Config(
+        vocab_size=len(tok), hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=4,
+        num_key_value_heads=2, eos_token_id=tok.eos_token_id, pad_token_id=tok.pad_token_id,
+    )
+    return Qwen2ForCausalLM(cfg).eval(), tok
+
+
+def test_prefix_cache_matches_full_prefill():
+    model, tok = _tiny_model()
+    prompts = [f'Given the observation, emit one tool call.\n\nInput:\n{{"objects": [{i}], "memory": {{"n": {"7" * i}}}}}' for i in range(5)]
+    messages = [inf._build_messages(p) for p in prompts]
+    cfg = inf.InferenceConfig(model_path="dummy", temperature=0.0, top_p=1.0, max_new_tokens=6, prefix_cache=False)
+    cached = inf.InferenceConfig(model_path="dummy", temperature=0.0, top_p=1.0, max_new_tokens=6)
+    reference = inf._generate_batch(model, tok, messages, cfg, batch_size=1)
+    assert inf._generate_batch(model, tok, messages, cached, batch_size=1) == reference
+    assert inf._generate_batch(model, tok, messages, cached, batch_size=3) == reference
+    stats = inf.prefix_cache_stats(model)
+    assert stats["prefixes"] == 1 and stats["rows"] == 10 and stats["prefix_tokens"] > 0
+
+
+def test_prefix_cache_batches_keep_output_prefix():
+    from llm.constrained import GRAMMAR_PREFIX
+
+    model, tok = _tiny_model()
+    prompts = [f'Given the observation, emit one tool call.\n\nInput:\n{{"objects": [], "memory": {{"n": {"7" * i}}}}}' for i in range(5)]
+    messages = [inf._build_messages(p) for p in prompts]
+    cfg = inf.InferenceConfig(model_path="dummy", temperature=0.0, top_p=1.0, max_new_tokens=12, constrained=True)
+    reference = inf._generate_batch(model, tok, messages, cfg, batch_size=1)
+    # Shared-prefix batches, then a batch after them: the decoded text keeps the string prefix.
+    assert inf._generate_batch(model, tok, messages, cfg, batch_size=3) == reference
+    assert all(r.startswith(GRAMMAR_PREFIX) for r in reference)
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+import llm.inference as inf
+from llm.eval import _extract_first_json_object
+from llm.utils import JsonObjectScanner
+
+TEXTS = [
+    '{"tool":"INTERACT","args":{"kind":"QUESTION","text":"Is it {the} \\"red\\" one?","choices":["1) a}","2) b"]}}\nTrailing.',
+    'Sure! {"tool": "APPROACH", "args": {"obj": "o1"}} {"tool": "ALIGN_YAW"}',
+    '"quoted { before" {"a": "\\\\"} }',
+    '{"unterminated": {"x": 1}',
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_scanner_matches_extractor_for_any_chunking(text):
+    expected = _extract_first_json_object(text)
+    rng = random.Random(0)
+    for _ in range(20):
+        sc = JsonObjectScanner()
+        i = 0
+        while i < len(text) and not sc.done:
+            j = i + rng.randint(1, 4)
+            sc.feed(text[i:j])
+            i = j
+        if expected is None:
+            assert not sc.done
+        else:
+            assert sc.done and text[text.index("{") : sc.end] == expected
+
+
+def test_json_stop_finishes_rows_independently():
+    torch = pytest.importorskip("torch")
+
+    class Tok:
+        def decode(self, ids, skip_special_tokens):
+            return "".join(chr(int(i)) for i in ids if int(i) != 0)
+
+    outputs = ['{"a": "}"} more', 'x {"b": {"c": 1}} tail']
+    prompt = torch.tensor([[ord("p")] * 3] * 2)
+    stop = inf.JsonStop(Tok(), prompt_len=3)
+    ids, stopped_at = prompt, [None, None]
+    for step in range(max(len(o) for o in outputs)):
+        new = [ord(o[step]) if step < len(o) and stopped_at[b] is None else 0 for b, o in enumerate(outputs)]
+        ids = torch.cat([ids, torch.tensor(new)[:, None]], dim=1)
+        done = stop(ids, None)
+        for b in range(2):
+            if done[b] and stopped_at[b] is None:
+                stopped_at[b] = step + 1
+    assert [o[: n] for o, n in zip(outputs, stopped_at)] == ['{"a": "}"}', 'x {"b": {"c": 1}}']
@@ -0,0 +1,58 @@
+import llm.inference as inf
+
+
+class _FakeModel:
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+    def get_memory_footprint(self) -> int:
+        return self.nbytes
+
+
+def _fake_loader(loads, nbytes=100):
+    def fake_load(cfg):
+        loads.append(cfg.model_path)
+        return _FakeModel(nbytes), object()
+
+    return fake_load
+
+
+def test_generate_json_only_loads_once(monkeypatch):
+    loads = []
+    monkeypatch.setattr(inf, "MODEL_CACHE", inf.ModelCache())
+    monkeypatch.setattr(inf, "_load_model_and_tokenizer", _fake_loader(loads))
+    monkeypatch.setattr(inf, "_generate_once", lambda model, tok, messages, cfg: '{"tool":"INTERACT"}')
+
+    cfg = inf.InferenceConfig(model_path="dummy")
+    for _ in range(3):
+        assert inf.generate_json_only("hi", cfg) == {"tool": "INTERACT"}
+    assert loads == ["dummy"]
+    # Sampling settings do not change the cache key; use_4bit / dtype do.
+    inf.get_model_and_tokenizer(inf.InferenceConfig(model_path="dummy", temperature=0.0))
+    inf.get_model_and_tokenizer(inf.InferenceConfig(model_path="dummy", dtype="bfloat16"))
+    assert loads == ["dummy", "dummy"]
+
+    assert inf.unload("dummy") == 1 and len(inf.MODEL_CACHE) == 0
+    inf.generate_json_only("hi", cfg)
+    assert loads == ["dummy", "dummy", "dummy"]
+
+
+def test_lru_eviction_under_budget(monkeypatch):
+    loads = []
+    monkeypatch.setattr(inf, "_load_model_and_tokenizer", _fake_loader(loads))
+    cache = inf.ModelCache(budget_bytes=250)
+    a, b, c = (inf.InferenceConfig(model_path=p) for p in ("a", "b", "c"))
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # b is now least recently used
+    cache.get(c)
+    assert [k[0] for k in cache.keys()] == ["a", "c"] and cache.nbytes == 200
+    assert b not in cache and a in cache
+    assert loads == ["a", "b", "c"]
+
+    # Budget 0: only the newest model stays resident.
+    single = inf.ModelCache()
+    single.get(a)
+    single.get(b)
+    assert [k[0] for k in single.keys()] == ["b"]
+    assert single.unload() == 1 and len(single) == 0
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from data_generator.episode import write_jsonl
+from data_generator.generate_dataset import generate
+from llm.data import convert_contract_to_qwen_chat_jsonl, convert_generator_jsonl_to_contract
+from llm.prepare_llm_data import prepare_fused
+from llm.rebalance_contract import rebalance_contract
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_prepare_fused_matches_multi_pass_outputs(tmp_path: Path, version: int):
+    records, _ = generate(episodes=8, seed=1)
+
+    gen = tmp_path / "gen.jsonl"
+    write_jsonl(str(gen), records)
+    contract = tmp_path / "contract.jsonl"
+    chat = tmp_path / "chat.jsonl"
+    contract_reb = tmp_path / "contract_reb.jsonl"
+    chat_reb = tmp_path / "chat_reb.jsonl"
+    convert_generator_jsonl_to_contract(str(gen), str(contract), contract_version=version)
+    convert_contract_to_qwen_chat_jsonl(str(contract), str(chat))
+    rebalance_contract(in_path=str(contract), out_path=str(contract_reb), seed=3, motion_repeat=2, interact_keep_prob=0.5)
+    convert_contract_to_qwen_chat_jsonl(str(contract_reb), str(chat_reb))
+
+    fused = tmp_path / "fused"
+    fused.mkdir()
+    stats = prepare_fused(
+        iter(records),
+        out_generator=str(fused / "gen.jsonl"),
+        out_contract=str(fused / "contract.jsonl"),
+        out_chat=str(fused / "chat.jsonl"),
+        out_contract_rebalanced=str(fused / "contract_reb.jsonl"),
+        out_chat_rebalanced=str(fused / "chat_reb.jsonl"),
+        rebalance_seed=3,
+        motion_repeat=2,
+        interact_keep_prob=0.5,
+        contract_version=version,
+    )
+
+    assert stats["records"] == len(records)
+    for name in ("gen.jsonl", "contract.jsonl", "chat.jsonl", "contract_reb.jsonl", "chat_reb.jsonl"):
+        assert (fused / name).read_bytes() == (tmp_path / name).read_bytes(), name
+
+
+def test_contract_ids_match_between_layouts(tmp_path: Path):
+    records, _ = generate(episodes=6, seed=2)
+    write_jsonl(str(tmp_path / "gen.jsonl"), records)
+    convert_generator_jsonl_to_contract(str(tmp_path / "gen.jsonl"), str(tmp_path / "contract.jsonl"))
+
+    fused = tmp_path / "fused"
+    fused.mkdir()
+    prepare_fused(
+        iter(records),
+        out_generator=str(fused / "gen.jsonl"),
+        generator_format="delta",
+        out_contract=str(fused / "contract.jsonl"),
+        out_chat=str(fused / "chat.jsonl"),
+    )
+    convert_generator_jsonl_to_contract(str(fused / "gen.jsonl"), str(fused / "contract_from_delta.jsonl"))
+
+    expected = (tmp_path / "contract.jsonl").read_bytes()
+    assert (fused / "contract.jsonl").read_bytes() == expected
+    assert (fused / "contract_from_delta.jsonl").read_bytes() == expected
+
+
+def test_prepare_fused_validates_rows(tmp_path: Path, monkeypatch):
+    import llm.prepare_llm_data as prep
+
+    records, _ = generate(episodes=2, seed=1)
+    parts = prep.generator_record_to_contract_parts
+    monkeypatch.setattr(prep, "generator_record_to_contract_parts", lambda rec, **kw: (parts(rec, **kw)[0], "{not json"))
+    with pytest.raises(ValueError, match=r"<records>:1: output must be valid JSON"):
+        prepare_fused(iter(records), out_contract=str(tmp_path / "contract.jsonl"), out_chat=str(tmp_path / "chat.jsonl"))
+
+
+def test_prepare_fused_failure_keeps_previous_outputs(tmp_path: Path, monkeypatch):
+    import llm.prepare_llm_data as prep
+
+    records, _ = generate(episodes=3, seed=1)
+    outs = {k: str(tmp_path / f"{k}.jsonl") for k in ("out_generator", "out_contract", "out_chat", "out_contract_rebalanced", "out_chat_rebalanced")}
+    prepare_fused(iter(records), **outs)
+    before = {k: Path(p).read_bytes() for k, p in outs.items()}
+
+    parts = prep.generator_record_to_contract_parts
+    calls = []
+
+    def fail_on_third(rec, **kw):
+        calls.append(rec)
+        return parts(rec, **kw) if len(calls) < 3 else (parts(rec, **kw)[0], "{not json")
+
+    monkeypatch.setattr(prep, "generator_record_to_contract_parts", fail_on_third)
+    with pytest.raises(ValueError):
+        prepare_fused(iter(records), **outs)
+    assert {k: Path(p).read_bytes() for k, p in outs.items()} == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(Path(p).name for p in outs.values())
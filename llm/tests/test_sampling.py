@@ -0,0 +1,164 @@
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+from data_generator.episode import write_jsonl
+from data_generator.generate_dataset import generate
+from llm.contract_index import ALL_ROWS, ContractIndex, row_features, select, select_rows
+from llm.data import convert_generator_jsonl_to_contract
+from llm.sampling import StratumCounters, allocate, interleave_order, load_prior, summarize_rates, wilson_interval
+
+
+@dataclass
+class _Counts:
+    n: int = 0
+    ok: int = 0
+    sub_n: int = 0
+    sub_ok: int = 0
+
+
+RATES = [("acc", "ok", "n"), ("sub_acc", "sub_ok", "sub_n")]
+
+
+def test_wilson_interval():
+    lo, hi = wilson_interval(0.5, 100)
+    assert lo == pytest.approx(0.4038, abs=1e-4) and hi == pytest.approx(0.5962, abs=1e-4)
+    assert wilson_interval(0.0, 0) == (0.0, 1.0)
+    assert wilson_interval(1.0, 20)[1] == 1.0
+
+
+def test_allocate():
+    sizes = {"a": 900, "b": 90, "c": 10}
+    assert allocate(sizes, 100) == {"a": 90, "b": 9, "c": 1}
+    floored = allocate(sizes, 100, min_per_stratum=5)
+    assert floored["c"] == 5 and sum(floored.values()) == 100
+    assert allocate(sizes, 100, min_per_stratum=20)["c"] == 10  # capped at the stratum size
+    assert allocate(sizes, 2000) == sizes
+    # Below the floors: one each, largest strata first.
+    assert allocate(sizes, 4, min_per_stratum=5) == {"a": 2, "b": 1, "c": 1}
+    # Neyman: a stratum the model always gets right needs few examples.
+    neyman = allocate({"easy": 500, "hard": 500}, 100, prior={"easy": 0.99, "hard": 0.5})
+    assert neyman["hard"] > 3 * neyman["easy"]
+
+
+def test_allocate_with_prior_meets_budget_and_bounds():
+    assert allocate({"a": 10, "b": 3, "c": 2}, 14, min_per_stratum=5, prior={"a": 0.58, "b": 0.36, "c": 0.06}) == {
+        "a": 9,
+        "b": 3,
+        "c": 2,
+    }
+    rng = random.Random(0)
+    for _ in range(3000):
+        sizes = {f"s{j}": rng.randint(0, 40) for j in range(rng.randint(1, 6))}
+        n = rng.randint(0, sum(sizes.values()) + 10)
+        floor = rng.randint(0, 8)
+        prior = {h: rng.random() for h in sizes if rng.random() < 0.8}
+        alloc = allocate(sizes, n, min_per_stratum=floor, prior=prior)
+        budget = min(n, sum(sizes.values()))
+        assert sorted(alloc) == sorted(sizes)
+        assert sum(alloc.values()) == budget
+        assert all(alloc[h] <= sizes[h] for h in sizes)
+        if sum(min(N, floor) for N in sizes.values()) <= budget:
+            assert all(alloc[h] >= min(sizes[h], floor) for h in sizes)
+
+
+def test_counters_and_weighted_estimates():
+    m = _Counts()
+    counters = StratumCounters(m, ("n", "ok", "sub_n", "sub_ok"))
+    # Stratum x: 10 examples, 9 correct; stratum y: 10 examples, 5 correct (the first
+    # 4 also count for sub_acc, 2 of them correct). A `continue` needs no extra call.
+    for i in range(20):
+        stratum = "x" if i < 10 else "y"
+        counters.start(stratum)
+        m.n += 1
+        if (stratum == "x" and i == 0) or (stratum == "y" and i >= 15):
+            continue
+        m.ok += 1
+        if stratum == "y" and i < 14:
+            m.sub_n += 1
+            m.sub_ok += int(i < 12)
+    counters.finish()
+    assert counters.counts["x"] == {"n": 10, "ok": 9, "sub_n": 0, "sub_ok": 0}
+    assert counters.counts["y"] == {"n": 10, "ok": 5, "sub_n": 4, "sub_ok": 2}
+
+    # Unweighted (sample == population): plain pooled rates.
+    plain = summarize_rates(counters, RATES)
+    assert plain["estimates"]["acc"]["value"] == pytest.approx(14 / 20)
+    # y stands for 9x as many rows as x.
+    est = summarize_rates(counters, RATES, {"x": 100, "y": 900})
+    acc = est["estimates"]["acc"]
+    assert acc["value"] == pytest.approx(0.1 * 0.9 + 0.9 * 0.5)
+    assert acc["ci95"][0] < acc["value"] < acc["ci95"][1]
+    assert est["estimates"]["sub_acc"]["value"] == pytest.approx(0.5)
+    assert est["strata"]["x"] == {"population": 100, "sampled": 10, "acc": 0.9, "sub_acc": None}
+
+
+def test_all_correct_strata_keep_some_width():
+    m = _Counts()
+    counters = StratumCounters(m, ("n", "ok", "sub_n", "sub_ok"))
+    for i in range(6):
+        counters.start("x" if i < 3 else "y")
+        m.n += 1
+        m.ok += 1
+    counters.finish()
+    lo, hi = summarize_rates(counters, RATES, {"x": 500, "y": 500})["estimates"]["acc"]["ci95"]
+    assert hi == 1.0 and lo < 0.9
+
+
+def test_interleave_order_keeps_prefixes_balanced():
+    strata = ["a"] * 900 + ["b"] * 90 + ["c"] * 10
+    order = interleave_order(strata, seed=1)
+    assert sorted(order) == list(range(1000)) and order == interleave_order(strata, seed=1)
+    # Two of every stratum first, then proportional prefixes.
+    assert sorted(strata[i] for i in order[:6]) == ["a", "a", "b", "b", "c", "c"]
+    head = [strata[i] for i in order[:100]]
+    assert 85 <= head.count("a") <= 92 and 8 <= head.count("b") <= 11
+    assert interleave_order(["all"] * 10, seed=0) != list(range(10))
+
+
+def test_single_stratum_is_plain_wilson():
+    m = _Counts()
+    counters = StratumCounters(m, ("n", "ok", "sub_n", "sub_ok"))
+    for i in range(30):
+        counters.start(ALL_ROWS)
+        m.n += 1
+        m.ok += int(i % 3 != 0)
+    counters.finish()
+    acc = summarize_rates(counters, RATES, {ALL_ROWS: 1000})["estimates"]["acc"]
+    assert acc["value"] == 20 / 30
+    assert acc["ci95"] == list(wilson_interval(20 / 30, 30))
+
+
+def test_select_stratified_reports_strata(tmp_path: Path):
+    records, _ = generate(episodes=30, seed=3)
+    gen = tmp_path / "gen.jsonl"
+    write_jsonl(str(gen), records)
+    path = tmp_path / "contract.jsonl"
+    convert_generator_jsonl_to_contract(str(gen), str(path))
+
+    sel = select(str(path), max_examples=30, seed=0, mode="stratified", min_per_stratum=2)
+    with ContractIndex.open(str(path)) as index:
+        assert sel.population == index.counts(("context", "tool", "mode"))
+        strata = index.strata(("context", "tool", "mode"))
+    assert len(sel.rows) == len(sel.strata) == 30
+    for row, stratum in zip(sel.rows, sel.strata):
+        tool, ctx, mode, _ = row_features(row)
+        assert stratum == f"{ctx}|{tool}|{mode}"
+    assert all(n >= min(2, sel.population[k]) for k, n in ((k, sel.strata.count(k)) for k in sel.population))
+    assert sum(sel.population.values()) == sum(len(v) for v in strata.values())
+
+    head = select(str(path), max_examples=10, mode="head")
+    assert head.strata == [ALL_ROWS] * 10 and head.rows == select_rows(str(path), max_examples=10, mode="head")
+
+
+def test_load_prior(tmp_path: Path):
+    path = tmp_path / "summary_all.json"
+    strata = lambda a: {"x": {"population": 5, "sampled": 5, "tool_accuracy": a}}  # noqa: E731
+    path.write_text(json.dumps({"summaries": [{"strata": strata(0.2)}, {"strata": strata(0.4)}]}), encoding="utf-8")
+    assert load_prior(str(path)) == {"x": pytest.approx(0.3)}
+    flat = tmp_path / "prior.json"
+    flat.write_text(json.dumps({"x": 0.7}), encoding="utf-8")
+    assert load_prior(str(flat)) == {"x": 0.7}
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from data_generator.episode import write_jsonl
+from data_generator.generate_dataset import generate
+from data_generator.oracle import validate_tool_call
+from llm.constrained import ToolCallGrammar
+from llm.data import TEMPLATE_INSTRUCTION, ContractRow, convert_generator_jsonl_to_contract, iter_jsonl
+from llm.templates import encode_interact, render_interact, render_tool_call, try_render_tool_call
+
+OBJECTS = [{"id": "o1", "label": "mug"}, {"id": "o2", "label": "sugar_box"}, {"id": "o3", "label": "bleach_cleanser"}]
+
+
+def _compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def test_every_oracle_interact_round_trips_through_a_template():
+    records, _ = generate(episodes=40, seed=3)
+    interacts = [r for r in records if r["target_tool_call"]["tool"] == "INTERACT"]
+    assert interacts
+    full_chars = compact_chars = 0
+    for rec in interacts:
+        call = rec["target_tool_call"]
+        compact = encode_interact(call, rec["objects"])
+        assert compact is not None, call
+        assert render_tool_call(compact, rec["objects"]) == call
+        g = ToolCallGrammar([o["id"] for o in rec["objects"]])
+        assert g.done(g.feed(g.start, _compact(compact)))
+        full_chars += len(_compact(call))
+        compact_chars += len(_compact(compact))
+    assert compact_chars * 2 < full_chars
+
+
+def test_render_candidate_choice_and_errors():
+    out = render_interact({"template": "candidate_choice", "objs": ["o2", "o1"], "action": "ALIGN_YAW"}, OBJECTS)
+    assert out["args"] == {
+        "kind": "QUESTION",
+        "text": "Which object do you want me to align yaw to?",
+        "choices": ["1) sugar_box", "2) mug", "3) None of them"],
+    }
+    validate_tool_call(out)
+    for bad in (
+        {"template": "nope"},
+        {"template": "confirm", "obj": "o9", "action": "APPROACH"},
+        {"template": "confirm", "obj": "o1"},
+        {"template": "mode_select", "obj": "o1"},
+        {"template": "candidate_choice", "objs": ["o1"] * 5},
+    ):
+        with pytest.raises(ValueError):
+            render_interact(bad, OBJECTS)
+    bad_call = {"tool": "INTERACT", "args": {"template": "help", "obj": "o9"}}
+    assert try_render_tool_call(bad_call, {"objects": OBJECTS}) == bad_call
+    motion = {"tool": "APPROACH", "args": {"obj": "o1"}}
+    assert render_tool_call(motion, OBJECTS) is motion
+
+
+def test_unknown_phrasing_is_kept_in_full():
+    call = {"tool": "INTERACT", "args": {"kind": "QUESTION", "text": "Something new?", "choices": ["1) YES", "2) NO"]}}
+    assert encode_interact(call, OBJECTS) is None
+
+
+def test_contract_converter_template_output(tmp_path: Path):
+    records, _ = generate(episodes=6, seed=1)
+    gen = tmp_path / "gen.jsonl"
+    write_jsonl(str(gen), records)
+    full, tpl = tmp_path / "full.jsonl", tmp_path / "tpl.jsonl"
+    convert_generator_jsonl_to_contract(str(gen), str(full))
+    convert_generator_jsonl_to_contract(str(gen), str(tpl), output_format="template", contract_version=2)
+    n_template = 0
+    for (_, a), (_, b) in zip(iter_jsonl(str(full)), iter_jsonl(str(tpl))):
+        row_full, row_tpl = ContractRow(a), ContractRow(b)
+        assert row_tpl.instruction == TEMPLATE_INSTRUCTION
+        assert row_tpl.input_text == row_full.input_text
+        n_template += "template" in row_tpl.output_obj["args"]
+        assert try_render_tool_call(row_tpl.output_obj, row_tpl.input_obj) == row_full.output_obj
+    assert n_template > 0
@@ -188,6 +188,17 @@ def _chat_to_text(tok, messages: List[Dict[str, str]]) -> str:
     return tok.apply_chat_template(messages, tokenize=False, add_generation_prompt=False)
 
 
+def _load_contract_dataset(path: str):
+    from datasets import Dataset  # type: ignore[import]
+
+    # Always go through iter_dataset_contract: v2 rows nest input/output objects whose
+    # shape varies per row (Arrow cannot type them as one column), and a file may mix v1
+    # and v2 rows, so every row is normalized to the equivalent v1 strings.
+    return Dataset.from_list(
+        [{"id": ex.id, "instruction": ex.instruction, "input": ex.input, "output": ex.output} for ex in data_lib.iter_dataset_contract(path)]
+    )
+
+
 def train_sft_lora(args: TrainArgs) -> None:
     set_seed(args.seed)
     ensure_dir(args.output_dir)
@@ -199,7 +210,6 @@ def train_sft_lora(args: TrainArgs) -> None:
     if args.valid_path:
         data_lib.validate_dataset_contract_jsonl(args.valid_path)
 
-    from datasets import load_dataset  # type: ignore[import]
     from transformers import TrainingArguments
 
     import torch
@@ -224,11 +234,11 @@ def train_sft_lora(args: TrainArgs) -> None:
         peft_cfg = _make_peft_config(args)
         model = get_peft_model(model, peft_cfg)
 
-    train_ds = load_dataset("json", data_files=args.train_path, split="train")
+    train_ds = _load_contract_dataset(args.train_path)
     eval_ds = None
     if not args.disable_eval:
         if args.valid_path:
-            eval_ds = load_dataset("json", data_files=args.valid_path, split="train")
+            eval_ds = _load_contract_dataset(args.valid_path)
         else:
             # Default behavior: create a small validation split from the training file.
             # This is crucial for tracking overfitting/regressions without requiring extra args.
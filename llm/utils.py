@@ -71,3 +71,53 @@ def json_loads_strict(s: str) -> Any:
     except Exception as e:
         raise ValueError(f"Invalid JSON: {e}") from e
 
+
+class JsonObjectScanner:
+    """
+    Incremental, brace/string-aware scan for the end of the first top-level JSON object in
+    text that arrives in pieces. Text before the first "{" is skipped (as in the
+    `_extract_first_json_object` helpers); `end` is the character offset just past the
+    closing "}" once it has been seen.
+    """
+
+    __slots__ = ("depth", "in_str", "esc", "pos", "end")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.pos = 0
+        self.end: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    def feed(self, text: str) -> bool:
+        """
+        Consume the next piece of text; returns True once the object has closed.
+        """
+        if self.end is not None:
+            return True
+        for i, ch in enumerate(text):
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif ch == "\\":
+                    self.esc = True
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == "{":
+                self.depth += 1
+            elif self.depth == 0:
+                continue
+            elif ch == '"':
+                self.in_str = True
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = self.pos + i + 1
+                    self.pos += len(text)
+                    return True
+        self.pos += len(text)
+        return False
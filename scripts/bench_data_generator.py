@@ -0,0 +1,253 @@
+"""
+Micro-benchmarks for the data_generator hot paths.
+
+Examples:
+  # All sections:
+  python scripts/bench_data_generator.py
+
+  # Only grid/yaw lookups, more iterations:
+  python scripts/bench_data_generator.py --only grid --iters 500000
+
+  # Episode engines (world simulation and full generation, episodes/sec):
+  python scripts/bench_data_generator.py --only episode --episodes 8192
+
+  # Oracle decisions/sec on a replayed corpus of generator states:
+  python scripts/bench_data_generator.py --only oracle --episodes 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import gc
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+import _bootstrap  # noqa: F401
+from data_generator import generate_dataset, grid
+from data_generator import yaw as yawlib
+from data_generator import oracle
+from data_generator.episode import Episode
+
+
+def _time_per_call(fn: Callable[[], None], iters: int) -> float:
+    """
+    Returns nanoseconds per call of `fn` (best of 3 runs).
+    """
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(iters):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / iters * 1e9
+
+
+def _report(section: str, rows: List[Tuple[str, float, float]]) -> None:
+    print(f"\n== {section} ==")
+    print(f"{'op':<28} {'before ns':>11} {'after ns':>10} {'speedup':>8}")
+    for name, before, after in rows:
+        print(f"{name:<28} {before:>11.1f} {after:>10.1f} {before / max(after, 1e-9):>7.1f}x")
+
+
+# -----------------------------------------------------------------------------
+# grid: label parsing (reference) vs precomputed id tables.
+# -----------------------------------------------------------------------------
+
+
+def _legacy_manhattan(a: str, b: str) -> int:
+    ca, cb = grid.Cell.from_label(a), grid.Cell.from_label(b)
+    return abs(ca.r - cb.r) + abs(ca.c - cb.c)
+
+
+def _legacy_neighbors(cell: str) -> List[str]:
+    c = grid.Cell.from_label(cell)
+    out: List[str] = []
+    for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        nr, nc = c.r + dr, c.c + dc
+        if 0 <= nr < 3 and 0 <= nc < 3:
+            out.append(grid.Cell(nr, nc).to_label())
+    return out
+
+
+def _legacy_step_toward(current: str, target: str) -> str:
+    if current == target:
+        return current
+    cur, tgt = grid.Cell.from_label(current), grid.Cell.from_label(target)
+    dr, dc = tgt.r - cur.r, tgt.c - cur.c
+    nr, nc = cur.r, cur.c
+    if dr != 0:
+        nr += 1 if dr > 0 else -1
+    else:
+        nc += 1 if dc > 0 else -1
+    return grid.Cell(nr, nc).to_label()
+
+
+def bench_grid(iters: int) -> None:
+    a, b = "A1", "C3"
+    ia, ib = grid.cell_id(a), grid.cell_id(b)
+    rows = [
+        ("manhattan(str)", _time_per_call(lambda: _legacy_manhattan(a, b), iters), _time_per_call(lambda: grid.manhattan(a, b), iters)),
+        ("manhattan_id(int)", _time_per_call(lambda: _legacy_manhattan(a, b), iters), _time_per_call(lambda: grid.manhattan_id(ia, ib), iters)),
+        ("neighbors(str)", _time_per_call(lambda: _legacy_neighbors("B2"), iters), _time_per_call(lambda: grid.neighbors("B2"), iters)),
+        ("step_toward(str)", _time_per_call(lambda: _legacy_step_toward(a, b), iters), _time_per_call(lambda: grid.step_toward(a, b), iters)),
+        ("step_toward_id(int)", _time_per_call(lambda: _legacy_step_toward(a, b), iters), _time_per_call(lambda: grid.step_toward_id(ia, ib), iters)),
+    ]
+    _report("grid", rows)
+
+
+# -----------------------------------------------------------------------------
+# yaw: per-step loop with string normalization (reference) vs move/distance tables.
+# -----------------------------------------------------------------------------
+
+
+_LEGACY_YAW_IDX = {b: i for i, b in enumerate(yawlib.YAW_BINS)}
+
+
+def _legacy_cyclic_distance_steps(a: str, b: str) -> int:
+    ia, ib = _LEGACY_YAW_IDX[yawlib.normalize(a)], _LEGACY_YAW_IDX[yawlib.normalize(b)]
+    d = abs(ia - ib) % len(yawlib.YAW_BINS)
+    return min(d, len(yawlib.YAW_BINS) - d)
+
+
+def _legacy_move_toward(current: str, target: str, steps: int = 1) -> str:
+    cur, tgt = _LEGACY_YAW_IDX[yawlib.normalize(current)], _LEGACY_YAW_IDX[yawlib.normalize(target)]
+    n = len(yawlib.YAW_BINS)
+    for _ in range(steps):
+        if cur == tgt:
+            break
+        cw = (tgt - cur) % n
+        ccw = (cur - tgt) % n
+        cur = (cur + 1) % n if cw <= ccw else (cur - 1) % n
+    return yawlib.YAW_BINS[cur]
+
+
+def bench_yaw(iters: int) -> None:
+    ia, ib = yawlib.yaw_id("N"), yawlib.yaw_id("S")
+    rows = [
+        ("cyclic_distance_steps(str)", _time_per_call(lambda: _legacy_cyclic_distance_steps("N", "S"), iters), _time_per_call(lambda: yawlib.cyclic_distance_steps("N", "S"), iters)),
+        ("move_toward(str, steps=1)", _time_per_call(lambda: _legacy_move_toward("N", "S", 1), iters), _time_per_call(lambda: yawlib.move_toward("N", "S", 1), iters)),
+        ("move_toward(str, steps=4)", _time_per_call(lambda: _legacy_move_toward("N", "S", 4), iters), _time_per_call(lambda: yawlib.move_toward("N", "S", 4), iters)),
+        ("move_toward_id(int, 4)", _time_per_call(lambda: _legacy_move_toward("N", "S", 4), iters), _time_per_call(lambda: yawlib.move_toward_id(ia, ib, 4), iters)),
+    ]
+    _report("yaw", rows)
+
+
+# -----------------------------------------------------------------------------
+# episode: one Episode at a time vs the lockstep BatchEpisode engine.
+# -----------------------------------------------------------------------------
+
+
+def _best_seconds(fn: Callable[[], None], repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_episode(episodes: int) -> None:
+    import numpy as np
+
+    from data_generator.batch_episode import BatchEpisode
+
+    steps = 12
+
+    def world_episode() -> None:
+        for i in range(episodes):
+            rng = random.Random(i)
+            ep = Episode(rng=rng, episode_id=i, n_obj=rng.randint(2, 10))
+            for _ in range(steps):
+                ep.apply_user_motion()
+                ep.gripper_candidates()
+
+    def world_batch() -> None:
+        rng = np.random.default_rng(0)
+        batch = BatchEpisode(rng, rng.integers(2, 10, endpoint=True, size=episodes))
+        for _ in range(steps):
+            batch.apply_user_motion()
+            batch.candidate_mask()
+
+    def full(engine: str) -> Callable[[], None]:
+        return lambda: generate_dataset.generate(episodes=episodes, seed=0, engine=engine)
+
+    print(f"\n== episode ({episodes} episodes) ==")
+    print(f"{'op':<28} {'episode eps/s':>14} {'batch eps/s':>12} {'speedup':>8}")
+    for name, a, b in (
+        (f"world sim ({steps} steps)", world_episode, world_batch),
+        ("generate()", full("episode"), full("batch")),
+    ):
+        ta, tb = _best_seconds(a), _best_seconds(b)
+        print(f"{name:<28} {episodes / ta:>14.0f} {episodes / tb:>12.0f} {ta / max(tb, 1e-9):>7.1f}x")
+
+
+# -----------------------------------------------------------------------------
+# oracle: decisions/sec over oracle inputs captured from a generator run.
+# -----------------------------------------------------------------------------
+
+
+def _oracle_corpus(episodes: int) -> List[Tuple]:
+    """
+    Capture every oracle_decide_tool() call of a generator run as
+    (objects, gripper_hist, memory, state, user_state), with state/memory copied as
+    they were before the call.
+    """
+    corpus: List[Tuple] = []
+    real = generate_dataset.oracle_decide_tool
+
+    def capture(objects, gripper_hist, memory, state, user_state=None):
+        corpus.append((objects, gripper_hist, copy.deepcopy(memory), copy.deepcopy(state), user_state))
+        return real(objects, gripper_hist, memory, state, user_state=user_state)
+
+    generate_dataset.oracle_decide_tool = capture
+    try:
+        # Several user modes / ambiguity levels so every decision branch is exercised.
+        generate_dataset.generate(episodes=episodes, seed=0)
+        generate_dataset.generate(episodes=episodes, seed=1, collision_p=0.6, user_yes_p=0.2, candidate_max_dist=2)
+    finally:
+        generate_dataset.oracle_decide_tool = real
+    return corpus
+
+
+def bench_oracle(episodes: int) -> None:
+    corpus = _oracle_corpus(episodes)
+    best = float("inf")
+    for _ in range(3):
+        # OracleState is mutated by the oracle, so every run replays fresh copies.
+        states = [copy.deepcopy(state) for _, _, _, state, _ in corpus]
+        # The corpus keeps a large heap alive; keep cyclic GC passes out of the timing.
+        gc.disable()
+        t0 = time.perf_counter()
+        for (objects, gripper_hist, memory, _, user_state), state in zip(corpus, states):
+            oracle.oracle_decide_tool(objects, gripper_hist, memory, state, user_state=user_state)
+        elapsed = time.perf_counter() - t0
+        gc.enable()
+        best = min(best, elapsed)
+    print(f"\n== oracle ({len(corpus)} replayed states) ==")
+    print(f"{'op':<28} {'us/call':>10} {'calls/s':>10}")
+    print(f"{'oracle_decide_tool':<28} {best / len(corpus) * 1e6:>10.2f} {len(corpus) / best:>10.0f}")
+
+
+SECTIONS: Dict[str, Callable[[argparse.Namespace], None]] = {
+    "grid": lambda args: bench_grid(int(args.iters)),
+    "yaw": lambda args: bench_yaw(int(args.iters)),
+    "episode": lambda args: bench_episode(int(args.episodes)),
+    "oracle": lambda args: bench_oracle(int(args.episodes)),
+}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks for data_generator hot paths.")
+    ap.add_argument("--only", choices=sorted(SECTIONS), action="append", default=None, help="Run only these sections.")
+    ap.add_argument("--iters", type=int, default=200_000, help="Calls per timing run.")
+    ap.add_argument("--episodes", type=int, default=4096, help="Episodes per timing run (episode/oracle sections).")
+    args = ap.parse_args()
+
+    for name in args.only or list(SECTIONS):
+        SECTIONS[name](args)
+
+
+if __name__ == "__main__":
+    main()
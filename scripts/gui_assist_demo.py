@@ -35,6 +35,7 @@ from data_generator import yaw as yawlib
 from data_generator.episode import OBJECT_LABELS, Z_BINS
 from data_generator.oracle import OracleState, oracle_decide_tool, validate_tool_call
 from llm.inference import InferenceConfig, generate_json_only
+from llm.templates import render_tool_call
 
 
 INSTRUCTION = (
@@ -202,9 +203,9 @@ class HFBackend(AssistantBackend):
     def _ensure_loaded(self) -> None:
         if self._loaded:
             return
-        from llm.inference import _load_model_and_tokenizer
+        from llm.inference import get_model_and_tokenizer
 
-        self._model, self._tok = _load_model_and_tokenizer(self.cfg)
+        self._model, self._tok = get_model_and_tokenizer(self.cfg)
         self._loaded = True
 
     def predict(self, input_blob: Dict[str, Any], *, world: GridWorld, state: OracleState) -> Dict[str, Any]:
@@ -288,6 +289,9 @@ class HFBackend(AssistantBackend):
             else:
                 out = None
 
+        if out is None and self.cfg.constrained:
+            # Grammar-constrained output only fails to parse when cut by max_new_tokens.
+            raise ValueError(f"Constrained output is not valid JSON (max_new_tokens too small?)\nRAW:\n{raw1}")
         if out is None:
             repair_messages = _build_messages("Return ONLY valid JSON for the previous answer.\n\nPrevious answer:\n" + raw1)
             raw2 = _generate_once(self._model, self._tok, repair_messages, self.cfg)
@@ -300,6 +304,9 @@ class HFBackend(AssistantBackend):
                 else:
                     raise
 
+        # Models trained on template-id INTERACT outputs: render the full prompt locally.
+        out = render_tool_call(out, model_input.get("objects") or [])
+
         # Be tolerant of extra keys inside args (models sometimes emit additional metadata).
         # For GUI usage, we strip to the minimal schema before validating.
         if isinstance(out, dict):
@@ -361,6 +368,12 @@ def main() -> None:
     ap.add_argument("--top_p", type=float, default=0.9)
     ap.add_argument("--max_new_tokens", type=int, default=256)
     ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument(
+        "--constrained",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="HF backend: constrain decoding to the tool-call grammar (no repair pass).",
+    )
     ap.add_argument(
         "--deterministic",
         action="store_true",
@@ -425,6 +438,7 @@ def main() -> None:
             max_new_tokens=args.max_new_tokens,
             seed=args.seed,
             deterministic=bool(args.deterministic),
+            constrained=bool(args.constrained),
         )
         backend = HFBackend(cfg)
 
@@ -19,12 +19,13 @@ import json
 from typing import Dict, List
 
 import _bootstrap  # noqa: F401
+from data_generator.jsonl_io import open_jsonl
 from llm import data as data_lib
 
 
 def _load_lines(path: str, n: int) -> List[str]:
     out: List[str] = []
-    with open(path, "r", encoding="utf-8") as f:
+    with open_jsonl(path, "r") as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -50,7 +51,8 @@ def _print_contract(line: str) -> None:
     obj = json.loads(line)
     print(f"- id={obj.get('id')}")
     print("  instruction:", obj.get("instruction"))
-    print("  input keys:", list(json.loads(obj.get("input", "{}")).keys()))
+    inp = obj.get("input", "{}")
+    print("  input keys:", list((json.loads(inp) if isinstance(inp, str) else inp).keys()))
     print("  output:", obj.get("output"))
 
 